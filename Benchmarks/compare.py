@@ -0,0 +1,91 @@
+"""
+Compares two results files of run_benchmarks.py, e.g. from two commits, and checks how each benchmark scales.
+
+A benchmark is flagged as a regression when it got slower than the threshold ratio, or used that much more peak memory,
+at any size. Independently of the baseline, the scaling exponent between consecutive sizes (1 for linear time, 2 for
+quadratic) is computed for the new results and flagged when it is above maxExponent, which catches an O(n^2) loop even
+when there is no older result to compare with. Exits with status 1 if anything is flagged
+
+    python compare.py results/<old>.json results/<new>.json
+    python compare.py results/<new>.json                        # scaling check only
+"""
+import argparse
+import json
+import math
+import sys
+
+MIN_SECONDS = 0.05 # timings below this are too noisy for the scaling check
+
+
+def loadResults(path:str) -> dict:
+    """
+    Returns:
+    dict: (benchmark, size) -> result
+    """
+    with open(path, encoding='utf-8') as f:
+        return {(result['benchmark'], result['size']): result for result in json.load(f)['results']}
+
+
+def compare(baseline:dict, current:dict, threshold:float=1.25) -> list:
+    """
+    Returns:
+    list[tuple]: (benchmark, size, baseline seconds, current seconds, time ratio, memory ratio, flagged) for every
+                 benchmark and size in both results
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        old, new = baseline[key], current[key]
+        timeRatio = new['seconds'] / old['seconds'] if old['seconds'] > 0 else math.inf
+        memoryRatio = new['peakRSS'] / old['peakRSS'] if old.get('peakRSS') and new.get('peakRSS') else None
+        flagged = (timeRatio > threshold and new['seconds'] >= MIN_SECONDS) or (memoryRatio is not None and memoryRatio > threshold)
+        rows.append(key + (old['seconds'], new['seconds'], timeRatio, memoryRatio, flagged))
+    return rows
+
+
+def scaling(results:dict, maxExponent:float=1.3) -> list:
+    """
+    Returns:
+    list[tuple]: (benchmark, smaller size, larger size, exponent, flagged) for consecutive sizes of every benchmark,
+                 where the exponent k fits seconds ~ size^k between the two sizes
+    """
+    rows = []
+    for benchmark in sorted({name for name, size in results}):
+        sizes = sorted(size for name, size in results if name == benchmark)
+        for small, large in zip(sizes, sizes[1:]):
+            before, after = results[benchmark, small]['seconds'], results[benchmark, large]['seconds']
+            if after < MIN_SECONDS or before <= 0:
+                continue
+            exponent = math.log(after / before) / math.log(large / small)
+            rows.append((benchmark, small, large, exponent, exponent > maxExponent))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results and flag regressions")
+    parser.add_argument('files', nargs='+', help="[baseline results] current results")
+    parser.add_argument('--threshold', type=float, default=1.25, help="slowdown or memory growth ratio that is flagged")
+    parser.add_argument('--max-exponent', type=float, default=1.3, help="scaling exponent that is flagged, 1 is linear")
+    args = parser.parse_args(argv)
+    if len(args.files) > 2:
+        parser.error("expected one or two results files")
+
+    current = loadResults(args.files[-1])
+    flagged = False
+    if len(args.files) == 2:
+        print("benchmark        size   before s    after s   time x    mem x")
+        for benchmark, size, before, after, timeRatio, memoryRatio, regression in compare(loadResults(args.files[0]), current, args.threshold):
+            flagged |= regression
+            print(benchmark.ljust(15) + str(size).rjust(8) + ('%.4f' % before).rjust(11) + ('%.4f' % after).rjust(11)
+                  + ('%.2f' % timeRatio).rjust(9) + ('' if memoryRatio is None else '%.2f' % memoryRatio).rjust(9)
+                  + ("  REGRESSION" if regression else ""))
+        print()
+    print("benchmark        from size   to size   exponent")
+    for benchmark, small, large, exponent, superlinear in scaling(current, args.max_exponent):
+        flagged |= superlinear
+        print(benchmark.ljust(15) + str(small).rjust(11) + str(large).rjust(10) + ('%.2f' % exponent).rjust(11)
+              + ("  SUPERLINEAR" if superlinear else ""))
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Seeded generator of synthetic Filipino/English tweet-like corpora for the benchmarks.
+
+The vocabulary is seeded from the files the pipelines use: MNB/stopwords.txt for function words, the Lexicon
+Analyzer's positive-words.txt and negative-words.txt for sentiment words, and the words of MNB/training_set.csv for
+topic words. Synthetic Tagalog-like words are added to the end of the topic vocabulary so the number of distinct words
+keeps growing with the corpus, as it does with real tweets. Every word list is sampled with Zipf-like weights.
+
+A document of class '1' draws most of its sentiment words from the positive lexicon and a document of class '0' from
+the negative one. Some documents are retweets ("RT @user: " + an earlier text), which gives the deduplication code real
+duplicates to find. The same seed, size and role always give the same file, byte for byte
+
+    python corpus_generator.py 100000 --directory data/100000
+"""
+import argparse
+import csv
+import json
+import os
+import re
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+STOPWORDS_PATH = os.path.join(ROOT, 'MNB', 'stopwords.txt')
+POSITIVE_PATH = os.path.join(ROOT, 'Lexicon Analyzer', 'positive-words.txt')
+NEGATIVE_PATH = os.path.join(ROOT, 'Lexicon Analyzer', 'negative-words.txt')
+TOPIC_PATH = os.path.join(ROOT, 'MNB', 'training_set.csv')
+
+GENERATOR_VERSION = 1 # bump when the output for a seed changes, so cached corpora are regenerated
+BATCH_SIZE = 10000 # documents generated per numpy batch
+SYLLABLES = ['a', 'ba', 'ka', 'da', 'ga', 'ha', 'la', 'ma', 'na', 'nga', 'pa', 'ra', 'sa', 'ta', 'wa', 'ya',
+             'bi', 'ki', 'di', 'gi', 'li', 'mi', 'ni', 'pi', 'si', 'ti', 'bu', 'ku', 'du', 'gu', 'lu', 'mu',
+             'nu', 'pu', 'su', 'tu', 'bo', 'ko', 'lo', 'mo', 'no', 'po', 'so', 'to', 'an', 'ang', 'in', 'on']
+
+# what a token is drawn from: function word, topic word, sentiment word, or hashtag/mention/link/number
+KINDS = ('stop', 'topic', 'sentiment', 'special')
+KIND_WEIGHTS = (0.35, 0.5, 0.1, 0.05)
+ROLES = ('train', 'test', 'text') # labelled .csv, unlabelled .csv, one document per line
+
+
+def readWords(path:str) -> list:
+    """
+    Returns:
+    list[str]: The distinct non-empty lines of a word list, lower cased, in file order
+    """
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return list(dict.fromkeys(word for word in (line.strip().lower() for line in f) if word and not word.startswith(';')))
+
+
+def readTopicWords(path:str, exclude:set) -> list:
+    """
+    Returns:
+    list[str]: The words of the text column of a labelled .csv file that are not in exclude, most frequent first
+    """
+    counts = {}
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            for word in re.findall(r"[a-z][a-z'-]+", row[-1].lower()):
+                if word not in exclude:
+                    counts[word] = counts.get(word, 0) + 1
+    return sorted(counts, key=lambda word: (-counts[word], word))
+
+
+def zipfWeights(n:int, exponent:float=1.1, shift:float=2.7) -> np.ndarray:
+    """
+    Returns:
+    np.ndarray: The cumulative Zipf-Mandelbrot probabilities of n ranks, for sampling with searchsorted
+    """
+    weights = 1.0 / (np.arange(n) + shift) ** exponent
+    cumulative = np.cumsum(weights)
+    return cumulative / cumulative[-1]
+
+
+class CorpusGenerator():
+    def __init__(self, seed:int=1, stopWordsPath:str=STOPWORDS_PATH, positivePath:str=POSITIVE_PATH, negativePath:str=NEGATIVE_PATH, topicPath:str=TOPIC_PATH, numSyntheticWords:int=100000, retweetRate:float=0.03):
+        """
+        Paramaters:
+        seed (int): Seed of the vocabulary and of every document
+        stopWordsPath (str): Function words, one per line
+        positivePath (str): Positive sentiment words, one per line
+        negativePath (str): Negative sentiment words, one per line
+        topicPath (str): A labelled .csv file whose words seed the topic vocabulary
+        numSyntheticWords (int): Made up words appended to the topic vocabulary
+        retweetRate (float): Fraction of documents that repeat an earlier document of the same batch
+        """
+        self.seed = seed
+        self.retweetRate = retweetRate
+        stopWords = readWords(stopWordsPath)
+        positive = readWords(positivePath)
+        negative = readWords(negativePath)
+        rng = np.random.default_rng([seed, 0])
+        # the word lists are alphabetical, shuffle them so the common ranks are not all words starting with 'a'
+        stopWords, positive, negative = [[words[i] for i in rng.permutation(len(words))] for words in (stopWords, positive, negative)]
+        known = set(stopWords) | set(positive) | set(negative)
+        topics = readTopicWords(topicPath, known)
+        synthetic = {}
+        seen = known | set(topics)
+        while len(synthetic) < numSyntheticWords:
+            lengths = rng.integers(2, 6, numSyntheticWords)
+            syllables = rng.integers(0, len(SYLLABLES), int(lengths.sum())).tolist()
+            offset = 0
+            for length in lengths.tolist():
+                word = ''.join([SYLLABLES[i] for i in syllables[offset:offset + length]])
+                offset += length
+                if word not in seen and len(synthetic) < numSyntheticWords:
+                    synthetic[word] = None
+        topics += list(synthetic)
+        specials = (['#' + word.capitalize() for word in topics[:2000]]
+                    + ['@user' + str(i) for i in rng.integers(0, 10 ** 6, 2000)]
+                    + ['https://t.co/' + format(int(i), 'x') for i in rng.integers(0, 2 ** 40, 1000)]
+                    + [str(i) for i in rng.integers(0, 10000, 1000)])
+        specials = [specials[i] for i in rng.permutation(len(specials))]
+
+        # one array of every word, with the first index and the cumulative weights of each list
+        self.lists = {'stop': stopWords, 'topic': topics, 'positive': positive, 'negative': negative, 'special': specials}
+        self.words = np.array([word for words in self.lists.values() for word in words], dtype=object)
+        self.starts = {}
+        self.cumulative = {}
+        start = 0
+        for name, words in self.lists.items():
+            self.starts[name] = start
+            self.cumulative[name] = zipfWeights(len(words))
+            start += len(words)
+
+    def _sample(self, rng:np.random.Generator, name:str, n:int) -> np.ndarray:
+        return self.starts[name] + np.searchsorted(self.cumulative[name], rng.random(n), side='right').clip(max=len(self.lists[name]) - 1)
+
+    def documents(self, n:int, role:str='train'):
+        """
+        Yields:
+        tuple: (label, text) of n documents, label is '1' or '0'
+        """
+        rng = np.random.default_rng([self.seed, n, ROLES.index(role) + 1])
+        for batchStart in range(0, n, BATCH_SIZE):
+            size = min(BATCH_SIZE, n - batchStart)
+            labels = rng.integers(0, 2, size)
+            lengths = rng.poisson(14, size).clip(4, 50)
+            numTokens = int(lengths.sum())
+            documentOf = np.repeat(np.arange(size), lengths)
+            kinds = np.searchsorted(np.cumsum(KIND_WEIGHTS), rng.random(numTokens), side='right').clip(max=len(KINDS) - 1)
+            indices = np.empty(numTokens, dtype=np.int64)
+            for kind, name in enumerate(KINDS):
+                positions = np.flatnonzero(kinds == kind)
+                if name == 'sentiment':
+                    # mostly words of the document's polarity, a quarter of the other one (negations, sarcasm, noise)
+                    positive = (labels[documentOf[positions]] == 1) ^ (rng.random(len(positions)) < 0.25)
+                    indices[positions[positive]] = self._sample(rng, 'positive', int(positive.sum()))
+                    indices[positions[~positive]] = self._sample(rng, 'negative', int((~positive).sum()))
+                else:
+                    indices[positions] = self._sample(rng, name, len(positions))
+            tokens = self.words[indices].tolist()
+            capitalize = (rng.random(size) < 0.5).tolist()
+            endings = rng.choice(['', '', '.', '!', '?', ' :)', ' :('], size).tolist()
+            retweets = (rng.random(size) < self.retweetRate).tolist()
+            sources = rng.integers(0, np.arange(size) + 1).tolist() # an earlier (or the same) document of the batch
+            mentions = rng.integers(0, 10 ** 6, size).tolist()
+            texts = []
+            offset = 0
+            for i, length in enumerate(lengths.tolist()):
+                words = tokens[offset:offset + length]
+                offset += length
+                if capitalize[i]:
+                    words[0] = words[0].capitalize()
+                texts.append(' '.join(words) + endings[i])
+                if retweets[i] and sources[i] < i:
+                    texts[i] = 'RT @user' + str(mentions[i]) + ': ' + texts[sources[i]]
+                    labels[i] = labels[sources[i]]
+            yield from zip(['1' if label else '0' for label in labels.tolist()], texts)
+
+    def write(self, path:str, n:int, role:str):
+        """
+        Writes n documents: role 'train' as (id, class, abstract) .csv rows like training_set.csv, 'test' as
+        (id, abstract) rows like testing_set.csv and 'text' as one document per line like the Lexicon Analyzer's textfile
+        """
+        temporaryPath = path + '.tmp'
+        with open(temporaryPath, 'w', newline='', encoding='utf-8') as f:
+            if role == 'text':
+                for label, text in self.documents(n, role):
+                    f.write(text + '\n')
+            else:
+                writer = csv.writer(f)
+                writer.writerow(['id', 'class', 'abstract'] if role == 'train' else ['id', 'abstract'])
+                for i, (label, text) in enumerate(self.documents(n, role)):
+                    writer.writerow([i, label, text] if role == 'train' else [i, text])
+        os.replace(temporaryPath, path)
+
+
+FILE_NAMES = {'train': 'training_set.csv', 'test': 'testing_set.csv', 'text': 'textfile'}
+
+
+def generateCorpus(directory:str, size:int, seed:int=1, roles=ROLES, generator:CorpusGenerator=None) -> dict:
+    """
+    Writes the files of one corpus size to directory, reusing files generated earlier with the same seed and version
+
+    Returns:
+    dict: role -> path of the file
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifestPath = os.path.join(directory, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifestPath):
+        with open(manifestPath, encoding='utf-8') as f:
+            manifest = json.load(f)
+    if manifest.get('seed') != seed or manifest.get('size') != size or manifest.get('version') != GENERATOR_VERSION:
+        manifest = {'seed': seed, 'size': size, 'version': GENERATOR_VERSION, 'files': {}}
+    paths = {}
+    for role in roles:
+        path = os.path.join(directory, FILE_NAMES[role])
+        if role not in manifest['files'] or not os.path.exists(path) or os.path.getsize(path) != manifest['files'][role]:
+            generator = generator or CorpusGenerator(seed)
+            generator.write(path, size, role)
+            manifest['files'][role] = os.path.getsize(path)
+            with open(manifestPath, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+        paths[role] = path
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Filipino/English tweet corpus")
+    parser.add_argument('size', type=int, help="documents per file")
+    parser.add_argument('--directory', default='.', help="where training_set.csv, testing_set.csv and textfile are written")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--roles', nargs='+', choices=ROLES, default=list(ROLES))
+    args = parser.parse_args()
+    for role, path in generateCorpus(args.directory, args.size, args.seed, args.roles).items():
+        print(role, path, os.path.getsize(path), "bytes")
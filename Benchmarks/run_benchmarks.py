@@ -0,0 +1,223 @@
+"""
+Reproducible benchmarks of the MNB and Lexicon Analyzer pipelines on synthetic corpora of growing size.
+
+For every size the corpus is generated once with corpus_generator (and cached in --data) and every benchmark runs in
+its own Python process, so the peak memory of one benchmark is not hidden by another. Inside that process the
+benchmark is timed as an instrumentation stage, which also records the stages of the code it calls. Each result has
+the best wall time of the repeats, the items per second, the resident set size at the end of the timed part and the
+peak resident set size of the benchmark process, before (setup) and after the timed part. All results go to one JSON file, named after the current commit by default, for compare.py
+
+    python run_benchmarks.py                             # 10^3, 10^4 and 10^5 documents
+    python run_benchmarks.py --sizes 1000 1000000 --benchmarks train classify
+    python compare.py results/<old commit>.json results/<new commit>.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, os.pardir)
+MNB_DIR = os.path.join(ROOT, 'MNB')
+LEXICON_DIR = os.path.join(ROOT, 'Lexicon Analyzer')
+sys.path.append(os.path.join(ROOT, 'Shared'))
+import instrumentation
+import corpus_generator
+
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5]
+TOP_K = 1000
+RESULTS_FORMAT_VERSION = 1
+
+
+def benchTrain(paths:dict, timed):
+    import MNB_with_word_frequency
+    with timed(paths['size']):
+        nb = MNB_with_word_frequency.train(paths['train'])
+    nb.save(paths['model']) # for the classify benchmark
+
+
+def benchClassify(paths:dict, timed):
+    import MNB_with_word_frequency
+    import pipeline
+    if not os.path.exists(paths['model']):
+        benchTrain(paths, lambda items: contextlib.nullcontext())
+    nb = MNB_with_word_frequency.NaiveBayesClassifier.load(paths['model'])
+    with timed(paths['size']):
+        pipeline.classifyFile(nb, paths['test'], paths['output'], showProgress=False)
+
+
+def benchLexicon(paths:dict, timed):
+    import lexicon_scorer
+    scorer = lexicon_scorer.LexiconScorer(os.path.join(LEXICON_DIR, 'positive-words.txt'), os.path.join(LEXICON_DIR, 'negative-words.txt'))
+    with timed(paths['size']):
+        scorer.score_file(paths['text'], paths['output'])
+
+
+def benchWordFrequency(paths:dict, timed):
+    import MNB_with_word_frequency
+    with timed(paths['size']):
+        MNB_with_word_frequency.count_word(paths['test'])
+
+
+def benchTopK(paths:dict, timed):
+    import MNB_with_word_frequency
+    import feature_selection
+    p = MNB_with_word_frequency.Preprocessor()
+    attributeIDs, y, X = MNB_with_word_frequency.importData(paths['train'])
+    matrix = p.getTrainingSetMatrix(attributeIDs, X, y)
+    wordFrequencyDict = p.getWordFrequencyDict(matrix)
+    del X
+    with timed(matrix.numColumns):
+        with instrumentation.stage('getTopXWords'):
+            p.getTopXWords(wordFrequencyDict, TOP_K)
+        for scoring in ('frequency', 'chi2', 'mutual_information'):
+            with instrumentation.stage('selectVocabulary ' + scoring):
+                feature_selection.selectVocabulary(matrix, TOP_K, scoring, exclude=p.stopWords)
+
+
+# name -> (function, corpus files it needs), run in this order so classify finds the model saved by train
+BENCHMARKS = {
+    'train': (benchTrain, ('train',)),
+    'classify': (benchClassify, ('train', 'test')),
+    'lexicon': (benchLexicon, ('text',)),
+    'word_frequency': (benchWordFrequency, ('test',)),
+    'top_k': (benchTopK, ('train',)),
+}
+
+
+def runChild(name:str, paths:dict, resultPath:str):
+    # runs one benchmark in this process and writes its measurements to resultPath
+    sys.path.extend([MNB_DIR, LEXICON_DIR])
+    os.chdir(MNB_DIR) # the Preprocessor reads stopwords.txt from the working directory
+    recorder = instrumentation.Recorder(table=False)
+    measured = {}
+
+    @contextlib.contextmanager
+    def timed(items:int):
+        measured['setupRSS'] = instrumentation.peakRSS()
+        with recorder:
+            with instrumentation.stage(name, items) as span:
+                yield span
+        measured['span'] = span
+
+    BENCHMARKS[name][0](paths, timed)
+    span = measured['span']
+    result = {'seconds': span.wall, 'cpu': span.cpu, 'items': span.items, 'throughput': span.throughput,
+              'rss': span.rss, 'peakRSS': span.peakRSS, 'setupRSS': measured['setupRSS'], 'stages': recorder.summary()[1:]}
+    with open(resultPath, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+
+def runBenchmark(name:str, paths:dict, verbose:bool=False) -> dict:
+    """
+    Runs one benchmark in a new Python process
+
+    Returns:
+    dict: Its measurements
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        resultPath = os.path.join(directory, 'result.json')
+        paths = dict(paths, output=os.path.join(directory, 'Results.csv'))
+        command = [sys.executable, os.path.abspath(__file__), '--child', name, '--paths', json.dumps(paths), '--result', resultPath]
+        subprocess.run(command, check=True, stdout=None if verbose else subprocess.DEVNULL)
+        with open(resultPath, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def gitRevision() -> tuple:
+    """
+    Returns:
+    tuple: (commit hash, if the tree has uncommitted changes), (None, None) outside a git checkout
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def environment() -> dict:
+    import numpy
+    commit, dirty = gitRevision()
+    return {'commit': commit, 'dirty': dirty, 'python': platform.python_version(), 'numpy': numpy.__version__,
+            'platform': platform.platform(), 'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count()}
+
+
+def runSuite(sizes:list, names:list, seed:int=1, repeat:int=3, dataDirectory:str=None, verbose:bool=False) -> dict:
+    """
+    Runs every benchmark in names on a corpus of every size, repeat times each
+
+    Returns:
+    dict: The environment, the settings and one result per benchmark and size
+    """
+    dataDirectory = dataDirectory or os.path.join(HERE, 'data')
+    generator = None
+    results = []
+    for size in sizes:
+        directory = os.path.join(dataDirectory, str(seed) + '-' + str(size))
+        roles = sorted({role for name in names for role in BENCHMARKS[name][1]}, key=corpus_generator.ROLES.index)
+        started = time.perf_counter()
+        if generator is None:
+            generator = corpus_generator.CorpusGenerator(seed)
+        paths = corpus_generator.generateCorpus(directory, size, seed, roles, generator)
+        print("Corpus of", size, "documents ready in", round(time.perf_counter() - started, 2), "s")
+        paths.update(size=size, model=os.path.join(directory, 'model.mnb'))
+        if os.path.exists(paths['model']):
+            os.remove(paths['model']) # always measure the model of the code being benchmarked
+        for name in names:
+            runs = [runBenchmark(name, paths, verbose) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run['seconds'])
+            result = dict(best, benchmark=name, size=size, runs=[run['seconds'] for run in runs],
+                          peakRSS=max(run['peakRSS'] or 0 for run in runs) or None)
+            results.append(result)
+            print(formatResult(result))
+    return {'format': RESULTS_FORMAT_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(),
+            'seed': seed, 'repeat': repeat, 'generator': corpus_generator.GENERATOR_VERSION, 'results': results}
+
+
+def formatResult(result:dict) -> str:
+    throughput = result['throughput']
+    memory = '' if result['peakRSS'] is None else ", process peak RSS " + str(round(result['peakRSS'] / 2 ** 20, 1)) + " MB"
+    return ("  " + result['benchmark'].ljust(15) + str(result['size']).rjust(8) + " docs: " + str(round(result['seconds'], 4)) + " s, "
+            + ("" if throughput is None else str(round(throughput)) + " items/s") + memory)
+
+
+def defaultOutputPath() -> str:
+    commit, dirty = gitRevision()
+    name = (commit[:10] + ('-dirty' if dirty else '')) if commit else time.strftime('%Y%m%d-%H%M%S')
+    return os.path.join(HERE, 'results', name + '.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark training, classification, lexicon scoring, word counting and top-K selection")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="documents per corpus, e.g. 1000 10000 100000 1000000")
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per benchmark and size, the fastest is reported")
+    parser.add_argument('--data', help="where generated corpora are cached, Benchmarks/data by default")
+    parser.add_argument('--output', help="results file, Benchmarks/results/<commit>.json by default")
+    parser.add_argument('--verbose', action='store_true', help="show the output of the benchmarked code")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--paths', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return runChild(args.child, json.loads(args.paths), args.result)
+    names = [name for name in BENCHMARKS if name in args.benchmarks]
+    results = runSuite(sorted(args.sizes), names, args.seed, args.repeat, args.data, args.verbose)
+    outputPath = args.output or defaultOutputPath()
+    os.makedirs(os.path.dirname(os.path.abspath(outputPath)), exist_ok=True)
+    with open(outputPath, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    print("Results saved to", outputPath)
+
+
+if __name__ == "__main__":
+    main()
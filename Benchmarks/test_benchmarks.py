@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import compare
+import corpus_generator
+import run_benchmarks
+
+
+@pytest.fixture(scope='module')
+def generator():
+    return corpus_generator.CorpusGenerator(seed=7, numSyntheticWords=2000)
+
+
+def test_the_same_seed_gives_the_same_corpus(generator, tmp_path):
+    first = list(generator.documents(300, 'train'))
+    assert list(corpus_generator.CorpusGenerator(seed=7, numSyntheticWords=2000).documents(300, 'train')) == first
+    assert list(generator.documents(300, 'test')) != first # every role is its own sample
+    assert list(corpus_generator.CorpusGenerator(seed=8, numSyntheticWords=2000).documents(300, 'train')) != first
+    assert {label for label, text in first} == {'0', '1'}
+    assert any(text.startswith('RT @user') for label, text in generator.documents(2000, 'train')) # duplicates to find
+
+
+def test_documents_lean_towards_their_label(generator):
+    positive, negative = set(generator.lists['positive']), set(generator.lists['negative'])
+    agree = total = 0
+    for label, text in generator.documents(1000, 'train'):
+        words = text.lower().split()
+        balance = sum(word in positive for word in words) - sum(word in negative for word in words)
+        if balance:
+            agree += (balance > 0) == (label == '1')
+            total += 1
+    assert agree / total > 0.7
+
+
+def test_generated_files_are_reused(generator, tmp_path):
+    directory = str(tmp_path / 'corpus')
+    paths = corpus_generator.generateCorpus(directory, 50, 7, generator=generator)
+    assert sorted(paths) == sorted(corpus_generator.ROLES)
+    with open(paths['train'], encoding='utf-8') as f:
+        assert f.readline().strip() == 'id,class,abstract' and len(f.readlines()) >= 50
+    modified = {role: os.path.getmtime(path) for role, path in paths.items()}
+    os.utime(paths['text'], (0, 0))
+    assert corpus_generator.generateCorpus(directory, 50, 7, generator=generator) == paths
+    assert os.path.getmtime(paths['train']) == modified['train'] and os.path.getmtime(paths['text']) == 0
+
+    with open(paths['text'], 'a', encoding='utf-8') as f:
+        f.write("a truncated or edited file\n")
+    corpus_generator.generateCorpus(directory, 50, 7, generator=generator)
+    with open(paths['text'], encoding='utf-8') as f:
+        assert len(f.readlines()) == 50 # regenerated
+
+
+def test_regressions_and_superlinear_scaling_are_flagged():
+    def results(seconds):
+        return {('train', size): {'seconds': value, 'peakRSS': 100 * size} for size, value in seconds.items()}
+
+    baseline = results({1000: 0.1, 10000: 1.0})
+    assert not any(row[-1] for row in compare.compare(baseline, results({1000: 0.11, 10000: 1.1})))
+    assert [row[1] for row in compare.compare(baseline, results({1000: 0.1, 10000: 2.0})) if row[-1]] == [10000]
+    assert not any(row[-1] for row in compare.scaling(results({1000: 0.1, 10000: 1.0})))
+    assert [row[-1] for row in compare.scaling(results({1000: 0.1, 10000: 10.0}))] == [True] # quadratic
+
+
+def test_suite_runs_every_benchmark(tmp_path):
+    report = run_benchmarks.runSuite([200], list(run_benchmarks.BENCHMARKS), repeat=1, dataDirectory=str(tmp_path))
+    assert report['format'] == run_benchmarks.RESULTS_FORMAT_VERSION
+    assert sorted(result['benchmark'] for result in report['results']) == sorted(run_benchmarks.BENCHMARKS)
+    for result in report['results']:
+        assert result['size'] == 200 and result['seconds'] > 0 and len(result['runs']) == 1
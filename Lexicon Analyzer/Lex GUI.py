@@ -4,14 +4,26 @@ from tkinter import TOP
 from tkinter import END
 from tkinter import BOTTOM
 
+from tkinter import DISABLED
+from tkinter import NORMAL
 from tkinter import Label
 from tkinter import Button
 from tkinter import Listbox
 from tkinter import Frame
 from tkinter import ttk
 
-import PositiveNegative
-import senticounter
+import lexicon_scorer
+import background # from ../Shared, put on sys.path by lexicon_scorer
+
+
+#function that scores the reviews on the worker thread, reporting every stage to the job
+def runLexicon(job, path='textfile', outPath='Results.csv'):
+    with job.stage("Loading lexicons"):
+        scorer = lexicon_scorer.getScorer()
+    with job.stage("Scoring reviews into " + outPath):
+        #the progress reporter stops score_file at the next update once the job is cancelled
+        counts = scorer.score_file(path, outPath, progress=job.reporter("Scoring: "))
+    return {'Positive': counts[1], 'Negative': counts[-1], 'Neutral': counts[0]}
 
 
 if __name__ == '__main__':
@@ -49,16 +61,58 @@ if __name__ == '__main__':
 
     # processing page content
     label11 = Label(frm2, text="Data Processing", font=('Tahoma 16 bold'))
+    job = None # the running BackgroundJob
+
+    def Finished():
+        btn.config(state=NORMAL)
+        cancel_btn.config(state=DISABLED)
+        status.config(text="")
+
+    def ShowResults(counts):
+        msg_list.insert(END, "Classification Done")
+        rst.delete(0, END)
+        rst.insert(END, "Total number of Data: " + str(sum(counts.values())))
+        for label, count in counts.items():
+            rst.insert(END, "    " + label + ": " + str(count))
+        Finished()
+
+    def ShowCancelled():
+        msg_list.insert(END, "Classification cancelled")
+        Finished()
+
+    def ShowError(message):
+        msg_list.insert(END, "Classification failed: " + message)
+        Finished()
+
     def Proceed():
+        global job
+        job = background.BackgroundJob(runLexicon).start()
+        btn.config(state=DISABLED)
+        cancel_btn.config(state=NORMAL)
         msg_list.insert(END, "Starting Lexicon Classifier")
-        PositiveNegative.run('textfile')
-        msg_list.insert(END, "Classification Done")
-        reviews, decisions = PositiveNegative.run('textfile')
-        for i in range(len(reviews)):
-            print(reviews[i], decisions[i])
+        background.watch(main, job, {
+            'stage': lambda name: msg_list.insert(END, name + "...."),
+            'timing': lambda name, seconds: msg_list.insert(END, name + " done in " + str(round(seconds, 2)) + "s"),
+            'progress': lambda label, rows, fraction: status.config(text=background.formatProgress(label, rows, fraction)),
+            'done': ShowResults,
+            'cancelled': ShowCancelled,
+            'error': ShowError,
+        })
+
+    def Cancel():
+        if job is not None and job.running:
+            job.cancel()
+            msg_list.insert(END, "Cancelling....")
 
     btn = Button(frm2, text="Execute", command=Proceed, font=('Tahoma 16 bold'))
+    cancel_btn = Button(frm2, text="Cancel", command=Cancel, font=('Tahoma 16 bold'), state=DISABLED)
     msg_list = Listbox(frm2, height=10, width=70)
+    status = Label(frm2, text="", font=('Tahoma 13'))
+
+    # results page content
+    label12 = Label(frm3, text="Results", font=('Tahoma 16 bold'))
+    rst = Listbox(frm3, height=15, width=70)
+    rst.insert(END, "Press Execute on the Processing Page to classify")
 
     #pack
     label01.pack(pady=5, side=TOP, anchor="w")
@@ -74,6 +128,11 @@ if __name__ == '__main__':
     label11.pack(pady=5, side=TOP, anchor="w")
     msg_list.pack(side=TOP, pady=2)
     msg_list.config(font=('Tahoma 16 bold'))
+    status.pack(pady=2, side=TOP, anchor="w")
+    cancel_btn.pack(pady=5, side=BOTTOM, anchor="s")
     btn.pack(pady=5, side=BOTTOM, anchor="s")
+    label12.pack(pady=5, side=TOP, anchor="w")
+    rst.pack(side=TOP, pady=2)
+    rst.config(font=('Tahoma 16 bold'))
 
     main.mainloop()
\ No newline at end of file
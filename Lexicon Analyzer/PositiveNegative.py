@@ -1,65 +1,50 @@
-import csv
-
-#function that loads a lexicon of positive words to a set and returns the set
-def loadLexicon(fname):
-    newLex=set() # about set->no duplicates & fast search
-    lex_conn=open(fname)
-    #add every word in the file to the set
-    for line in lex_conn:
-        newLex.add(line.strip())# remember to strip to remove the lin-change character
-    lex_conn.close()
-
-    return newLex
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Shared'))
+import instrumentation
+import lexicon_scorer
+import parallel_scorer
 
 # positive words doesnot included..
 
 #function that reads in a file with reviews and decides if each review is positive or negative
 #The function returns a list of the input reviews and a list of the respective decisions..
-def run(path):
-    decisions=[]
-    reviews=[]
-    #load the positive and negative lexicons
-    posLex=loadLexicon('positive-words.txt')
-    negLex=loadLexicon('negative-words.txt')
-
-    fin=open(path)
-    for line in fin: # for every line in the file (1 review per line)
-        posList=[] #list of positive words in the review
-        negList=[] #list of negative words in the review
-        line=line.lower().strip()
-        reviews.append(line)
-
-        words=line.split(' ') # split on the space to get list of words
-
-        for word in words: #for every word in the review
-            if word in posLex: # if the word is in the positive lexicon
-                posList.append(word) #update the positive list for this review
-            if word in negLex: # if the word is in the negative lexicon
-                negList.append(word) #update the negative list for this review
-
-        decision=0  # 0 for neutral
-        if len(posList)>len(negList): # more pos words than neg
-            decision=1 # 1 for positiv
-        elif len(negList)>len(posList):  # more neg than pos
-            decision=-1 # -1 for negative
-        decisions.append(decision)
-
-    fin.close()
-    return reviews, decisions
+#pass an instrumentation.Recorder as instrument to time every stage
+#pass a prediction_cache.PredictionCache as cache to look up reviews seen in earlier runs instead of scoring them again,
+#the scorer shared by every run is not changed
+def run(path, negationWindow=3, deduplicate=False, compiled=False, instrument=None, cache=None):
+    with instrumentation.activate(instrument):
+        #the compiled lexicons are built on the first call and reused afterwards
+        with instrumentation.stage('load lexicons'):
+            scorer=lexicon_scorer.getScorer('positive-words.txt', 'negative-words.txt', negationWindow)
+
+        if compiled:
+            #read the pre-tokenized corpus of the file (compiled on first use) instead of splitting every line again
+            import corpus_format
+            with instrumentation.stage('openCorpus') as span:
+                corpus=corpus_format.openCorpus(path, labelsInSet=False)
+                span.count(len(corpus))
+            with instrumentation.stage('score', len(corpus)):
+                decisions=scorer.decide_corpus(corpus, deduplicate, cache)
+            #the reviews are only read back from the source now, by their line offsets
+            with instrumentation.stage('read', len(corpus)):
+                return [line.lower().strip() for line in corpus.lines], decisions
+
+        with instrumentation.stage('read') as span:
+            with open(path) as fin:
+                reviews=[line.lower().strip() for line in fin] # 1 review per line
+            span.count(len(reviews))
+        #1 positive, -1 negative, 0 neutral, duplicate reviews are scored once if deduplicate is set
+        with instrumentation.stage('score', len(reviews)):
+            decisions=scorer.decide_many(reviews, deduplicate, cache)
+        return reviews, decisions
 
 # list goes from 0-6 if 7 line
 if __name__ == "__main__":
 
-    reviews,decisions=run('textfile')
-    for i in range(len(reviews)):
-        print(reviews[i], decisions[i])
-
-    with open('Results.csv', 'w', newline='') as f:
-                writer = csv.writer(f, delimiter=',',quotechar='|', quoting=csv.QUOTE_MINIMAL)
-                writer.writerow(['Text', 'Sentiment'])
-                for i in range(len(reviews)):
-                    print(str(round(i / len(reviews) * 100, 2)) + "%", end="")
-                    print("\r", end="")
-                    Text = reviews[i]
-                    Sentiment = decisions[i]
-                    writer.writerow([Text, Sentiment])
\ No newline at end of file
+    #score the file in parallel, straight into Results.csv, INSTRUMENT=1 prints how long it took
+    with instrumentation.activate(instrumentation.fromEnvironment()):
+        with instrumentation.stage('scoreFileParallel') as span:
+            decisions=parallel_scorer.scoreFileParallel('textfile', 'Results.csv')
+            span.count(len(decisions))
+    print(len(decisions), "reviews:", decisions.count(1), "positive,", decisions.count(-1), "negative,", decisions.count(0), "neutral")
@@ -0,0 +1,196 @@
+import bisect
+import collections
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Shared'))
+import tokenizer
+
+# words that flip the polarity of the lexicon matches that follow them (English and Filipino)
+DEFAULT_NEGATORS = frozenset([
+    'not', 'no', 'never', 'none', 'nothing', 'nobody', 'neither', 'nor', 'without',
+    "don't", "doesn't", "didn't", "isn't", "aren't", "wasn't", "weren't", "won't", "can't", "cannot", "couldn't",
+    "shouldn't", "wouldn't", 'dont', 'doesnt', 'didnt', 'isnt', 'arent', 'wasnt', 'werent', 'wont', 'cant',
+    'hindi', 'di', "'di", 'wala', 'walang', 'huwag', 'hwag', 'wag', "'wag", 'ayaw', 'ayoko',
+])
+
+# Result of scoring one document: how many positive and negative lexicon entries matched (after negation)
+# and the sum of their weights
+LexiconScore = collections.namedtuple('LexiconScore', ['positive', 'negative', 'score'])
+
+
+#function that loads a lexicon file (one word or phrase per line) and returns its entries as tuples of words
+def loadLexicon(fname):
+    entries = set()
+    with open(fname, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            words = tuple(tokenizer.tokenize(line))
+            if words:
+                entries.add(words)
+    return entries
+
+
+#function that loads a weight file, one "word or phrase<TAB>weight" per line, positive weights are positive sentiment
+def loadWeights(fname):
+    weights = {}
+    with open(fname, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            phrase, _, weight = line.rstrip('\n').rpartition('\t')
+            words = tuple(tokenizer.tokenize(phrase))
+            if words:
+                weights[words] = float(weight)
+    return weights
+
+
+class LexiconMatcher():
+    """
+    Token level Aho-Corasick automaton over the lexicon entries. A document is scored in one left to right pass:
+    where entries overlap the longest one wins, and a match that starts within negationWindow words after a negator
+    has its polarity flipped
+    """
+    def __init__(self, positive=(), negative=(), weights=None, negators=DEFAULT_NEGATORS, negationWindow:int=3):
+        """
+        Paramaters:
+        positive (iterable[tuple[str]]): Positive entries as tuples of words, weight +1
+        negative (iterable[tuple[str]]): Negative entries as tuples of words, weight -1
+        weights (dict): tuple of words -> weight, overrides the +1/-1 of positive and negative
+        negators (iterable[str]): Words that flip the polarity of the matches following them
+        negationWindow (int): How many words after a negator are negated, 0 disables negation
+        """
+        self.negationWindow = negationWindow
+        self.negators = frozenset(negators) if negationWindow > 0 else frozenset()
+        entries = {}
+        for words in positive:
+            entries[tuple(words)] = 1.0
+        for words in negative:
+            entries[tuple(words)] = -1.0
+        for words, weight in (weights or {}).items():
+            entries[tuple(words)] = weight
+        # a negator on its own only negates, it is not also counted as a lexicon hit
+        for negator in self.negators:
+            entries.pop((negator,), None)
+        self._build(entries)
+
+    def _build(self, entries:dict):
+        # node 0 is the root, _goto[node] maps a word to the next node
+        self._goto = [{}]
+        self._output = [None] # (length, weight) of the longest entry ending at this node, following fail links
+        for words, weight in entries.items():
+            if weight == 0:
+                continue
+            node = 0
+            for word in words:
+                nextNode = self._goto[node].get(word)
+                if nextNode is None:
+                    nextNode = len(self._goto)
+                    self._goto[node][word] = nextNode
+                    self._goto.append({})
+                    self._output.append(None)
+                node = nextNode
+            self._output[node] = (len(words), weight)
+
+        # breadth first to set the failure links, so the longest suffix match is known at every node
+        self._fail = [0] * len(self._goto)
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word, 0)
+                if self._output[child] is None:
+                    self._output[child] = self._output[self._fail[child]]
+
+    def matchTokens(self, tokens:list) -> list:
+        """
+        Paramaters:
+        tokens (list[str]): The words of a document, e.g. from tokenizer.tokenize
+
+        Returns:
+        list[tuple]: (start, end, weight, negated) of every counted match in order, tokens[start:end + 1] are the words
+                     of the entry and weight is its lexicon weight, flipped if negated
+        """
+        goto, fail, output, negators = self._goto, self._fail, self._output, self.negators
+        node = 0
+        negatorPositions = []
+        accepted = [] # the non-overlapping matches so far
+        for position, word in enumerate(tokens):
+            if word in negators:
+                negatorPositions.append(position)
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            match = output[node]
+            if match is None:
+                continue
+            length, weight = match
+            start = position - length + 1
+            # keep the longest of overlapping matches
+            while accepted and accepted[-1][1] >= start:
+                if accepted[-1][1] - accepted[-1][0] + 1 >= length:
+                    break
+                accepted.pop()
+            else:
+                negated = False
+                if negatorPositions:
+                    previous = bisect.bisect_left(negatorPositions, start) - 1
+                    negated = previous >= 0 and start - negatorPositions[previous] <= self.negationWindow
+                accepted.append((start, position, -weight if negated else weight, negated))
+        return accepted
+
+    def scoreTokens(self, tokens:list) -> LexiconScore:
+        """
+        Paramaters:
+        tokens (list[str]): The words of a document, e.g. from tokenizer.tokenize
+
+        Returns:
+        LexiconScore: Number of positive and negative matches and their summed weight
+        """
+        return scoreMatches(self.matchTokens(tokens))
+
+    def score(self, text:str) -> LexiconScore:
+        """
+        Tokenizes and scores a document
+
+        Returns:
+        LexiconScore: Number of positive and negative matches and their summed weight
+        """
+        return self.scoreTokens(tokenizer.tokenize(text))
+
+
+#function that adds up the matches of LexiconMatcher.matchTokens into a LexiconScore
+def scoreMatches(matches):
+    positive = negative = 0
+    score = 0.0
+    for start, end, weight, negated in matches:
+        score += weight
+        if weight > 0:
+            positive += 1
+        else:
+            negative += 1
+    return LexiconScore(positive, negative, score)
+
+
+#function that turns a LexiconScore into 1 for positive, -1 for negative and 0 for neutral
+def decide(result):
+    if result.score > 0:
+        return 1
+    elif result.score < 0:
+        return -1
+    return 0
+
+
+#function that builds a matcher from the lexicon files, phrase and weight files are optional
+def buildMatcher(positivePath='positive-words.txt', negativePath='negative-words.txt', positivePhrasesPath=None, negativePhrasesPath=None, weightsPath=None, negationWindow=3):
+    positive = loadLexicon(positivePath)
+    negative = loadLexicon(negativePath)
+    if positivePhrasesPath:
+        positive |= loadLexicon(positivePhrasesPath)
+    if negativePhrasesPath:
+        negative |= loadLexicon(negativePhrasesPath)
+    weights = loadWeights(weightsPath) if weightsPath else None
+    return LexiconMatcher(positive, negative, weights, negationWindow=negationWindow)
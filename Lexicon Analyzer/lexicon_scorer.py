@@ -0,0 +1,162 @@
+import csv
+import functools
+import hashlib
+import os
+
+import lexicon_matcher
+import tokenizer # from ../Shared, put on sys.path by lexicon_matcher
+
+WRITE_BUFFER_SIZE = 1 << 20 # bytes
+
+
+class LexiconScorer():
+    """
+    Loads and compiles the lexicons once and keeps them for every document scored afterwards. The lexicons are
+    frozen after loading, call reload() or build a new scorer to pick up edited lexicon files
+
+    If cache is set to a prediction_cache.PredictionCache the decisions of documents seen before are looked up
+    instead of scored again; decide_many and decide_corpus also take a cache for one call, which leaves a scorer shared
+    through getScorer untouched. version identifies the loaded lexicons, so reloading changed files invalidates the cache
+    """
+    def __init__(self, positivePath='positive-words.txt', negativePath='negative-words.txt', positivePhrasesPath=None, negativePhrasesPath=None, weightsPath=None, negationWindow=3):
+        """
+        Paramaters:
+        positivePath (str): Positive lexicon, one word or phrase per line
+        negativePath (str): Negative lexicon, one word or phrase per line
+        positivePhrasesPath (str): Optional extra positive phrases
+        negativePhrasesPath (str): Optional extra negative phrases
+        weightsPath (str): Optional "phrase<TAB>weight" file
+        negationWindow (int): How many words after a negator are negated, 0 disables negation
+        """
+        self.paths = (positivePath, negativePath, positivePhrasesPath, negativePhrasesPath, weightsPath)
+        self.negationWindow = negationWindow
+        self.cache = None
+        self.reload()
+
+    def reload(self):
+        """
+        Reads the lexicon files again, decisions cached for the previous lexicons are dropped if they changed
+        """
+        positivePath, negativePath, positivePhrasesPath, negativePhrasesPath, weightsPath = self.paths
+        positive = lexicon_matcher.loadLexicon(positivePath)
+        negative = lexicon_matcher.loadLexicon(negativePath)
+        if positivePhrasesPath:
+            positive |= lexicon_matcher.loadLexicon(positivePhrasesPath)
+        if negativePhrasesPath:
+            negative |= lexicon_matcher.loadLexicon(negativePhrasesPath)
+        weights = lexicon_matcher.loadWeights(weightsPath) if weightsPath else None
+        self.matcher = lexicon_matcher.LexiconMatcher(positive, negative, weights, negationWindow=self.negationWindow)
+        # a fingerprint of the lexicon contents, the same in every process so a saved cache stays valid
+        fingerprint = hashlib.blake2b(repr((sorted(positive), sorted(negative), sorted((weights or {}).items()), self.negationWindow)).encode('utf-8'), digest_size=16)
+        self.version = fingerprint.hexdigest()
+
+    def score(self, text:str) -> lexicon_matcher.LexiconScore:
+        """
+        Returns:
+        LexiconScore: Number of positive and negative matches in the text and their summed weight
+        """
+        return self.matcher.score(text)
+
+    def decide(self, text:str) -> int:
+        """
+        Returns:
+        int: 1 for positive, -1 for negative and 0 for neutral
+        """
+        if self.cache is not None:
+            return self._decideDocuments([tokenizer.tokenize(text)], False)[0]
+        return lexicon_matcher.decide(self.matcher.score(text))
+
+    def score_many(self, texts):
+        """
+        Scores documents lazily, one at a time
+
+        Paramaters:
+        texts (iterable[str]): The documents, e.g. an open file of one review per line
+
+        Yields:
+        LexiconScore: The score of each document, in order
+        """
+        score = self.matcher.score
+        for text in texts:
+            yield score(text)
+
+    def decide_many(self, texts:list, deduplicate:bool=False, cache=None) -> list:
+        """
+        Paramaters:
+        texts (list[str]): The documents
+        deduplicate (bool): Score each cluster of exact or near-duplicate documents once and copy its decision to
+                            the other members (needs numpy, see Shared/dedup.py)
+        cache (PredictionCache): Looks up and stores the decisions of this call, self.cache if None
+
+        Returns:
+        list[int]: The decision of every document, 1 positive, -1 negative, 0 neutral
+        """
+        return self._decideDocuments([tokenizer.tokenize(text) for text in texts], deduplicate, cache)
+
+    def decide_corpus(self, corpus, deduplicate:bool=False, cache=None) -> list:
+        """
+        Scores a compiled corpus (corpus_format.CompiledCorpus) from its token ids, without tokenizing again
+
+        Paramaters:
+        corpus (CompiledCorpus): The documents
+        deduplicate (bool): See decide_many
+        cache (PredictionCache): See decide_many
+
+        Returns:
+        list[int]: The decision of every document, 1 positive, -1 negative, 0 neutral
+        """
+        return self._decideDocuments(corpus, deduplicate, cache)
+
+    def _decideDocuments(self, documents, deduplicate:bool, cache=None) -> list:
+        cache = self.cache if cache is None else cache
+        if cache is not None:
+            return cache.predict(list(documents), self.version, lambda misses: self._decideUncached(misses, deduplicate))
+        return self._decideUncached(documents, deduplicate)
+
+    def _decideUncached(self, documents, deduplicate:bool) -> list:
+        scoreTokens, decide = self.matcher.scoreTokens, lexicon_matcher.decide
+        if not deduplicate:
+            return [decide(scoreTokens(tokens)) for tokens in documents]
+        import dedup
+        documents = list(documents)
+        clusters = dedup.Deduplicator().cluster(documents)
+        return clusters.expand([decide(scoreTokens(tokens)) for tokens in clusters.select(documents)])
+
+    def score_file(self, path:str, outPath:str='Results.csv', progress=None, progressEvery:int=1000) -> dict:
+        """
+        Scores a file of one review per line into a (Text, Sentiment) .csv file through a large write buffer
+
+        Paramaters:
+        path (str): The reviews, one per line
+        outPath (str): Where the results are written
+        progress (pipeline.ProgressReporter): Updated every progressEvery reviews, e.g. a background.JobProgress whose
+                                              update() stops the scoring once the job is cancelled
+        progressEvery (int): Reviews scored between progress updates
+
+        Returns:
+        dict: The number of reviews of every decision, 1 positive, -1 negative, 0 neutral
+        """
+        counts = {1: 0, -1: 0, 0: 0}
+        size = os.path.getsize(path)
+        count = 0
+        with open(path) as fin, open(outPath, 'w', newline='', buffering=WRITE_BUFFER_SIZE) as fout:
+            writer = csv.writer(fout, delimiter=',', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(['Text', 'Sentiment'])
+            for line in fin:
+                line = line.lower().strip()
+                decision = self.decide(line)
+                writer.writerow([line, decision])
+                counts[decision] += 1
+                count += 1
+                if progress is not None and count % progressEvery == 0:
+                    progress.update(count, fin.buffer.tell() / size if size else 1.0)
+        if progress is not None:
+            progress.update(count, 1.0)
+            progress.finish()
+        return counts
+
+
+#function that returns the scorer for these lexicon files, building it only the first time it is asked for
+@functools.lru_cache(maxsize=None)
+def getScorer(positivePath='positive-words.txt', negativePath='negative-words.txt', negationWindow=3):
+    return LexiconScorer(positivePath, negativePath, negationWindow=negationWindow)
@@ -0,0 +1,119 @@
+"""
+Multi-process lexicon scoring of large review files (one review per line).
+
+The input is memory-mapped and cut into byte ranges that end on a newline, so every worker reads its own slice of
+the file straight from the page cache. Each worker compiles the lexicons once, scores its ranges and writes the
+(Text, Sentiment) rows to a part file. The parts are concatenated into Results.csv in input order, and the
+decisions come back as one compact array('b')
+"""
+import contextlib
+import csv
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+from array import array
+
+import lexicon_matcher
+import lexicon_scorer
+
+DEFAULT_RANGE_SIZE = 1 << 24 # bytes per range handed to a worker
+COPY_BUFFER_SIZE = 1 << 20
+
+_scorer = None # the scorer built by each worker process
+
+
+def _initWorker(positivePath:str, negativePath:str, negationWindow:int):
+    global _scorer
+    _scorer = lexicon_scorer.getScorer(positivePath, negativePath, negationWindow)
+
+
+def splitRanges(path:str, rangeSize:int=DEFAULT_RANGE_SIZE) -> list:
+    """
+    Cuts a file into byte ranges of about rangeSize bytes, each ending just after a newline (or at the end of file)
+
+    Returns:
+    list[tuple]: (start, end) byte offsets covering the whole file in order
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    ranges = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = mm.find(b'\n', min(start + rangeSize, size) - 1)
+            end = size if end == -1 else end + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _scoreRange(task:tuple) -> tuple:
+    path, start, end, partPath = task
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    lines = data.split(b'\n')
+    if data.endswith(b'\n'):
+        lines.pop()
+
+    decisions = array('b')
+    score, decide = _scorer.matcher.score, lexicon_matcher.decide
+    with open(partPath, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out, delimiter=',', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+        for line in lines:
+            line = line.decode('utf-8', 'replace').lower().strip()
+            decision = decide(score(line))
+            decisions.append(decision)
+            writer.writerow([line, decision])
+    return partPath, decisions
+
+
+def scoreFileParallel(path:str, outPath:str='Results.csv', workers:int=None, positivePath:str='positive-words.txt', negativePath:str='negative-words.txt', negationWindow:int=3, rangeSize:int=DEFAULT_RANGE_SIZE) -> array:
+    """
+    Scores a file of one review per line in a process pool and writes the same Results.csv as PositiveNegative
+
+    Paramaters:
+    path (str): The reviews, one per line
+    outPath (str): Where the (Text, Sentiment) rows are written, in input order
+    workers (int): Number of worker processes, defaults to the number of CPUs
+    positivePath (str): Positive lexicon file
+    negativePath (str): Negative lexicon file
+    negationWindow (int): How many words after a negator are negated, 0 disables negation
+    rangeSize (int): Approximate number of bytes scored per task
+
+    Returns:
+    array: The decision of every review (1 positive, -1 negative, 0 neutral) as array('b')
+    """
+    workers = workers or os.cpu_count() or 1
+    path = os.path.abspath(path)
+    outPath = os.path.abspath(outPath)
+    decisions = array('b')
+    partDirectory = tempfile.mkdtemp(prefix='lexicon-', dir=os.path.dirname(outPath))
+    try:
+        tasks = [(path, start, end, os.path.join(partDirectory, str(i) + '.part')) for i, (start, end) in enumerate(splitRanges(path, rangeSize))]
+        with open(outPath, 'w', newline='', encoding='utf-8') as out:
+            csv.writer(out, delimiter=',', quotechar='|', quoting=csv.QUOTE_MINIMAL).writerow(['Text', 'Sentiment'])
+        # leaving the pool terminates it, so an error stops the workers instead of waiting for the remaining ranges
+        with open(outPath, 'ab') as out, \
+             (contextlib.nullcontext() if workers == 1 else multiprocessing.Pool(workers, initializer=_initWorker, initargs=(positivePath, negativePath, negationWindow))) as pool:
+            if pool is None:
+                _initWorker(positivePath, negativePath, negationWindow)
+                results = map(_scoreRange, tasks)
+            else:
+                results = pool.imap(_scoreRange, tasks)
+            # imap yields in task order, so each part is appended as soon as it and all parts before it are done
+            for partPath, partDecisions in results:
+                with open(partPath, 'rb') as part:
+                    shutil.copyfileobj(part, out, COPY_BUFFER_SIZE)
+                os.remove(partPath)
+                decisions.extend(partDecisions)
+    finally:
+        shutil.rmtree(partDirectory, ignore_errors=True)
+    return decisions
+
+
+if __name__ == "__main__":
+    decisions = scoreFileParallel('textfile')
+    print(len(decisions), "reviews:", decisions.count(1), "positive,", decisions.count(-1), "negative,", decisions.count(0), "neutral")
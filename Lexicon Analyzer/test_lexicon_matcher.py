@@ -0,0 +1,54 @@
+import pytest
+
+import lexicon_matcher
+import tokenizer
+
+
+@pytest.fixture
+def matcher():
+    positive = [('good',), ('very', 'good'), ('not', 'bad'), ('magaling',)]
+    negative = [('bad',), ('rip', 'off'), ('off',), ('hindi',), ('good', 'for', 'nothing')]
+    return lexicon_matcher.LexiconMatcher(positive, negative, negationWindow=2)
+
+
+def matched(matcher, text):
+    tokens = tokenizer.tokenize(text)
+    return [(' '.join(tokens[start:end + 1]), weight, negated) for start, end, weight, negated in matcher.matchTokens(tokens)]
+
+
+def test_the_longest_overlapping_entry_wins(matcher):
+    assert matched(matcher, "a very good rip off") == [('very good', 1.0, False), ('rip off', -1.0, False)]
+    assert matched(matcher, "it was good for nothing") == [('good for nothing', -1.0, False)]
+    assert matched(matcher, "good for you, off we go") == [('good', 1.0, False), ('off', -1.0, False)]
+
+
+def test_negation_flips_matches_inside_the_window(matcher):
+    assert matched(matcher, "hindi magaling") == [('magaling', -1.0, True)] # the negator is not a hit of its own
+    assert matched(matcher, "never really very good") == [('very good', -1.0, True)]
+    assert matched(matcher, "never was it ever good") == [('good', 1.0, False)] # 4 words after the negator
+    # an entry that starts with a negator is matched as a whole, not negated by its own first word
+    assert matched(matcher, "not bad at all") == [('not bad', 1.0, False)]
+    assert lexicon_matcher.decide(matcher.score("the food is not good, hindi magaling")) == -1
+
+
+def test_without_negation_negators_are_ordinary_words():
+    matcher = lexicon_matcher.LexiconMatcher([('magaling',)], [('hindi',)], negationWindow=0)
+    assert matcher.score("hindi magaling") == lexicon_matcher.LexiconScore(1, 1, 0.0)
+
+
+def test_weights_override_the_lexicon_polarity(tmp_path):
+    positive, negative, weights = tmp_path / 'positive.txt', tmp_path / 'negative.txt', tmp_path / 'weights.tsv'
+    positive.write_text("good\nsulit\n", encoding='utf-8')
+    negative.write_text("bad\nrip-off\n", encoding='utf-8')
+    weights.write_text("# phrase\tweight\nsulit\t3\nnot too bad\t0.5\nbad\t-2\n", encoding='utf-8')
+    assert lexicon_matcher.loadWeights(str(weights)) == {('sulit',): 3.0, ('not', 'too', 'bad'): 0.5, ('bad',): -2.0}
+    matcher = lexicon_matcher.buildMatcher(str(positive), str(negative), weightsPath=str(weights))
+    assert matcher.score("sulit, pero medyo bad") == lexicon_matcher.LexiconScore(1, 1, 1.0)
+    assert matcher.score("not too bad, a rip-off though") == lexicon_matcher.LexiconScore(1, 1, -0.5)
+
+
+def test_scores_add_up_the_matches(matcher):
+    tokens = tokenizer.tokenize("very good, not bad, hindi good at all, rip off")
+    score = matcher.scoreTokens(tokens)
+    assert score == lexicon_matcher.scoreMatches(matcher.matchTokens(tokens)) == lexicon_matcher.LexiconScore(2, 2, 0.0)
+    assert lexicon_matcher.decide(score) == 0
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+import PositiveNegative
+import lexicon_scorer
+import prediction_cache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def lexiconDir(monkeypatch):
+    monkeypatch.chdir(HERE) # run() reads the lexicons from the working directory
+    return HERE
+
+
+def test_run_with_cache_leaves_the_shared_scorer_alone(lexiconDir):
+    cache = prediction_cache.PredictionCache(100)
+    reviews, decisions = PositiveNegative.run('textfile', cache=cache)
+    scorer = lexicon_scorer.getScorer('positive-words.txt', 'negative-words.txt', 3)
+    assert scorer.cache is None
+    assert cache.misses == len(set(reviews))
+    assert PositiveNegative.run('textfile')[1] == decisions # scored without the cache
+    assert PositiveNegative.run('textfile', cache=cache)[1] == decisions
+    assert cache.hits >= len(reviews)
+
+
+def test_cached_decisions_match_uncached(lexiconDir):
+    scorer = lexicon_scorer.LexiconScorer()
+    texts = ["I love this, it is great", "not good at all", "this is bad and awful", "I love this, it is great", "meh"]
+    cache = prediction_cache.PredictionCache(100)
+    assert scorer.decide_many(texts, cache=cache) == scorer.decide_many(texts) == [scorer.decide(text) for text in texts]
+    assert cache.hits == 1 and len(cache) == 4
+
+
+def test_reloading_changed_lexicons_invalidates_the_cache(tmp_path):
+    positive, negative = tmp_path / 'positive.txt', tmp_path / 'negative.txt'
+    positive.write_text("good\n", encoding='utf-8')
+    negative.write_text("bad\n", encoding='utf-8')
+    scorer = lexicon_scorer.LexiconScorer(str(positive), str(negative))
+    assert lexicon_scorer.LexiconScorer(str(positive), str(negative)).version == scorer.version
+    cache = prediction_cache.PredictionCache(10)
+    assert scorer.decide_many(["pretty bad"], cache=cache) == [-1]
+
+    negative.write_text("ugly\n", encoding='utf-8')
+    scorer.reload()
+    assert scorer.decide_many(["pretty bad"], cache=cache) == [0]
+    assert cache.version == scorer.version
+
+
+def test_score_file_counts_and_can_be_cancelled(lexiconDir, tmp_path):
+    background = pytest.importorskip('background')
+    scorer = lexicon_scorer.getScorer()
+    reviews = ["it is great", "this is awful", "meh"] * 4
+    path = tmp_path / 'reviews.txt'
+    path.write_text('\n'.join(reviews) + '\n', encoding='utf-8')
+    outPath = str(tmp_path / 'Results.csv')
+    assert scorer.score_file(str(path), outPath) == {1: 4, -1: 4, 0: 4}
+
+    job = background.BackgroundJob(None)
+    progress = job.reporter("Scoring: ")
+    progress.interval = 0
+    job.cancel()
+    with pytest.raises(background.Cancelled):
+        scorer.score_file(str(path), outPath, progress=progress, progressEvery=5)
+    messages = []
+    while not job.messages.empty():
+        messages.append(job.messages.get())
+    assert messages == [('progress', "Scoring: ", 5, messages[0][3])] # stopped at the first update
+
+
+def test_batch_and_streaming_apis_agree(lexiconDir):
+    scorer = lexicon_scorer.getScorer()
+    assert lexicon_scorer.getScorer() is scorer # built once per set of lexicon files
+    with open('textfile') as f:
+        reviews = [line.lower().strip() for line in f]
+    decisions = [scorer.decide(review) for review in reviews]
+    assert scorer.decide_many(reviews) == scorer.decide_many(reviews, deduplicate=True) == decisions
+
+    consumed = []
+
+    def lines():
+        for review in reviews:
+            consumed.append(review)
+            yield review
+
+    scores = scorer.score_many(lines())
+    assert next(scores) == scorer.score(reviews[0]) and len(consumed) == 1 # one document at a time
+    assert [lexicon_scorer.lexicon_matcher.decide(score) for score in scores] == decisions[1:]
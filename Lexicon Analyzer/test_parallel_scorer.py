@@ -0,0 +1,57 @@
+import csv
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import parallel_scorer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+POSITIVE, NEGATIVE = os.path.join(HERE, 'positive-words.txt'), os.path.join(HERE, 'negative-words.txt')
+REVIEWS = ["It is great", "this is awful", "meh", "not good", "I love it"]
+
+
+@pytest.fixture
+def reviews(tmp_path):
+    path = tmp_path / 'reviews.txt'
+    path.write_text('\n'.join(REVIEWS * 20) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def readResults(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f, delimiter=',', quotechar='|'))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parallel_matches_serial(reviews, tmp_path, workers):
+    serial = parallel_scorer.scoreFileParallel(reviews, str(tmp_path / 'serial.csv'), 1, POSITIVE, NEGATIVE)
+    parallel = parallel_scorer.scoreFileParallel(reviews, str(tmp_path / 'parallel.csv'), workers, POSITIVE, NEGATIVE, rangeSize=64)
+    assert list(parallel) == list(serial) == [1, -1, 0, -1, 1] * 20
+    assert readResults(tmp_path / 'parallel.csv') == readResults(tmp_path / 'serial.csv')
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="the slow task is patched into forked workers")
+def test_an_error_terminates_the_workers(reviews, tmp_path, monkeypatch):
+    scored = tmp_path / 'scored'
+    scored.mkdir()
+    scoreRange = parallel_scorer._scoreRange
+
+    def slowScoreRange(task):
+        time.sleep(0.1)
+        (scored / os.path.basename(task[3])).touch()
+        return scoreRange(task)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    slowScoreRange.__module__, slowScoreRange.__qualname__ = scoreRange.__module__, scoreRange.__qualname__ # pickled by name
+    monkeypatch.setattr(parallel_scorer, '_scoreRange', slowScoreRange)
+    monkeypatch.setattr(parallel_scorer.shutil, 'copyfileobj', fail)
+    numRanges = len(parallel_scorer.splitRanges(reviews, 16))
+    with pytest.raises(OSError):
+        parallel_scorer.scoreFileParallel(reviews, str(tmp_path / 'Results.csv'), 2, POSITIVE, NEGATIVE, rangeSize=16)
+    assert not multiprocessing.active_children()
+    assert len(os.listdir(scored)) < numRanges # the ranges after the error were not scored
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('lexicon-')] # the part files are removed
@@ -3,6 +3,8 @@ import tkinter as tk
 from tkinter import TOP
 from tkinter import END
 from tkinter import BOTTOM
+from tkinter import DISABLED
+from tkinter import NORMAL
 from tkinter import Label
 from tkinter import Button
 from tkinter import Listbox
@@ -10,7 +12,26 @@ from tkinter import Frame
 from tkinter import ttk
 
 import MNB_with_word_frequency
-import main_word_frequency
+import cross_validation
+import pipeline
+import background # from ../Shared, put on sys.path by pipeline
+
+
+# function that runs the classifier on the worker thread, reporting every stage to the job
+def runClassifier(job):
+    with job.stage("Reading training data"):
+        # read and counted once, for the model (if it has to be retrained) and for cross-validation
+        p = MNB_with_word_frequency.Preprocessor()
+        attributeIDs, y, X = MNB_with_word_frequency.importData('training_set.csv', progress=job.reporter("Reading training data: "))
+        countMatrix = p.getTrainingSetMatrix(attributeIDs, X, y)
+        del X
+    with job.stage("Loading or training the model"):
+        nb = MNB_with_word_frequency.loadOrTrain('model.mnb', 'training_set.csv', trainingSetMatrix=countMatrix)
+    with job.stage("Classifying test data"):
+        classCounts = pipeline.classifyFile(nb, 'testing_set.csv', 'Results.csv', progress=job.reporter("Classifying: "))
+    with job.stage("Cross-validating"):
+        report = cross_validation.crossValidate(countMatrix, 10, inverseDocumentFrequency=True, exclude=p.stopWords, progress=job.reporter("Cross-validating: "))
+    return classCounts, report
 
 
 if __name__ == '__main__':
@@ -51,21 +72,63 @@ if __name__ == '__main__':
     label12 = Label(frm1, text="in the same directory", font=('Tahoma 13'))
 
     # for frm2 = Processing Page
-    def Proceed():
-        msg_list.insert(END, "Starting MNB Classifier....")
-        msg_list.insert(END, "Reading training data....")
-        msg_list.insert(END, "Creating Word Dictionary....")
-        msg_list.insert(END, "Reading testing data....")
-        MNB_with_word_frequency.main()
-        msg_list.insert(END, "Classifying test data....")
-        msg_list.insert(END, "Creating output file....")
+    job = None # the running BackgroundJob
+
+    def Finished():
+        btn.config(state=NORMAL)
+        cancel_btn.config(state=DISABLED)
+
+    def ShowResults(result):
+        classCounts, report = result
         msg_list.insert(END, "Results.csv Created")
         msg_list.insert(END, "Classifying Complete")
         msg_list.insert(END, "Please go to Results Page")
+        status.config(text="")
+        rst.delete(0, END)
+        rst.insert(END, "Total number of Data: " + str(sum(classCounts.values())))
+        rst.insert(END, "Classification Results:")
+        for label in sorted(classCounts):
+            rst.insert(END, "    " + str(label) + ": " + str(classCounts[label]))
+        rst.insert(END, "Classifier ACCURACY (10-fold cross-validation): " + str(round(report['accuracy'] * 100, 2)) + "%")
+        for label, metrics in report['perClass'].items():
+            rst.insert(END, "    " + label + ": precision " + str(round(metrics['precision'], 3)) + ", recall " + str(round(metrics['recall'], 3)))
+        Finished()
+
+    def ShowCancelled():
+        msg_list.insert(END, "Classification cancelled")
+        status.config(text="")
+        Finished()
+
+    def ShowError(message):
+        msg_list.insert(END, "Classification failed: " + message)
+        status.config(text="")
+        Finished()
+
+    def Proceed():
+        global job
+        job = background.BackgroundJob(runClassifier).start()
+        btn.config(state=DISABLED)
+        cancel_btn.config(state=NORMAL)
+        msg_list.insert(END, "Starting MNB Classifier....")
+        background.watch(win, job, {
+            'stage': lambda name: msg_list.insert(END, name + "...."),
+            'timing': lambda name, seconds: msg_list.insert(END, name + " done in " + str(round(seconds, 2)) + "s"),
+            'progress': lambda label, rows, fraction: status.config(text=background.formatProgress(label, rows, fraction)),
+            'done': ShowResults,
+            'cancelled': ShowCancelled,
+            'error': ShowError,
+        })
+
+    def Cancel():
+        if job is not None and job.running:
+            job.cancel()
+            msg_list.insert(END, "Cancelling....")
 
     ppg = Label(frm2, text="Data Processing", font=('Tahoma 16 bold'))
     btn = Button(frm2, text="Execute", command= Proceed, font=('Tahoma 16 bold'))
+    cancel_btn = Button(frm2, text="Cancel", command=Cancel, font=('Tahoma 16 bold'), state=DISABLED)
     msg_list = Listbox(frm2, height=10, width=70)
+    status = Label(frm2, text="", font=('Tahoma 13'))
 
     # for frm3 = Results
     lbl1 = Label(frm3, text="Results", font=('Tahoma 16 bold'))
@@ -88,6 +151,8 @@ if __name__ == '__main__':
     ppg.pack(pady=5, side=TOP, anchor="w")
     msg_list.pack(side=TOP, pady=2)
     msg_list.config(font=('Tahoma 16 bold'))
+    status.pack(pady=2, side=TOP, anchor="w")
+    cancel_btn.pack(pady=5, side=BOTTOM, anchor="s")
     btn.pack(pady=5, side=BOTTOM, anchor="s")
     #pack frm3
     lbl1.pack(pady=5, side=TOP, anchor="w")
@@ -96,12 +161,7 @@ if __name__ == '__main__':
 
     #value for processing
 
-    #value for results
-    rst.insert(END, "Total number of Data:", len(main_word_frequency.results))
-    rst.insert(END, "Classification Results:")
-    for item in main_word_frequency.cnt:
-        rst.insert(END,item)
-    rst.insert(END, "For classifier ACCURACY")
-    rst.insert(END, "User's own classification:")
+    #value for results, filled in when a run finishes
+    rst.insert(END, "Press Execute on the Processing Page to classify")
 
     win.mainloop()
\ No newline at end of file
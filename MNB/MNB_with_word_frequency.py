@@ -1,18 +1,61 @@
 import math
 import numpy as np
 import csv
+import json
+import os
 import random
+import struct
+import uuid
+import zlib
 from collections import Counter
 
+import feature_selection
+import parallel
+import pipeline
+import tokenizer # from ../Shared, put on sys.path by pipeline
+import corpus_format
+import corpus_stats
+import dedup
+import instrumentation
+import prediction_cache
+
+MODEL_MAGIC = b'MNBMODEL'
+MODEL_FORMAT_VERSION = 1
+MODEL_ALIGNMENT = 64 # byte alignment of every array in a saved model so it can be viewed in place
+
 
 class NaiveBayesClassifier():
     """
     Implementation of the Multinominal Naive Bayes document classifier
+
+    The model is kept as sufficient statistics (word counts and document counts per class) so that further
+    training batches can be added with partial_fit, the log tables are only rebuilt when a prediction needs them
+
+    With a FeatureHasher the words are hashed into a fixed number of buckets instead of being added to a vocabulary,
+    so the size of the model is set by the number of buckets and not by how many distinct words are seen. A hasher
+    with bigrams (ngrams=2) can only learn from token lists given to partial_fit, word counts carry no bigrams
+
+    mode='complement' scores with the weight-normalized Complement Naive Bayes of Rennie at el. (2003) section 3,
+    which estimates each class from the counts of all the other classes and works best with transformed counts
     """
-    def __init__(self):
-        self._likelihoods = None
-        self._priors = None
+    MODES = ('multinomial', 'complement')
+
+    def __init__(self, alpha:float=1.0, hasher=None, mode:str='multinomial'):
+        if mode not in self.MODES:
+            raise ValueError("Unknown mode '" + mode + "', expected one of " + ", ".join(self.MODES))
+        self.alpha = alpha # Laplace smoothing
+        self.hasher = hasher # FeatureHasher, or None to keep a vocabulary
+        self.mode = mode
         self._classes = [] # unique classes in the training set
+        self._vocabulary = {} # word -> column index into the likelihood matrix, unused when hashing
+        self._classWordCounts = np.zeros((0, 0), dtype=np.float64) # shape (classes, vocabulary)
+        self._classTotals = np.zeros(0, dtype=np.float64) # total number of words seen in each class
+        self._classDocumentCounts = np.zeros(0, dtype=np.float64) # number of training documents of each class
+        self._stale = True # log tables need rebuilding from the counts
+        self._logPriors = None # shape (classes,)
+        self._logLikelihoods = None # shape (classes, vocabulary)
+        self.version = uuid.uuid4().hex # new whenever the counts change, so cached predictions of older counts are dropped
+        self.cache = None # prediction_cache.PredictionCache consulted by classify and predict_many, if set
 
     def fit(self, X:list, y:list, countWordClassDict:dict, countClassDict:dict, wordFrequencyDict:dict):
         """
@@ -25,12 +68,306 @@ class NaiveBayesClassifier():
         countClassDict (dict): contains the total number of words that appear in documents of each class
         wordFrequencyDict (dict): contains the total frequency of a word across all classes 
         """
-        p = Preprocessor()
-        priors = p.calculatePriors(y)
-        likelihoods = p.calculateLikelihoods(countWordClassDict, countClassDict, wordFrequencyDict)
-        for label in countWordClassDict: self._classes.append(label) # set unique classes
-        self._priors = priors
-        self._likelihoods = likelihoods
+        self._checkWordCounts()
+        self._classes = list(countWordClassDict) # set unique classes
+        if self.hasher is None:
+            self._vocabulary = {word: index for index, word in enumerate(wordFrequencyDict)}
+        self._classWordCounts = np.zeros((len(self._classes), self._numFeatures()), dtype=np.float64)
+        for row, label in enumerate(self._classes):
+            for word, count in countWordClassDict[label].items():
+                if word not in wordFrequencyDict:
+                    continue
+                if self.hasher is None:
+                    self._classWordCounts[row, self._vocabulary[word]] = count
+                else:
+                    self._classWordCounts[row, self.hasher.bucket(word)] += count
+        self._classTotals = np.array([countClassDict[label] for label in self._classes], dtype=np.float64)
+        documentCounts = Counter(y)
+        self._classDocumentCounts = np.array([documentCounts[label] for label in self._classes], dtype=np.float64)
+        self._modified()
+
+    @classmethod
+    def fromCounts(cls, classes:list, vocabulary:dict, classWordCounts:np.ndarray, classTotals:np.ndarray, classDocumentCounts:np.ndarray, alpha:float=1.0, mode:str='multinomial'):
+        """
+        Creates a classifier directly from its sufficient statistics
+
+        Paramaters:
+        classes (list[str]): The unique classes, one per row of the count arrays
+        vocabulary (dict): word -> column of classWordCounts
+        classWordCounts (np.ndarray): (classes, vocabulary) word counts per class
+        classTotals (np.ndarray): Total number of words seen in each class
+        classDocumentCounts (np.ndarray): Number of training documents of each class
+        alpha (float): Laplace smoothing
+        mode (str): 'multinomial' or 'complement'
+
+        Returns:
+        NaiveBayesClassifier: The fitted model
+        """
+        model = cls(alpha, mode=mode)
+        model._classes = list(classes)
+        model._vocabulary = vocabulary
+        model._classWordCounts = np.asarray(classWordCounts, dtype=np.float64)
+        model._classTotals = np.asarray(classTotals, dtype=np.float64)
+        model._classDocumentCounts = np.asarray(classDocumentCounts, dtype=np.float64)
+        return model
+
+    def partial_fit(self, X, y:list=None, growVocabulary:bool=True):
+        """
+        Adds a batch of training examples to the model without retraining on the earlier ones
+
+        Paramaters:
+        X (list[list[str]] | DocumentTermMatrix): The documents of the batch, or a labelled count matrix
+        y (list[str]): The class of each document, may be omitted if X is a labelled DocumentTermMatrix
+        growVocabulary (bool): add unseen words to the vocabulary, otherwise they are ignored
+        """
+        if self.hasher is not None:
+            if isinstance(X, DocumentTermMatrix):
+                self._checkWordCounts()
+                buckets = np.array([self.hasher.bucket(word) for word in X.terms], dtype=np.int64)
+                matrix = X.remapColumns(buckets, self.hasher.numBuckets) # colliding words are summed by classWordCounts
+            else:
+                matrix = self.hasher.transform(X)
+            columns = np.arange(self.hasher.numBuckets)
+        elif isinstance(X, DocumentTermMatrix):
+            matrix = X
+            columns = self._addWords(matrix.terms, growVocabulary)
+        else:
+            matrix = DocumentTermMatrix.fromDocuments(X, self._vocabulary, growVocabulary)
+            columns = np.arange(matrix.numColumns)
+        if y is not None:
+            matrix.setLabels(y)
+        counts = matrix.classWordCounts()
+        known = columns >= 0
+        rows = self._addClasses(matrix.classes)
+
+        self._classWordCounts[np.ix_(rows, columns[known])] += counts[:, known]
+        self._classTotals[rows] += counts[:, known].sum(axis=1) # the words left out of the vocabulary are not counted
+        self._classDocumentCounts[rows] += np.bincount(matrix.labelCodes, minlength=len(matrix.classes))
+        self._modified()
+
+    def _checkWordCounts(self):
+        # prediction hashes hasher.features (words and bigrams), so training on word counts alone would leave the
+        # bigram buckets empty
+        if self.hasher is not None and self.hasher.ngrams != 1:
+            raise ValueError("A hasher with ngrams=" + str(self.hasher.ngrams) + " needs the documents, pass token lists to partial_fit")
+
+    def merge(self, other):
+        """
+        Adds the counts learnt by another classifier to this one, e.g. one trained on a different shard of the data
+
+        Paramaters:
+        other (NaiveBayesClassifier): The classifier to merge in
+        """
+        if (self.hasher is None) != (other.hasher is None) or (self.hasher is not None and self.hasher.config() != other.hasher.config()):
+            raise ValueError("Cannot merge classifiers with different feature spaces")
+        rows = self._addClasses(other._classes)
+        if self.hasher is not None:
+            columns = np.arange(self.hasher.numBuckets)
+        else:
+            words = [None] * len(other._vocabulary)
+            for word, column in other._vocabulary.items():
+                words[column] = word
+            columns = self._addWords(words, True)
+        self._classWordCounts[np.ix_(rows, columns)] += other._classWordCounts
+        self._classTotals[rows] += other._classTotals
+        self._classDocumentCounts[rows] += other._classDocumentCounts
+        self._modified()
+
+    def prune_vocabulary(self, words:list):
+        """
+        Restricts the model to the given words, dropping the likelihoods of every other word
+
+        Paramaters:
+        words (list[str]): The words to keep, e.g. from feature_selection.selectVocabulary
+        """
+        if self.hasher is not None:
+            raise ValueError("Cannot prune the vocabulary of a hashed feature space")
+        self._resizeCounts()
+        kept = [word for word in dict.fromkeys(words) if word in self._vocabulary]
+        columns = np.array([self._vocabulary[word] for word in kept], dtype=np.intp)
+        self._classWordCounts = self._classWordCounts[:, columns]
+        self._vocabulary = {word: column for column, word in enumerate(kept)}
+        self._modified()
+
+    def _modified(self):
+        # the counts changed: the log tables must be rebuilt and earlier predictions may no longer hold
+        self._stale = True
+        self.version = uuid.uuid4().hex
+
+    def _addClasses(self, labels:list) -> np.ndarray:
+        """
+        Registers any new classes and grows the count tables to match
+
+        Returns:
+        np.ndarray: The row of each label in the count tables
+        """
+        for label in labels:
+            if label not in self._classes:
+                self._classes.append(label)
+        self._resizeCounts()
+        return np.array([self._classes.index(label) for label in labels], dtype=np.intp)
+
+    def _addWords(self, words:list, growVocabulary:bool) -> np.ndarray:
+        """
+        Looks up (and optionally registers) words in the vocabulary, growing the count tables to match
+
+        Returns:
+        np.ndarray: The column of each word, -1 for unknown words when the vocabulary is not grown
+        """
+        vocabulary = self._vocabulary
+        if growVocabulary:
+            for word in words:
+                if word not in vocabulary:
+                    vocabulary[word] = len(vocabulary)
+        self._resizeCounts()
+        return np.fromiter((vocabulary.get(word, -1) for word in words), dtype=np.intp, count=len(words))
+
+    def _numFeatures(self) -> int:
+        return self.hasher.numBuckets if self.hasher is not None else len(self._vocabulary)
+
+    def _resizeCounts(self):
+        numClasses, numWords = len(self._classes), self._numFeatures()
+        if self._classWordCounts.shape == (numClasses, numWords):
+            if not self._classWordCounts.flags.writeable: # memory-mapped by load(), copy before training further
+                self._classWordCounts = np.array(self._classWordCounts)
+                self._classTotals = np.array(self._classTotals)
+                self._classDocumentCounts = np.array(self._classDocumentCounts)
+            return
+        counts = np.zeros((numClasses, numWords), dtype=np.float64)
+        counts[:self._classWordCounts.shape[0], :self._classWordCounts.shape[1]] = self._classWordCounts
+        self._classWordCounts = counts
+        self._classTotals = np.concatenate([self._classTotals, np.zeros(numClasses - len(self._classTotals))])
+        self._classDocumentCounts = np.concatenate([self._classDocumentCounts, np.zeros(numClasses - len(self._classDocumentCounts))])
+
+    def save(self, path:str):
+        """
+        Writes the fitted model to a versioned binary file that load() can memory-map.
+
+        Layout: MODEL_MAGIC, uint32 version, uint32 header length, a JSON header describing each array
+        (offset, dtype, shape), then the raw arrays, each aligned to MODEL_ALIGNMENT bytes
+
+        Paramaters:
+        path (str): The file to write
+        """
+        self._refresh()
+        words = [None] * len(self._vocabulary)
+        for word, column in self._vocabulary.items():
+            if '\n' in word:
+                raise ValueError("Cannot save a vocabulary word containing a newline: " + repr(word))
+            words[column] = word
+        arrays = {
+            'vocabulary': np.frombuffer('\n'.join(words).encode('utf-8'), dtype=np.uint8),
+            'logPriors': self._logPriors,
+            'logLikelihoods': self._logLikelihoods,
+            'classWordCounts': self._classWordCounts,
+            'classTotals': self._classTotals,
+            'classDocumentCounts': self._classDocumentCounts,
+        }
+        header = {'alpha': self.alpha, 'classes': self._classes, 'numWords': len(words), 'arrays': {}}
+        header['hashing'] = self.hasher.config() if self.hasher is not None else None
+        header['mode'] = self.mode
+        header['version'] = self.version
+        offset = 0
+        for name, array in arrays.items():
+            header['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            offset += -(-array.nbytes // MODEL_ALIGNMENT) * MODEL_ALIGNMENT
+        headerBytes = json.dumps(header).encode('utf-8')
+        dataStart = -(-(len(MODEL_MAGIC) + 8 + len(headerBytes)) // MODEL_ALIGNMENT) * MODEL_ALIGNMENT
+
+        with open(path, 'wb') as f:
+            f.write(MODEL_MAGIC)
+            f.write(struct.pack('<II', MODEL_FORMAT_VERSION, len(headerBytes)))
+            f.write(headerBytes)
+            for name, array in arrays.items():
+                f.write(b'\0' * (dataStart + header['arrays'][name]['offset'] - f.tell()))
+                f.write(np.ascontiguousarray(array).tobytes())
+
+    @classmethod
+    def load(cls, path:str, mmap:bool=True):
+        """
+        Loads a model written by save()
+
+        Paramaters:
+        path (str): The saved model
+        mmap (bool): memory-map the arrays read-only instead of reading them, so processes loading the same file
+                     share one copy of the pages
+
+        Returns:
+        NaiveBayesClassifier: The fitted model
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(MODEL_MAGIC)) != MODEL_MAGIC:
+                raise ValueError(path + " is not a saved NaiveBayesClassifier")
+            version, headerLength = struct.unpack('<II', f.read(8))
+            if version != MODEL_FORMAT_VERSION:
+                raise ValueError("Unsupported model format version " + str(version) + " in " + path)
+            header = json.loads(f.read(headerLength).decode('utf-8'))
+        dataStart = -(-(len(MODEL_MAGIC) + 8 + headerLength) // MODEL_ALIGNMENT) * MODEL_ALIGNMENT
+        if mmap:
+            buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            buffer = np.fromfile(path, dtype=np.uint8)
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            start = dataStart + spec['offset']
+            count = int(np.prod(spec['shape']))
+            arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+
+        model = cls(alpha=header['alpha'], hasher=FeatureHasher(**header['hashing']) if header.get('hashing') else None, mode=header.get('mode', 'multinomial'))
+        model._classes = header['classes']
+        words = bytes(arrays['vocabulary']).decode('utf-8').split('\n') if header['numWords'] else []
+        model._vocabulary = {word: column for column, word in enumerate(words)}
+        model._classWordCounts = arrays['classWordCounts']
+        model._classTotals = arrays['classTotals']
+        model._classDocumentCounts = arrays['classDocumentCounts']
+        model._logPriors = arrays['logPriors']
+        model._logLikelihoods = arrays['logLikelihoods']
+        model._stale = False
+        if header.get('version'):
+            model.version = header['version'] # the same model as when it was saved, its cached predictions still hold
+        return model
+
+    def _refresh(self):
+        """
+        Rebuilds the smoothed log-prior and log-likelihood tables from the counts if they have changed
+        """
+        if not self._stale:
+            return
+        self._resizeCounts()
+        if self.mode == 'complement':
+            # w_ci = log((N_~ci + alpha) / (N_~c + alpha * V)) normalized by sum_i |w_ci|, the class with the smallest
+            # complement score wins so the negated weights are stored and argmax is used as for multinomial scoring
+            complementCounts = self._classWordCounts.sum(axis=0) - self._classWordCounts
+            complementTotals = self._classTotals.sum() - self._classTotals + self.alpha * self._numFeatures()
+            weights = np.log(complementCounts + self.alpha) - np.log(complementTotals)[:, np.newaxis]
+            normalizer = np.abs(weights).sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0] = 1
+            self._logLikelihoods = -weights / normalizer
+            self._logPriors = np.zeros(len(self._classes)) # priors are not used by Complement Naive Bayes
+            self._stale = False
+            return
+        smoothedTotals = self._classTotals + self.alpha * self._numFeatures()
+        with np.errstate(divide='ignore'): # a class without documents gets a prior of log(0)
+            self._logPriors = np.log(self._classDocumentCounts / self._classDocumentCounts.sum())
+        self._logLikelihoods = np.log(self._classWordCounts + self.alpha) - np.log(smoothedTotals)[:, np.newaxis]
+        self._stale = False
+
+    def encode(self, document:list) -> np.ndarray:
+        """
+        Maps the words of a document to their vocabulary indices, dropping unknown words
+
+        Paramaters:
+        document (list): A list of words
+
+        Returns:
+        np.ndarray: Vocabulary index of every known word occurrence in the document
+        """
+        if self.hasher is not None:
+            return self.hasher.encode(document)
+        vocabulary = self._vocabulary
+        return np.fromiter((vocabulary[word] for word in document if word in vocabulary), dtype=np.intp)
 
     def classify(self, document:list) -> str:
         """
@@ -42,17 +379,414 @@ class NaiveBayesClassifier():
         Returns:
         str: The most probable class
         """
-        predictions = []
-        for y in self._classes:
-            probability = math.log(self._priors[y]) # Logging probabilities
-            for word in document:
-                try:
-                    probability = probability + (math.log(self._likelihoods[y][word]) * document.count(word)) # Logging probabilities
-                except:
-                    pass
-            predictions.append((y, probability))
-        predictions = sorted(predictions, key=lambda tup: tup[1], reverse=True) # to get most likely class
-        return predictions[0][0] # return the most probable class
+        if self.cache is not None:
+            return self.cache.predict([document], self.version, lambda documents: [self._classify(documents[0])])[0]
+        return self._classify(document)
+
+    def _classify(self, document:list) -> str:
+        self._refresh()
+        # Each occurrence of a word contributes its log likelihood once, i.e. count * log P(word|class)
+        scores = self._logPriors + self._logLikelihoods[:, self.encode(document)].sum(axis=1)
+        return self._classes[int(np.argmax(scores))] # return the most probable class
+
+    @property
+    def classes(self) -> list:
+        """
+        Returns:
+        list: The unique classes, in the column order used by predict_proba_many
+        """
+        return list(self._classes)
+
+    def joint_log_likelihoods(self, matrix) -> np.ndarray:
+        """
+        Scores documents that are already counted against this model's vocabulary
+
+        Paramaters:
+        matrix (DocumentTermMatrix): Word counts whose columns are this model's vocabulary indices
+
+        Returns:
+        np.ndarray: A (documents, classes) array of log P(class) + log P(document|class)
+        """
+        self._refresh()
+        return matrix.dot(self._logLikelihoods) + self._logPriors
+
+    def _jointLogLikelihoods(self, documents:list) -> np.ndarray:
+        if self.hasher is not None:
+            return self.joint_log_likelihoods(self.hasher.transform(documents))
+        return self.joint_log_likelihoods(DocumentTermMatrix.fromDocuments(documents, self._vocabulary))
+
+    def predict_proba_many(self, documents:list) -> np.ndarray:
+        """
+        Returns the class probabilities for a batch of documents
+
+        Paramaters:
+        documents (list[list[str]]): The documents to classify
+
+        Returns:
+        np.ndarray: A (documents, classes) array of probabilities, columns ordered as self.classes.
+                    In complement mode these are the softmax of the class scores rather than calibrated probabilities
+        """
+        jointLogLikelihoods = self._jointLogLikelihoods(documents)
+        return np.exp(jointLogLikelihoods - logSumExp(jointLogLikelihoods)[:, np.newaxis])
+
+    def predict_many(self, documents:list) -> list:
+        """
+        Returns the most probable class for each document in a batch
+
+        Paramaters:
+        documents (list[list[str]]): The documents to classify
+
+        Returns:
+        list[str]: The most probable class for each document, from self.cache for documents seen before if it is set
+        """
+        if self.cache is not None:
+            return self.cache.predict(documents, self.version, self._predictMany)
+        return self._predictMany(documents)
+
+    def _predictMany(self, documents:list) -> list:
+        jointLogLikelihoods = self._jointLogLikelihoods(documents)
+        return [self._classes[i] for i in np.argmax(jointLogLikelihoods, axis=1)]
+
+    def predict_corpus(self, corpus) -> list:
+        """
+        Returns the most probable class for each document of a compiled corpus (corpus_format.CompiledCorpus)
+
+        Returns:
+        list[str]: The most probable class for each document
+        """
+        if self.hasher is not None:
+            return self.predict_many(list(corpus))
+        jointLogLikelihoods = self.joint_log_likelihoods(DocumentTermMatrix.fromCorpus(corpus, self._vocabulary))
+        return [self._classes[i] for i in np.argmax(jointLogLikelihoods, axis=1)]
+
+
+def logSumExp(scores:np.ndarray) -> np.ndarray:
+    """
+    Computes log(sum(exp(scores))) along each row without overflowing
+
+    Paramaters:
+    scores (np.ndarray): A (rows, columns) array of log values
+
+    Returns:
+    np.ndarray: The log of the summed exponentials for each row
+    """
+    largest = np.max(scores, axis=1, keepdims=True)
+    return (largest + np.log(np.sum(np.exp(scores - largest), axis=1, keepdims=True)))[:, 0]
+
+
+class DocumentTermMatrix():
+    """
+    Compressed sparse row (CSR) matrix of word counts, one row per document.
+    The counts of row i are data[indptr[i]:indptr[i + 1]] in the columns indices[indptr[i]:indptr[i + 1]]
+
+    A training set additionally carries its vocabulary (word -> column), a label for every row and the document IDs
+    """
+    def __init__(self, indptr:np.ndarray, indices:np.ndarray, data:np.ndarray, numColumns:int, vocabulary:dict=None, labels:list=None, documentIDs:list=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.numColumns = numColumns
+        self.vocabulary = vocabulary
+        self.documentIDs = documentIDs
+        self.classes = [] # unique labels in order of first appearance
+        self.labelCodes = None # index into self.classes for every row
+        if labels is not None:
+            self.setLabels(labels)
+
+    @property
+    def numRows(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def terms(self) -> list:
+        """
+        Returns:
+        list[str]: The word of every column
+        """
+        terms = [None] * self.numColumns
+        for word, column in self.vocabulary.items():
+            terms[column] = word
+        return terms
+
+    def setLabels(self, labels:list):
+        """
+        Stores the class of every row as an integer code into self.classes
+
+        Paramaters:
+        labels (list[str]): The class of every row
+        """
+        codes = {}
+        self.labelCodes = np.fromiter((codes.setdefault(label, len(codes)) for label in labels), dtype=np.int32, count=len(labels))
+        self.classes = list(codes)
+
+    def withData(self, data:np.ndarray):
+        """
+        Returns a matrix with the same structure, vocabulary and labels but different stored values
+
+        Paramaters:
+        data (np.ndarray): The new value for every stored entry
+
+        Returns:
+        DocumentTermMatrix: The new matrix, sharing indptr and indices with this one
+        """
+        matrix = DocumentTermMatrix(self.indptr, self.indices, data, self.numColumns, self.vocabulary, documentIDs=self.documentIDs)
+        matrix.classes = self.classes
+        matrix.labelCodes = self.labelCodes
+        return matrix
+
+    @classmethod
+    def fromDocuments(cls, documents:list, vocabulary:dict, growVocabulary:bool=False):
+        """
+        Counts the words of each document against a vocabulary
+
+        Paramaters:
+        documents (list[list[str]]): The documents to count
+        vocabulary (dict): word -> column index, words missing from it are dropped
+        growVocabulary (bool): add unseen words to the vocabulary instead of dropping them
+
+        Returns:
+        DocumentTermMatrix: The word counts of every document
+        """
+        columns = []
+        lengths = np.zeros(len(documents), dtype=np.int64)
+        for row, document in enumerate(documents):
+            before = len(columns)
+            if growVocabulary:
+                for word in document:
+                    column = vocabulary.get(word)
+                    if column is None:
+                        column = vocabulary[word] = len(vocabulary)
+                    columns.append(column)
+            else:
+                columns.extend(vocabulary[word] for word in document if word in vocabulary)
+            lengths[row] = len(columns) - before
+        matrix = cls.fromOccurrences(np.repeat(np.arange(len(documents)), lengths), np.array(columns, dtype=np.int64), len(documents), len(vocabulary))
+        matrix.vocabulary = vocabulary
+        return matrix
+
+    @classmethod
+    def fromOccurrences(cls, rows:np.ndarray, columns:np.ndarray, numRows:int, numColumns:int):
+        """
+        Builds the matrix from one (row, column) pair per word occurrence, summing duplicates
+
+        Paramaters:
+        rows (np.ndarray): Row (document) of each occurrence
+        columns (np.ndarray): Column (word) of each occurrence
+        numRows (int): Number of documents
+        numColumns (int): Size of the vocabulary
+
+        Returns:
+        DocumentTermMatrix: The summed counts
+        """
+        keys, counts = np.unique(rows.astype(np.int64) * max(numColumns, 1) + columns, return_counts=True)
+        keyRows = keys // max(numColumns, 1)
+        indptr = np.zeros(numRows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keyRows, minlength=numRows), out=indptr[1:])
+        return cls(indptr, (keys % max(numColumns, 1)).astype(np.int32), counts.astype(np.float64), numColumns)
+
+    @classmethod
+    def fromCorpus(cls, corpus, vocabulary:dict=None):
+        """
+        Counts a compiled corpus (corpus_format.CompiledCorpus) straight from its token ids, without tokenizing
+
+        Paramaters:
+        corpus (CompiledCorpus): The documents, or a slice of them
+        vocabulary (dict): word -> column index to count against, words missing from it are dropped.
+                           If None the columns are the corpus term ids and the matrix gets the corpus vocabulary
+
+        Returns:
+        DocumentTermMatrix: The word counts of every document, with the corpus labels if it has any
+        """
+        offsets = corpus.offsets
+        rows = np.repeat(np.arange(len(corpus)), np.diff(offsets))
+        columns = corpus.tokens
+        if vocabulary is None:
+            vocabulary = {word: column for column, word in enumerate(corpus.vocabulary)}
+        else:
+            columnMap = np.fromiter((vocabulary.get(word, -1) for word in corpus.vocabulary), dtype=np.int64, count=len(corpus.vocabulary))
+            columns = columnMap[columns]
+            kept = columns >= 0
+            rows, columns = rows[kept], columns[kept]
+        matrix = cls.fromOccurrences(rows, columns, len(corpus), len(vocabulary))
+        matrix.vocabulary = vocabulary
+        if corpus.labelCodes is not None:
+            matrix.classes = list(corpus.classes)
+            matrix.labelCodes = np.asarray(corpus.labelCodes, dtype=np.int32)
+        return matrix
+
+    def rowIndices(self) -> np.ndarray:
+        """
+        Returns:
+        np.ndarray: The row of every stored value
+        """
+        return np.repeat(np.arange(self.numRows), np.diff(self.indptr))
+
+    def dot(self, weights:np.ndarray) -> np.ndarray:
+        """
+        Multiplies the matrix by the transpose of a dense (classes, columns) weight matrix
+
+        Paramaters:
+        weights (np.ndarray): A (classes, columns) array e.g. log likelihoods
+
+        Returns:
+        np.ndarray: A (rows, classes) array where [i, c] = sum_j counts[i, j] * weights[c, j]
+        """
+        rows = self.rowIndices()
+        result = np.empty((self.numRows, weights.shape[0]), dtype=np.float64)
+        for c in range(weights.shape[0]):
+            result[:, c] = np.bincount(rows, weights=weights[c, self.indices] * self.data, minlength=self.numRows)
+        return result
+
+    def selectRows(self, rows:np.ndarray):
+        """
+        Returns the sub-matrix of the given rows, keeping their labels
+
+        Paramaters:
+        rows (np.ndarray): The rows to keep, in the order they should appear
+
+        Returns:
+        DocumentTermMatrix: The selected rows
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        lengths = np.diff(self.indptr)[rows]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        positions = np.repeat(self.indptr[rows] - indptr[:-1], lengths) + np.arange(indptr[-1])
+        matrix = DocumentTermMatrix(indptr, self.indices[positions], self.data[positions], self.numColumns, self.vocabulary)
+        if self.documentIDs is not None:
+            matrix.documentIDs = [self.documentIDs[row] for row in rows]
+        if self.labelCodes is not None:
+            matrix.classes = self.classes
+            matrix.labelCodes = self.labelCodes[rows]
+        return matrix
+
+    def remapColumns(self, columnMap:np.ndarray, numColumns:int):
+        """
+        Moves every column to a new index, dropping the columns mapped to -1
+
+        Paramaters:
+        columnMap (np.ndarray): The new index of every current column, or -1 to drop it
+        numColumns (int): Number of columns after remapping
+
+        Returns:
+        DocumentTermMatrix: The remapped matrix, without a vocabulary
+        """
+        columns = columnMap[self.indices]
+        kept = columns >= 0
+        indptr = np.zeros(self.numRows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.rowIndices()[kept], minlength=self.numRows), out=indptr[1:])
+        matrix = DocumentTermMatrix(indptr, columns[kept].astype(np.int32), self.data[kept], numColumns, documentIDs=self.documentIDs)
+        matrix.classes = self.classes
+        matrix.labelCodes = self.labelCodes
+        return matrix
+
+    def classWordCounts(self) -> np.ndarray:
+        """
+        Sums the rows of each class
+
+        Returns:
+        np.ndarray: A (classes, columns) array of word counts per class, rows ordered as self.classes
+        """
+        keys = self.labelCodes[self.rowIndices()].astype(np.int64) * self.numColumns + self.indices
+        counts = np.bincount(keys, weights=self.data, minlength=len(self.classes) * self.numColumns)
+        return counts.reshape(len(self.classes), self.numColumns)
+
+    def documentFrequency(self) -> np.ndarray:
+        """
+        Returns:
+        np.ndarray: The number of documents each column appears in
+        """
+        return np.bincount(self.indices, minlength=self.numColumns)
+
+class FeatureHasher():
+    """
+    Maps words, and optionally pairs of adjacent words, to one of numBuckets columns with a stable hash (CRC-32)
+    so that a model's memory is fixed no matter how many distinct words it sees. Words that collide share a column
+    """
+    def __init__(self, numBuckets:int=1 << 20, ngrams:int=1):
+        if numBuckets < 1:
+            raise ValueError("numBuckets must be at least 1")
+        if ngrams not in (1, 2):
+            raise ValueError("ngrams must be 1 (words) or 2 (words and bigrams)")
+        self.numBuckets = numBuckets
+        self.ngrams = ngrams
+
+    def config(self) -> dict:
+        """
+        Returns:
+        dict: The keyword arguments that recreate this hasher
+        """
+        return {'numBuckets': self.numBuckets, 'ngrams': self.ngrams}
+
+    def bucket(self, feature:str) -> int:
+        return zlib.crc32(feature.encode('utf-8')) % self.numBuckets
+
+    def features(self, document:list) -> list:
+        """
+        Returns:
+        list[str]: The words of the document followed by its bigrams if ngrams = 2
+        """
+        if self.ngrams == 2:
+            return document + [first + ' ' + second for first, second in zip(document, document[1:])]
+        return document
+
+    def encode(self, document:list) -> np.ndarray:
+        """
+        Returns:
+        np.ndarray: The bucket of every feature occurrence in the document
+        """
+        crc32 = zlib.crc32
+        hashes = np.fromiter((crc32(feature.encode('utf-8')) for feature in self.features(document)), dtype=np.int64)
+        return hashes % self.numBuckets
+
+    def transform(self, documents:list) -> DocumentTermMatrix:
+        """
+        Counts the hashed features of each document
+
+        Paramaters:
+        documents (list[list[str]]): The documents to count
+
+        Returns:
+        DocumentTermMatrix: A (documents, numBuckets) count matrix
+        """
+        encoded = [self.encode(document) for document in documents]
+        lengths = np.fromiter((len(buckets) for buckets in encoded), dtype=np.int64, count=len(encoded))
+        columns = np.concatenate(encoded) if encoded else np.zeros(0, dtype=np.int64)
+        return DocumentTermMatrix.fromOccurrences(np.repeat(np.arange(len(documents)), lengths), columns, len(documents), self.numBuckets)
+
+
+def transformCounts(matrix:DocumentTermMatrix, termFrequency:bool=False, inverseDocumentFrequency:bool=False, length:bool=False, documentFrequency:np.ndarray=None, numDocuments:int=None) -> DocumentTermMatrix:
+    """
+    The transforms of Preprocessor.transform, with the IDF optionally taken from other document statistics than the
+    rows of matrix, e.g. from the training folds only when cross-validating
+
+    Paramaters:
+    matrix (DocumentTermMatrix): The counts to transform
+    termFrequency (bool): d_ij = log(d_ij + 1)
+    inverseDocumentFrequency (bool): d_ij = d_ij * log(documents / documents containing word j)
+    length (bool): d_ij = d_ij / sqrt(sum_k d_ik^2)
+    documentFrequency (np.ndarray): Documents containing each column, matrix.documentFrequency() if None
+    numDocuments (int): Number of documents documentFrequency was counted over, matrix.numRows if None
+
+    Returns:
+    DocumentTermMatrix: The transformed matrix, sharing its structure with matrix
+    """
+    data = matrix.data
+    if termFrequency:
+        data = np.log1p(data)
+    if inverseDocumentFrequency:
+        if documentFrequency is None:
+            documentFrequency, numDocuments = matrix.documentFrequency(), matrix.numRows
+        weights = np.log(numDocuments / np.maximum(documentFrequency, 1))
+        data = data * weights[matrix.indices]
+    if length:
+        rows = matrix.rowIndices()
+        lengths = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=matrix.numRows))
+        lengths[lengths == 0] = 1 # leave all-zero documents unchanged
+        data = data / lengths[rows]
+    return matrix.withData(data)
+
+
 class Preprocessor():
     """
     Preprocesses the training and test data before it is used in model training and classification
@@ -61,7 +795,7 @@ class Preprocessor():
     def __init__(self):
         self.stopWords = self.importStopWords("stopwords.txt")
 
-    def importStopWords(self, path='stopwords.txt')->list:
+    def importStopWords(self, path='stopwords.txt')->frozenset:
         """
         Reads list of common english words from a text files 
 
@@ -69,57 +803,41 @@ class Preprocessor():
         path (str): The path to the .txt file of stopword (one word per line)
 
         Returns:
-        list[str]: A list of stop words
+        frozenset[str]: The stop words, loaded once per process
         """
-        with open('stopwords.txt', encoding='utf8') as f:
-            lines = f.readlines()
-        for i in range(len(lines)):
-            lines[i] = lines[i].replace('\n', '')
-        return lines
+        return tokenizer.loadStopWords(path)
 
-    def getCountWordClassDict(self, trainingSetDict:dict, y:list) -> dict:
+    def getCountWordClassDict(self, trainingSetMatrix:DocumentTermMatrix) -> dict:
         """
         Returns a dictionary containing the unique word frequencies that appear in each class
         e.g. How many times the word x appears across all documents of class y
 
         Paramaters:
-        trainingSetDict (dict) : A dictionary representing the training set 
+        trainingSetMatrix (DocumentTermMatrix) : A matrix representing the training set 
 
         Returns:
         dict: A dictionary of word frequencies for unique words appearing in each class
         """
+        terms = trainingSetMatrix.terms
+        counts = trainingSetMatrix.classWordCounts()
         countWordClassDict = {}
-        for label in y:
-            if label not in countWordClassDict:
-                countWordClassDict[label] = {}
-        for documentID in trainingSetDict.keys():
-            label = list(trainingSetDict[documentID].keys())[0]
-            documentWords = list(trainingSetDict[documentID][label].keys())
-            for word in documentWords:
-                if word not in countWordClassDict[label]:
-                    countWordClassDict[label][word] = trainingSetDict[documentID][label][word]
-                else:
-                    countWordClassDict[label][word] += trainingSetDict[documentID][label][word]
+        for row, label in enumerate(trainingSetMatrix.classes):
+            columns = np.flatnonzero(counts[row])
+            countWordClassDict[label] = dict(zip([terms[column] for column in columns], counts[row, columns].tolist()))
         return countWordClassDict
 
-    def getCountClassDict(self, countWordClassDict:dict)->dict:
+    def getCountClassDict(self, trainingSetMatrix:DocumentTermMatrix)->dict:
         """
         Creates a dictionary that contains the total number of words that appear in documents of each class.
 
         Paramaters:
-        countWordClassDict (dict): Dictionary of frequencies for each word that appears in a class (for each class)
+        trainingSetMatrix (DocumentTermMatrix): A matrix representing the training set
 
         Returns:
         dict: frequencies for each unique word
         """
-        countClassDict = {}
-        for y in countWordClassDict:
-            totalWords = 0
-            for word in countWordClassDict[y]:
-                wordCount = countWordClassDict[y][word]
-                totalWords += wordCount
-            countClassDict[y] = totalWords
-        return countClassDict
+        totals = trainingSetMatrix.classWordCounts().sum(axis=1)
+        return dict(zip(trainingSetMatrix.classes, totals.tolist()))
 
     def calculatePriors(self, y:list)->dict:
         """
@@ -142,81 +860,70 @@ class Preprocessor():
 
         return priors
 
-    def getWordFrequencyDict(self, countWordClassDict:dict) -> dict:
+    def getWordFrequencyDict(self, trainingSetMatrix:DocumentTermMatrix) -> dict:
         """
         Creates a dictionary containing the total frequency of a word across all classes 
 
         Paramaters:
-        countWordClassDict (dict): A dictionary of word frequencies by class
+        trainingSetMatrix (DocumentTermMatrix): A matrix representing the training set
 
         Returns:
         dict: dictionary containing the total frequency of a word across all classes 
         """
-        wordFrequencyDict = {}
-        for y in countWordClassDict:
-            for word in countWordClassDict[y]:
-                if word not in wordFrequencyDict:
-                    wordFrequencyDict[word] = countWordClassDict[y][word]
-                else:
-                    wordFrequencyDict[word] += countWordClassDict[y][word]
-        return wordFrequencyDict
+        totals = np.bincount(trainingSetMatrix.indices, weights=trainingSetMatrix.data, minlength=trainingSetMatrix.numColumns)
+        return dict(zip(trainingSetMatrix.terms, totals.tolist()))
+
+    def transform(self, trainingSetMatrix:DocumentTermMatrix, termFrequency:bool=False, inverseDocumentFrequency:bool=False, length:bool=False) -> DocumentTermMatrix:
+        """
+        Applies any combination of the transforms of section 4 of Rennie at el. (2003) in one vectorized pass over
+        the stored counts, in the paper's order: TF (4.1), IDF (4.2), then length normalization (4.3)
 
-    def transformTermFrequency(self, trainingSetDict:dict) -> dict:
+        Paramaters:
+        trainingSetMatrix (DocumentTermMatrix): training set
+        termFrequency (bool): d_ij = log(d_ij + 1)
+        inverseDocumentFrequency (bool): d_ij = d_ij * log(documents / documents containing word j)
+        length (bool): d_ij = d_ij / sqrt(sum_k d_ik^2)
 
-        for document in trainingSetDict:
-            label = list(trainingSetDict[document].keys())[0]
-            for word in trainingSetDict[document][label]:
-                frequency = trainingSetDict[document][label][word]
-                frequency = math.log(frequency + 1) # TF transform s 4.1 d_ij = log(d_ij + 1)
-                trainingSetDict[document][label][word] = frequency
-        return trainingSetDict
+        Returns:
+        DocumentTermMatrix: Transformed training set, sharing its structure with trainingSetMatrix
+        """
+        return transformCounts(trainingSetMatrix, termFrequency, inverseDocumentFrequency, length)
 
-    def inverseDocumentFrequencyTransform(self, trainingSetDict:dict) -> dict:
+    def transformTermFrequency(self, trainingSetMatrix:DocumentTermMatrix) -> DocumentTermMatrix:
+        """
+        Term frequency transform as described in section 4.1 of Rennie at el. (2003), d_ij = log(d_ij + 1)
+
+        Paramaters:
+        trainingSetMatrix (DocumentTermMatrix): training set
+
+        Returns:
+        DocumentTermMatrix: Transformed training set
+        """
+        return self.transform(trainingSetMatrix, termFrequency=True)
+
+    def inverseDocumentFrequencyTransform(self, trainingSetMatrix:DocumentTermMatrix) -> DocumentTermMatrix:
         """
         Inverse document frequency transform as described in section 4.2 of Rennie at el. (2003)
 
         Paramaters:
-        trainingSetDict (dict): training set
+        trainingSetMatrix (DocumentTermMatrix): training set
 
         Returns:
-        dict: Transformed training set
+        DocumentTermMatrix: Transformed training set
         """
-        wordDocumentFrequencyDict = {}
-        for documentID in trainingSetDict:
-            label = list(trainingSetDict[documentID].keys())[0]
-            for word in trainingSetDict[documentID][label].keys():
-                if word not in wordDocumentFrequencyDict:
-                    wordDocumentFrequencyDict[word] = 1
-                else:
-                    wordDocumentFrequencyDict[word] += 1
-        numDocuments = len(trainingSetDict)
-        for documentID in trainingSetDict:
-            label = list(trainingSetDict[documentID].keys())[0]
-            for word in trainingSetDict[documentID][label].keys():
-                trainingSetDict[documentID][label][word] = trainingSetDict[documentID][label][word] * math.log(numDocuments / wordDocumentFrequencyDict[word])
-        return trainingSetDict
+        return self.transform(trainingSetMatrix, inverseDocumentFrequency=True)
 
-    def transformLength(self, trainingSetDict:dict) -> dict:
+    def transformLength(self, trainingSetMatrix:DocumentTermMatrix) -> DocumentTermMatrix:
         """
         This updates each word frequency by dividing it by the sqrt of the sum of squares for each word
 
         Paramaters:
-        trainingSetDict (dict): training set
+        trainingSetMatrix (DocumentTermMatrix): training set
 
         Returns:
-        dict: Transformed training set
+        DocumentTermMatrix: Transformed training set
         """
-        for documentID in trainingSetDict:
-            label = list(trainingSetDict[documentID].keys())[0]
-            # Calculate document length
-            length = 0
-            for word in trainingSetDict[documentID][label].keys():
-                length += pow(trainingSetDict[documentID][label][word], 2)
-            length = math.sqrt(length)
-            # Normalise document
-            for word in trainingSetDict[documentID][label].keys():
-                trainingSetDict[documentID][label][word] = trainingSetDict[documentID][label][word] / length
-        return trainingSetDict
+        return self.transform(trainingSetMatrix, length=True)
 
     def calculateLikelihoods(self, countWordClassDict:dict, countClassDict:dict, wordFrequencyDict:dict)->dict:
         """
@@ -254,9 +961,8 @@ class Preprocessor():
         Return:
         dict: Cleaned wordFrequencyDict (with stop words removed)
         """
-        for stopWord in self.stopWords:
-            if stopWord in wordFrequencyDict:
-                wordFrequencyDict.pop(stopWord)
+        for stopWord in self.stopWords.intersection(wordFrequencyDict):
+            wordFrequencyDict.pop(stopWord)
         return wordFrequencyDict
 
     def getTopXWords(self, wordFrequencyDict:dict, X:int=1000) -> dict:
@@ -270,17 +976,11 @@ class Preprocessor():
         Returns:
         dict: A dictionary of the top X words
         """
-        topWordsDict = {}
-        while (len(topWordsDict) != X):
-            key = max(wordFrequencyDict, key=lambda word: wordFrequencyDict[word])
-            topWordsDict[key] = wordFrequencyDict[key]
-            wordFrequencyDict.pop(key)
-        return topWordsDict
+        return feature_selection.topItems(wordFrequencyDict, X)
 
-    def getTrainingSetDict(self, attributeIDs:list, X:list, y:list) -> dict:
+    def getTrainingSetMatrix(self, attributeIDs:list, X:list, y:list) -> DocumentTermMatrix:
         """
-        Returns a dictionary of training examples 
-        TrainingSetDic = {attributeID:{class:word:wordCount}}
+        Returns the training examples as a sparse document-term count matrix with a label for every row
 
         Paramaters:
         attributeIDs(list): A list of IDs for each document
@@ -288,24 +988,20 @@ class Preprocessor():
         y (list[str]): A list class labels
 
         Returns:
-        dict: training examples in dict form
+        DocumentTermMatrix: training examples in CSR form
         """
-        trainingSetDict = {}
-        for i in range(len(attributeIDs)):
-            document = X[i]
-            label = y[i]
-            documentId = attributeIDs[i]
-            trainingSetDict[documentId] = {label: {}}
-            for word in document:
-                frequency = document.count(word)
-                trainingSetDict[documentId][label][word] = frequency
-        return trainingSetDict
+        trainingSetMatrix = DocumentTermMatrix.fromDocuments(X, {}, growVocabulary=True)
+        trainingSetMatrix.documentIDs = attributeIDs
+        trainingSetMatrix.setLabels(y)
+        return trainingSetMatrix
 
-def importData(path:str, labelsInSet:bool=True) -> tuple:
+def importData(path:str, labelsInSet:bool=True, deduplicate:bool=False, progress=None) -> tuple:
     """
     Paramaters:
     path (str): A path to the .txt file
     labelsInSet (bool): if the dataset doesn't contain labels set to false
+    deduplicate (bool): Keep only the first row of each cluster of exact or near-duplicate rows (of the same label)
+    progress (pipeline.ProgressReporter): Updated after every chunk read
 
     Returns:
     tuple: A tuple of lists for attributeIDs, features and labels if labelsInSet = True
@@ -314,22 +1010,17 @@ def importData(path:str, labelsInSet:bool=True) -> tuple:
     attributeIDs = []
     labels = []
     features = []
-    with open(path, newline='') as f:
-        reader = csv.reader(f)
-        reader.__next__() # skip the attribute names line
-        for row in reader:
-            if labelsInSet:
-                ID = row[0]
-                label = row[1].upper()
-                words = row[2].lower().split()
-                attributeIDs.append(ID)
-                labels.append(label)
-                features.append(words)
-            else:
-                ID = row[0]
-                words = row[1].lower().split()
-                attributeIDs.append(ID)
-                features.append(words)
+    for IDs, chunkLabels, documents in pipeline.tokenizeChunks(pipeline.readChunks(path, progress=progress), labelsInSet):
+        attributeIDs.extend(IDs)
+        features.extend(documents)
+        if labelsInSet:
+            labels.extend(chunkLabels)
+    if deduplicate:
+        clusters = dedup.Deduplicator().cluster(features, labels if labelsInSet else None)
+        print("Collapsed", clusters.numDuplicates, "duplicate rows into", clusters.numClusters, "documents")
+        attributeIDs, features = clusters.select(attributeIDs), clusters.select(features)
+        if labelsInSet:
+            labels = clusters.select(labels)
     if labelsInSet:
         return attributeIDs, labels, features
     else:
@@ -337,49 +1028,135 @@ def importData(path:str, labelsInSet:bool=True) -> tuple:
 
 
 
-def main():
-    p = Preprocessor()
+def train(path:str='training_set.csv', topK:int=None, scoring:str='frequency', termFrequency:bool=False, inverseDocumentFrequency:bool=True, length:bool=False, mode:str='multinomial', deduplicate:bool=False, compiled:bool=False, progress=None, trainingSetMatrix:DocumentTermMatrix=None) -> NaiveBayesClassifier:
+    """
+    Trains a classifier on a labelled .csv file
 
-    skipTest = False # for main process
+    Paramaters:
+    path (str): The path to the training set
+    topK (int): If set, prune the model to the topK best scoring words
+    scoring (str): How words are ranked for topK, one of feature_selection.SCORERS
+    termFrequency (bool): Apply the TF transform to the training counts
+    inverseDocumentFrequency (bool): Apply the IDF transform to the training counts
+    length (bool): Apply length normalization to the training counts
+    mode (str): 'multinomial' or 'complement' Naive Bayes
+    deduplicate (bool): Count each cluster of duplicate training rows once, see importData
+    compiled (bool): Read the training set from its compiled corpus (compiled on first use, see corpus_format)
+                     instead of parsing and tokenizing the .csv file
+    progress (pipeline.ProgressReporter): Updated while the training set is read
+    trainingSetMatrix (DocumentTermMatrix): The labelled raw counts of the training set if they were already read
+                                            with Preprocessor.getTrainingSetMatrix, path is then not read again
 
+    Returns:
+    NaiveBayesClassifier: The fitted model
+    """
+    p = Preprocessor()
     print("Importing data")
-    attributeIDs, y, X = importData('training_set.csv')
-    testAttributeIDs, X_test = importData('testing_set.csv', labelsInSet=False)
-
+    if trainingSetMatrix is not None:
+        X, y = None, [trainingSetMatrix.classes[code] for code in trainingSetMatrix.labelCodes]
+    elif compiled:
+        with instrumentation.stage('openCorpus') as span:
+            X = corpus_format.openCorpus(path, labelsInSet=True)
+            y = X.labels
+            span.count(len(y))
+        with instrumentation.stage('fromCorpus', len(y)):
+            trainingSetMatrix = DocumentTermMatrix.fromCorpus(X)
+            trainingSetMatrix.documentIDs = X.ids
+        if deduplicate:
+            with instrumentation.stage('deduplicate', len(y)):
+                clusters = dedup.Deduplicator().cluster(list(X), y)
+                trainingSetMatrix, y = trainingSetMatrix.selectRows(clusters.representatives), clusters.select(y)
+    else:
+        with instrumentation.stage('importData') as span:
+            attributeIDs, y, X = importData(path, deduplicate=deduplicate, progress=progress)
+            span.count(len(y))
 
-    
-    # Classify tst.csv
-    if not skipTest:
-        print("Processing training data...")
-        trainingSetDict = p.getTrainingSetDict(attributeIDs, X, y)
-        trainingSetDict = p.inverseDocumentFrequencyTransform(trainingSetDict)  # IDF Extention
-        countWordClassDict = p.getCountWordClassDict(trainingSetDict, y)
-        countClassDict = p.getCountClassDict(countWordClassDict)
-        wordFrequencyDict = p.getWordFrequencyDict(countWordClassDict)
+    print("Processing training data...")
+    if not compiled and trainingSetMatrix is None:
+        with instrumentation.stage('getTrainingSetMatrix', len(y)):
+            trainingSetMatrix = p.getTrainingSetMatrix(attributeIDs, X, y)
+    with instrumentation.stage('transform', trainingSetMatrix.numRows):
+        trainingSetMatrix = p.transform(trainingSetMatrix, termFrequency, inverseDocumentFrequency, length)  # TF, IDF & length Extentions
+    with instrumentation.stage('getCountWordClassDict'):
+        countWordClassDict = p.getCountWordClassDict(trainingSetMatrix)
+    with instrumentation.stage('getCountClassDict'):
+        countClassDict = p.getCountClassDict(trainingSetMatrix)
+    with instrumentation.stage('getWordFrequencyDict'):
+        wordFrequencyDict = p.getWordFrequencyDict(trainingSetMatrix)
+    with instrumentation.stage('removeStopWords', len(wordFrequencyDict)):
         wordFrequencyDict = p.removeStopWords(wordFrequencyDict) # SW Extention
-        
-        print("Classifying test set & outputting to CSV...")
-        nb = NaiveBayesClassifier()
+
+    nb = NaiveBayesClassifier(mode=mode)
+    with instrumentation.stage('fit', len(y)):
         nb.fit(X, y, countWordClassDict, countClassDict, wordFrequencyDict)
-        with open('Results.csv', 'w', newline='') as f:
-                writer = csv.writer(f, delimiter=',',quotechar='|', quoting=csv.QUOTE_MINIMAL)
-                writer.writerow(['ID', 'Sentiment'])
-                for i in range(len(X_test)):
-                    print(str(round(i / len(X_test) * 100, 2)) + "%", end="")
-                    print("\r", end="")
-                    prediction = nb.classify(X_test[i])
-                    ID = testAttributeIDs[i]
-                    writer.writerow([ID, prediction])
-        print("Classification Complete.")
+    if topK is not None:
+        with instrumentation.stage('prune_vocabulary'):
+            nb.prune_vocabulary(feature_selection.selectVocabulary(trainingSetMatrix, topK, scoring, exclude=p.stopWords))
+    return nb
+
+def loadOrTrain(modelPath:str='model.mnb', trainingPath:str='training_set.csv', compiled:bool=False, progress=None, trainingSetMatrix:DocumentTermMatrix=None) -> NaiveBayesClassifier:
+    """
+    Loads the saved model, retraining and saving it first if it is missing or older than the training set
+
+    Paramaters:
+    modelPath (str): Where the fitted model is saved
+    trainingPath (str): The training set the model is built from
+    compiled (bool): Train from the compiled corpus of the training set, see train
+    progress (pipeline.ProgressReporter): Updated while the training set is read, if the model is retrained
+    trainingSetMatrix (DocumentTermMatrix): The raw counts of trainingPath if they were already read, see train
+
+    Returns:
+    NaiveBayesClassifier: The fitted model
+    """
+    if os.path.exists(modelPath) and os.path.getmtime(modelPath) >= os.path.getmtime(trainingPath):
+        print("Loading saved model...")
+        with instrumentation.stage('load model'):
+            return NaiveBayesClassifier.load(modelPath)
+    with instrumentation.stage('train'):
+        nb = train(trainingPath, compiled=compiled, progress=progress, trainingSetMatrix=trainingSetMatrix)
+    with instrumentation.stage('save model'):
+        nb.save(modelPath)
+    return nb
+
+def main(modelPath:str='model.mnb', workers:int=1, deduplicate:bool=False, compiled:bool=False, instrument:instrumentation.Recorder=None, cachePath:str=None) -> dict:
+    skipTest = False # for main process
+
+    # Classify tst.csv, with per stage timings if an instrumentation.Recorder is given
+    if not skipTest:
+        with instrumentation.activate(instrument):
+            with instrumentation.stage('loadOrTrain'):
+                nb = loadOrTrain(modelPath, 'training_set.csv', compiled)
+            if cachePath is not None:
+                # predictions of rows seen in earlier runs are reused while the model is unchanged (single process only)
+                nb.cache = prediction_cache.PredictionCache(path=cachePath)
+
+            print("Classifying test set & outputting to CSV...")
+            with instrumentation.stage('classify test set') as span:
+                if compiled:
+                    corpus = corpus_format.openCorpus('testing_set.csv', labelsInSet=False)
+                    classCounts = pipeline.classifyCorpus(nb, corpus, 'Results.csv', deduplicate=deduplicate)
+                elif workers > 1:
+                    classCounts = parallel.classifyFileParallel(nb, 'testing_set.csv', 'Results.csv', workers, modelPath, deduplicate=deduplicate)
+                else:
+                    classCounts = pipeline.classifyFile(nb, 'testing_set.csv', 'Results.csv', deduplicate=deduplicate)
+                span.count(sum(classCounts.values()))
+            print("Classification Complete.")
+            if nb.cache is not None:
+                nb.cache.save()
+                print("Prediction cache:", nb.cache.stats())
+        return classCounts
 
 '''
 Insert word frequency code here
 '''
-def count_word(file_name):
-    with open(file_name, encoding="utf-8") as f:
-        return Counter(f.read().split())
-
-print("Frequency :", count_word("testing_set.csv"))
+def count_word(file_name, workers=1):
+    # only the text column is counted, the attribute names line, IDs and labels are not words of the corpus
+    return corpus_stats.countFiles([file_name], workers=workers).termFrequency[corpus_stats.ALL]
 
 if __name__ == "__main__":
-    main()
+    # INSTRUMENT=1 prints a per stage table at the end, see instrumentation.fromEnvironment
+    instrument = instrumentation.fromEnvironment()
+    with instrumentation.activate(instrument):
+        with instrumentation.stage('count_word'):
+            print("Frequency :", count_word("testing_set.csv"))
+        main(instrument=instrument)
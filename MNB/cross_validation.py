@@ -0,0 +1,228 @@
+"""
+k-fold cross-validation for the MNB pipeline.
+
+Naive Bayes counts are additive, so the class-word counts of every fold are computed in a single pass over the
+training matrix. The model for fold f is then the global totals minus the counts of fold f, instead of
+re-tokenizing and re-counting the training data k times. The IDF transform is the exception: its weights depend on
+the document frequencies of the training rows, so with IDF every fold re-weights the counts with the document
+frequencies of the other folds (the totals minus its own) and counts its training rows, the model a full retrain on
+those rows would give
+"""
+import time
+import numpy as np
+
+import MNB_with_word_frequency
+
+
+def assignFolds(numRows:int, k:int, seed:int=0) -> np.ndarray:
+    """
+    Randomly assigns every row to one of k folds of (almost) equal size
+
+    Returns:
+    np.ndarray: The fold of every row
+    """
+    folds = np.empty(numRows, dtype=np.int64)
+    folds[np.random.default_rng(seed).permutation(numRows)] = np.arange(numRows) % k
+    return folds
+
+
+def foldCounts(matrix, folds:np.ndarray, k:int) -> tuple:
+    """
+    Counts the words of every (fold, class) pair in one pass
+
+    Paramaters:
+    matrix (DocumentTermMatrix): A labelled training matrix
+    folds (np.ndarray): The fold of every row
+    k (int): Number of folds
+
+    Returns:
+    tuple: (fold, class, word) counts, (fold, class) word totals, (fold, class) document counts
+           and (fold, word) document frequencies
+    """
+    numClasses, numWords = len(matrix.classes), matrix.numColumns
+    rows = matrix.rowIndices()
+    group = folds[rows] * numClasses + matrix.labelCodes[rows]
+    wordCounts = np.bincount(group * numWords + matrix.indices, weights=matrix.data, minlength=k * numClasses * numWords)
+    wordCounts = wordCounts.reshape(k, numClasses, numWords)
+    documentCounts = np.bincount(folds * numClasses + matrix.labelCodes, minlength=k * numClasses).reshape(k, numClasses)
+    documentFrequencies = np.bincount(folds[rows] * numWords + matrix.indices, minlength=k * numWords).reshape(k, numWords)
+    return wordCounts, wordCounts.sum(axis=2), documentCounts, documentFrequencies
+
+
+def scoreReport(trueCodes:np.ndarray, predictedCodes:np.ndarray, classes:list) -> dict:
+    """
+    Computes accuracy, per-class precision/recall/F1 and the confusion matrix
+
+    Paramaters:
+    trueCodes (np.ndarray): The true class index of every document
+    predictedCodes (np.ndarray): The predicted class index of every document
+    classes (list[str]): The class of every index
+
+    Returns:
+    dict: The metrics, confusion[i][j] counts documents of class i predicted as class j
+    """
+    numClasses = len(classes)
+    confusion = np.bincount(trueCodes * numClasses + predictedCodes, minlength=numClasses * numClasses).reshape(numClasses, numClasses)
+    correct = np.diag(confusion)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.nan_to_num(correct / confusion.sum(axis=0))
+        recall = np.nan_to_num(correct / confusion.sum(axis=1))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    perClass = {}
+    for i, label in enumerate(classes):
+        perClass[label] = {'precision': float(precision[i]), 'recall': float(recall[i]), 'f1': float(f1[i]), 'support': int(confusion[i].sum())}
+    return {
+        'accuracy': float(correct.sum() / max(confusion.sum(), 1)),
+        'classes': list(classes),
+        'perClass': perClass,
+        'confusion': confusion.tolist(),
+    }
+
+
+def foldModels(countMatrix, folds:np.ndarray, k:int, termFrequency:bool=False, inverseDocumentFrequency:bool=False, length:bool=False, exclude=(), alpha:float=1.0, mode:str='multinomial'):
+    """
+    Builds the model of every fold from the rows of the other folds, transformed as train() transforms a training set
+
+    Paramaters:
+    countMatrix (DocumentTermMatrix): Raw word counts of the labelled training set
+    folds (np.ndarray): The fold of every row
+    k (int): Number of folds
+    termFrequency (bool): Apply the TF transform
+    inverseDocumentFrequency (bool): Apply the IDF transform, with the document frequencies of the training rows
+    length (bool): Apply length normalization
+    exclude (iterable[str]): Words left out of the model e.g. stop words
+    alpha (float): Laplace smoothing
+    mode (str): 'multinomial' or 'complement' Naive Bayes
+
+    Returns:
+    generator: (fold, NaiveBayesClassifier, the countMatrix column of every model word) for every fold in order,
+               the counts shared by the folds are made before it is returned and each model when it is reached
+    """
+    transform = MNB_with_word_frequency.transformCounts
+    # TF and length normalization only look at their own row, so without IDF the counts are transformed once
+    trainingMatrix = countMatrix if inverseDocumentFrequency else transform(countMatrix, termFrequency, False, length)
+    wordCounts, classTotals, documentCounts, documentFrequencies = foldCounts(trainingMatrix, folds, k)
+    totalWordCounts, totalClassTotals = wordCounts.sum(axis=0), classTotals.sum(axis=0)
+    totalDocumentCounts, totalDocumentFrequencies = documentCounts.sum(axis=0), documentFrequencies.sum(axis=0)
+    foldSizes = np.bincount(folds, minlength=k)
+    allowed = np.ones(countMatrix.numColumns, dtype=bool)
+    allowed[[countMatrix.vocabulary[word] for word in exclude if word in countMatrix.vocabulary]] = False
+    terms = countMatrix.terms
+    numClasses, numWords = len(countMatrix.classes), countMatrix.numColumns
+    rows = countMatrix.rowIndices()
+    cells = countMatrix.labelCodes[rows] * numWords + countMatrix.indices # (class, word) cell of every stored count
+
+    def foldModel(fold:int) -> tuple:
+        trainingDocumentFrequencies = totalDocumentFrequencies - documentFrequencies[fold]
+        if inverseDocumentFrequency:
+            weighted = transform(countMatrix, termFrequency, True, length, trainingDocumentFrequencies, countMatrix.numRows - foldSizes[fold])
+            training = folds[rows] != fold
+            trainingWordCounts = np.bincount(cells[training], weights=weighted.data[training], minlength=numClasses * numWords).reshape(numClasses, numWords)
+            trainingClassTotals = trainingWordCounts.sum(axis=1)
+        else:
+            trainingWordCounts, trainingClassTotals = totalWordCounts - wordCounts[fold], totalClassTotals - classTotals[fold]
+        # the fold's model only knows the words seen in the other folds
+        kept = np.flatnonzero(allowed & (trainingDocumentFrequencies > 0))
+        model = MNB_with_word_frequency.NaiveBayesClassifier.fromCounts(
+            countMatrix.classes,
+            {terms[column]: i for i, column in enumerate(kept)},
+            trainingWordCounts[:, kept],
+            trainingClassTotals,
+            totalDocumentCounts - documentCounts[fold],
+            alpha,
+            mode)
+        return fold, model, kept
+
+    return (foldModel(fold) for fold in range(k))
+
+
+def crossValidate(countMatrix, k:int=10, termFrequency:bool=False, inverseDocumentFrequency:bool=False, length:bool=False, exclude=(), seed:int=0, alpha:float=1.0, mode:str='multinomial', progress=None) -> dict:
+    """
+    k-fold cross-validation of NaiveBayesClassifier on a labelled count matrix
+
+    Paramaters:
+    countMatrix (DocumentTermMatrix): Raw word counts of the labelled training set
+    k (int): Number of folds
+    termFrequency (bool): Apply the TF transform to the training rows of every fold
+    inverseDocumentFrequency (bool): Apply the IDF transform, weighted by the training rows of every fold
+    length (bool): Apply length normalization to the training rows of every fold
+    exclude (iterable[str]): Words left out of the model e.g. stop words
+    seed (int): Seed of the fold assignment
+    alpha (float): Laplace smoothing
+    mode (str): 'multinomial' or 'complement' Naive Bayes
+    progress (pipeline.ProgressReporter): Updated after every fold with the number of held-out documents scored so
+                                          far, e.g. a background.JobProgress that stops the run when it is cancelled
+
+    Held-out documents are always scored on their raw counts as in main()
+
+    Returns:
+    dict: scoreReport of the pooled held-out predictions plus per-fold accuracy and timing in seconds
+    """
+    started = time.perf_counter()
+    folds = assignFolds(countMatrix.numRows, k, seed)
+    models = foldModels(countMatrix, folds, k, termFrequency, inverseDocumentFrequency, length, exclude, alpha, mode)
+    countTime = time.perf_counter() - started
+
+    predictedCodes = np.empty(countMatrix.numRows, dtype=np.int64)
+    foldReports = []
+    for fold in range(k):
+        foldStarted = time.perf_counter()
+        fold, model, kept = next(models)
+        trainTime = time.perf_counter() - foldStarted
+
+        heldOut = np.flatnonzero(folds == fold)
+        columnMap = np.full(countMatrix.numColumns, -1, dtype=np.int64)
+        columnMap[kept] = np.arange(len(kept))
+        testMatrix = countMatrix.selectRows(heldOut).remapColumns(columnMap, len(kept))
+        predictedCodes[heldOut] = np.argmax(model.joint_log_likelihoods(testMatrix), axis=1)
+        predictTime = time.perf_counter() - foldStarted - trainTime
+
+        accuracy = float(np.mean(predictedCodes[heldOut] == countMatrix.labelCodes[heldOut])) if len(heldOut) else 0.0
+        foldReports.append({'fold': fold, 'size': int(len(heldOut)), 'accuracy': accuracy, 'trainTime': trainTime, 'predictTime': predictTime})
+        if progress is not None:
+            progress.update(sum(report['size'] for report in foldReports), (fold + 1) / k)
+    if progress is not None:
+        progress.finish()
+
+    report = scoreReport(countMatrix.labelCodes.astype(np.int64), predictedCodes, countMatrix.classes)
+    report['folds'] = foldReports
+    report['timing'] = {'count': countTime, 'total': time.perf_counter() - started}
+    return report
+
+
+def evaluateFile(path:str='training_set.csv', k:int=10, seed:int=0, termFrequency:bool=False, inverseDocumentFrequency:bool=True, length:bool=False, mode:str='multinomial') -> dict:
+    """
+    Cross-validates the same pipeline train() builds (IDF transform by default, stop words removed) on a labelled
+    .csv file
+
+    Returns:
+    dict: The crossValidate report
+    """
+    p = MNB_with_word_frequency.Preprocessor()
+    attributeIDs, y, X = MNB_with_word_frequency.importData(path)
+    countMatrix = p.getTrainingSetMatrix(attributeIDs, X, y)
+    return crossValidate(countMatrix, k, termFrequency, inverseDocumentFrequency, length, p.stopWords, seed, mode=mode)
+
+
+def formatReport(report:dict) -> str:
+    """
+    Returns:
+    str: The report as a plain text table
+    """
+    lines = ["Accuracy: " + str(round(report['accuracy'] * 100, 2)) + "%", ""]
+    lines.append("{:<10}{:>10}{:>10}{:>10}{:>10}".format("Class", "Precision", "Recall", "F1", "Support"))
+    for label, metrics in report['perClass'].items():
+        lines.append("{:<10}{:>10.3f}{:>10.3f}{:>10.3f}{:>10}".format(label, metrics['precision'], metrics['recall'], metrics['f1'], metrics['support']))
+    lines.append("")
+    lines.append("Confusion matrix (rows = true class, columns = predicted):")
+    lines.append(" " * 10 + "".join("{:>10}".format(label) for label in report['classes']))
+    for label, row in zip(report['classes'], report['confusion']):
+        lines.append("{:<10}".format(label) + "".join("{:>10}".format(count) for count in row))
+    lines.append("")
+    timing = report['timing']
+    lines.append("Counted folds in " + str(round(timing['count'], 4)) + "s, total " + str(round(timing['total'], 4)) + "s for " + str(len(report['folds'])) + " folds")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(formatReport(evaluateFile()))
@@ -0,0 +1,117 @@
+import heapq
+import numpy as np
+
+# Term scoring functions by name, each takes a labelled DocumentTermMatrix and returns one score per column
+SCORERS = {}
+
+
+def registerScorer(name:str):
+    """
+    Decorator that makes a term scoring function available to selectTopTerms under the given name
+
+    Paramaters:
+    name (str): The name passed as selectTopTerms(scoring=name)
+    """
+    def register(scorer):
+        SCORERS[name] = scorer
+        return scorer
+    return register
+
+
+@registerScorer('frequency')
+def frequencyScores(matrix) -> np.ndarray:
+    """
+    Total count of each term across the corpus
+    """
+    return np.bincount(matrix.indices, weights=matrix.data, minlength=matrix.numColumns)
+
+
+@registerScorer('document_frequency')
+def documentFrequencyScores(matrix) -> np.ndarray:
+    """
+    Number of documents each term appears in
+    """
+    return matrix.documentFrequency().astype(np.float64)
+
+
+@registerScorer('chi2')
+def chiSquareScores(matrix) -> np.ndarray:
+    """
+    Chi-square statistic between each term's counts and the class, summed over classes
+    """
+    observed = matrix.classWordCounts()
+    classProbabilities = np.bincount(matrix.labelCodes, minlength=len(matrix.classes)) / matrix.numRows
+    expected = np.outer(classProbabilities, observed.sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+    return scores.sum(axis=0)
+
+
+@registerScorer('mutual_information')
+def mutualInformationScores(matrix) -> np.ndarray:
+    """
+    Mutual information between the presence of each term in a document and the document's class
+    """
+    numDocuments = matrix.numRows
+    # documents of each class containing each term, shape (classes, terms)
+    present = matrix.withData(np.ones_like(matrix.data)).classWordCounts()
+    classDocuments = np.bincount(matrix.labelCodes, minlength=len(matrix.classes)).astype(np.float64)[:, np.newaxis]
+    absent = classDocuments - present
+    termDocuments = present.sum(axis=0)
+
+    scores = np.zeros(matrix.numColumns)
+    for joint, marginal in ((present, termDocuments), (absent, numDocuments - termDocuments)):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = joint / numDocuments * np.log(joint * numDocuments / (classDocuments * marginal))
+        scores += np.where(joint > 0, terms, 0.0).sum(axis=0)
+    return scores
+
+
+def selectTopTerms(matrix, k:int, scoring:str='frequency', exclude=()) -> np.ndarray:
+    """
+    Finds the k best scoring columns of a document-term matrix in O(V + k log k)
+
+    Paramaters:
+    matrix (DocumentTermMatrix): A labelled training matrix
+    k (int): Number of terms to keep
+    scoring (str): One of the names in SCORERS
+    exclude (iterable[str]): Words that must not be selected e.g. stop words
+
+    Returns:
+    np.ndarray: The selected column indices, best first
+    """
+    if scoring not in SCORERS:
+        raise ValueError("Unknown scoring '" + scoring + "', expected one of " + ", ".join(SCORERS))
+    scores = np.asarray(SCORERS[scoring](matrix), dtype=np.float64).copy()
+    excluded = [matrix.vocabulary[word] for word in exclude if word in matrix.vocabulary]
+    scores[excluded] = -np.inf
+    k = min(k, matrix.numColumns - len(excluded))
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def selectVocabulary(matrix, k:int, scoring:str='frequency', exclude=()) -> list:
+    """
+    Same as selectTopTerms but returns the words instead of the column indices
+
+    Returns:
+    list[str]: The selected words, best first
+    """
+    terms = matrix.terms
+    return [terms[column] for column in selectTopTerms(matrix, k, scoring, exclude)]
+
+
+def topItems(frequencyDict:dict, k:int) -> dict:
+    """
+    Returns the k entries with the largest values without modifying the dictionary, in O(V log k)
+
+    Paramaters:
+    frequencyDict (dict): word -> frequency
+    k (int): Number of entries to keep
+
+    Returns:
+    dict: The top k entries, largest first
+    """
+    return {word: frequencyDict[word] for word in heapq.nlargest(k, frequencyDict, key=frequencyDict.get)}
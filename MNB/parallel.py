@@ -0,0 +1,88 @@
+"""
+Multi-process classification. The fitted model is saved once and every worker memory-maps the same file
+(NaiveBayesClassifier.load(mmap=True)), so the likelihood matrix is shared through the page cache instead of
+being pickled to each process. Chunks are handed out in order and their results are yielded in the same order
+"""
+import collections
+import multiprocessing
+import os
+import tempfile
+
+import pipeline
+
+_model = None # the classifier loaded by each worker process
+_deduplicator = None
+
+
+def _initWorker(modelPath:str, deduplicate:bool=False):
+    global _model, _deduplicator
+    import MNB_with_word_frequency
+    _model = MNB_with_word_frequency.NaiveBayesClassifier.load(modelPath, mmap=True)
+    _deduplicator = pipeline.dedup.Deduplicator() if deduplicate else None
+
+
+def _classifyRows(rows:list) -> tuple:
+    IDs = [row[0] for row in rows]
+    documents = [pipeline.tokenize(row[1]) for row in rows]
+    return IDs, pipeline.predictDocuments(_model, documents, _deduplicator)
+
+
+def classifyChunksParallel(nb, chunks, workers:int=None, modelPath:str=None, deduplicate:bool=False):
+    """
+    Tokenizes and classifies chunks of unlabelled (id, text) rows in a process pool
+
+    Paramaters:
+    nb (NaiveBayesClassifier): A fitted classifier
+    chunks (iterable[list[list[str]]]): Chunks of .csv rows e.g. from pipeline.readChunks
+    workers (int): Number of worker processes, defaults to the number of CPUs
+    modelPath (str): A file nb is already saved to, if None it is saved to a temporary file for the run
+    deduplicate (bool): Classify exact and near-duplicate rows of a chunk once, see pipeline.predictDocuments
+
+    Yields:
+    tuple: (IDs, predictions) for each chunk, in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    temporaryPath = None
+    if modelPath is None:
+        handle, temporaryPath = tempfile.mkstemp(suffix='.mnb')
+        os.close(handle)
+        nb.save(temporaryPath)
+        modelPath = temporaryPath
+    try:
+        with multiprocessing.Pool(workers, initializer=_initWorker, initargs=(modelPath, deduplicate)) as pool:
+            # Keep a bounded number of chunks in flight so memory stays constant if the writer falls behind
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_classifyRows, (chunk,)))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+    finally:
+        if temporaryPath is not None:
+            os.remove(temporaryPath)
+
+
+def classifyFileParallel(nb, inputPath:str, outputPath:str='Results.csv', workers:int=None, modelPath:str=None, chunkSize:int=pipeline.DEFAULT_CHUNK_SIZE, showProgress:bool=True, deduplicate:bool=False) -> dict:
+    """
+    Same as pipeline.classifyFile but classifies the chunks in a process pool, the output keeps the input order
+
+    Paramaters:
+    nb (NaiveBayesClassifier): A fitted classifier
+    inputPath (str): The .csv file of (id, text) rows to classify
+    outputPath (str): Where the (ID, Sentiment) rows are written
+    workers (int): Number of worker processes, defaults to the number of CPUs
+    modelPath (str): A file nb is already saved to, if None it is saved to a temporary file for the run
+    chunkSize (int): Number of rows per chunk sent to a worker
+    showProgress (bool): Print throttled progress while running
+    deduplicate (bool): Classify exact and near-duplicate rows of a chunk once, see pipeline.predictDocuments
+
+    Returns:
+    dict: The number of documents classified as each class
+    """
+    progress = pipeline.ProgressReporter("Classifying: ") if showProgress else None
+    chunks = pipeline.readChunks(inputPath, chunkSize, progress)
+    classCounts = pipeline.writeResults(outputPath, classifyChunksParallel(nb, chunks, workers, modelPath, deduplicate))
+    if progress is not None:
+        progress.finish()
+    return classCounts
@@ -0,0 +1,252 @@
+"""
+Generator based pipeline that streams a .csv file through tokenizing, classification and writing in fixed size
+chunks, so memory use depends on the chunk size and not on the size of the input
+
+    readChunks -> tokenizeChunks -> classifyChunks -> writeResults
+    readChunks -> tokenizeChunks -> trainChunks
+"""
+import csv
+import itertools
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Shared'))
+import dedup
+import instrumentation
+import tokenizer
+
+DEFAULT_CHUNK_SIZE = 10000 # rows per chunk
+WRITE_BUFFER_SIZE = 1 << 20 # bytes
+
+
+class ProgressReporter():
+    """
+    Prints the progress of a run on one line, at most once every interval seconds
+    """
+    def __init__(self, label:str='', interval:float=0.5, stream=sys.stdout):
+        self.label = label
+        self.interval = interval
+        self.stream = stream
+        self.rows = 0
+        self.fraction = 0.0
+        self._started = time.perf_counter()
+        self._lastPrinted = 0.0
+
+    def update(self, rows:int, fraction:float=None):
+        """
+        Records progress, printing it if the last print was more than interval seconds ago
+
+        Paramaters:
+        rows (int): Number of rows processed so far
+        fraction (float): Fraction of the input processed so far, if known
+        """
+        self.rows = rows
+        if fraction is not None:
+            self.fraction = fraction
+        now = time.perf_counter()
+        if now - self._lastPrinted >= self.interval:
+            self._lastPrinted = now
+            self._print()
+
+    def finish(self):
+        self.fraction = 1.0
+        self._print()
+        print(file=self.stream)
+
+    def _print(self):
+        elapsed = time.perf_counter() - self._started
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        print("\r" + self.label + str(round(self.fraction * 100, 2)) + "% (" + str(self.rows) + " rows, " + str(round(rate)) + " rows/s)", end="", file=self.stream)
+
+
+def readChunks(path:str, chunkSize:int=DEFAULT_CHUNK_SIZE, progress:ProgressReporter=None):
+    """
+    Reads a .csv file in chunks of rows, skipping the attribute names line
+
+    Paramaters:
+    path (str): A path to the .csv file
+    chunkSize (int): Number of rows per chunk
+    progress (ProgressReporter): Updated after every chunk
+
+    Yields:
+    list[list[str]]: The next chunk of rows
+    """
+    size = os.path.getsize(path)
+    rowsRead = 0
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None) # skip the attribute names line
+        while True:
+            with instrumentation.stage('read', 0) as span:
+                chunk = list(itertools.islice(reader, chunkSize))
+                span.count(len(chunk))
+            if not chunk:
+                break
+            rowsRead += len(chunk)
+            if progress is not None:
+                progress.update(rowsRead, f.buffer.tell() / size if size and len(chunk) == chunkSize else 1.0)
+            yield chunk
+
+
+def tokenize(text:str) -> list:
+    """
+    Splits a document into lower case words with the tokenizer shared with the Lexicon Analyzer
+    """
+    return tokenizer.tokenize(text)
+
+
+def tokenizeChunks(chunks, labelsInSet:bool=True):
+    """
+    Splits each row of each chunk into its ID, label and words
+
+    Paramaters:
+    chunks (iterable[list[list[str]]]): Chunks of .csv rows
+    labelsInSet (bool): if the rows don't contain labels set to false
+
+    Yields:
+    tuple: (IDs, labels, documents) for the chunk, labels is None if labelsInSet = False
+    """
+    for chunk in chunks:
+        with instrumentation.stage('tokenize', len(chunk)):
+            if labelsInSet:
+                tokenized = [row[0] for row in chunk], [row[1].upper() for row in chunk], [tokenize(row[2]) for row in chunk]
+            else:
+                tokenized = [row[0] for row in chunk], None, [tokenize(row[1]) for row in chunk]
+        yield tokenized
+
+
+def trainChunks(nb, chunks):
+    """
+    Adds each labelled chunk to the classifier with partial_fit, so training memory is bounded by the chunk size
+    (and by the number of buckets if nb hashes its features)
+
+    Paramaters:
+    nb (NaiveBayesClassifier): The classifier to train
+    chunks (iterable[tuple]): (IDs, labels, documents) chunks from tokenizeChunks
+
+    Returns:
+    NaiveBayesClassifier: nb
+    """
+    for IDs, labels, documents in chunks:
+        nb.partial_fit(documents, labels)
+    return nb
+
+
+def classifyChunks(nb, chunks, deduplicator=None):
+    """
+    Classifies each tokenized chunk with one batch prediction
+
+    Paramaters:
+    nb (NaiveBayesClassifier): A fitted classifier
+    chunks (iterable[tuple]): (IDs, labels, documents) chunks from tokenizeChunks
+    deduplicator (dedup.Deduplicator): If given, duplicates within a chunk are classified once per cluster
+
+    Yields:
+    tuple: (IDs, predictions) for the chunk
+    """
+    for IDs, labels, documents in chunks:
+        with instrumentation.stage('classify', len(documents)):
+            predictions = predictDocuments(nb, documents, deduplicator)
+        yield IDs, predictions
+
+
+def predictDocuments(nb, documents:list, deduplicator=None) -> list:
+    """
+    Returns:
+    list[str]: nb.predict_many(documents), computed once per cluster of duplicates if deduplicator is given
+    """
+    if deduplicator is None:
+        return nb.predict_many(documents)
+    clusters = deduplicator.cluster(documents)
+    return clusters.expand(nb.predict_many(clusters.select(documents)))
+
+
+def writeResults(path:str, chunks, header:list=('ID', 'Sentiment')) -> dict:
+    """
+    Writes classified chunks to a .csv file through a large write buffer
+
+    Paramaters:
+    path (str): The output file
+    chunks (iterable[tuple]): (IDs, predictions) chunks from classifyChunks
+    header (list): The attribute names line
+
+    Returns:
+    dict: The number of documents written for each class
+    """
+    classCounts = {}
+    with open(path, 'w', newline='', buffering=WRITE_BUFFER_SIZE) as f:
+        writer = csv.writer(f, delimiter=',', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(header)
+        for IDs, predictions in chunks:
+            with instrumentation.stage('write', len(predictions)):
+                writer.writerows(zip(IDs, predictions))
+                for prediction in predictions:
+                    classCounts[prediction] = classCounts.get(prediction, 0) + 1
+    return classCounts
+
+
+def classifyFile(nb, inputPath:str, outputPath:str='Results.csv', chunkSize:int=DEFAULT_CHUNK_SIZE, showProgress:bool=True, deduplicate:bool=False, progress:ProgressReporter=None) -> dict:
+    """
+    Streams an unlabelled .csv file through the classifier into a results .csv file
+
+    Paramaters:
+    nb (NaiveBayesClassifier): A fitted classifier
+    inputPath (str): The .csv file of (id, text) rows to classify
+    outputPath (str): Where the (ID, Sentiment) rows are written
+    chunkSize (int): Number of rows classified per batch
+    showProgress (bool): Print throttled progress while running
+    deduplicate (bool): Classify exact and near-duplicate rows of a chunk once and copy the prediction to the others
+    progress (ProgressReporter): Reports the progress instead of the printing reporter of showProgress
+
+    Returns:
+    dict: The number of documents classified as each class
+    """
+    if progress is None and showProgress:
+        progress = ProgressReporter("Classifying: ")
+    chunks = readChunks(inputPath, chunkSize, progress)
+    deduplicator = dedup.Deduplicator() if deduplicate else None
+    classCounts = writeResults(outputPath, classifyChunks(nb, tokenizeChunks(chunks, labelsInSet=False), deduplicator))
+    if progress is not None:
+        progress.finish()
+    return classCounts
+
+
+def classifyCorpus(nb, corpus, outputPath:str='Results.csv', chunkSize:int=DEFAULT_CHUNK_SIZE, showProgress:bool=True, deduplicate:bool=False, progress:ProgressReporter=None) -> dict:
+    """
+    Same as classifyFile for a compiled corpus (corpus_format.CompiledCorpus): the token ids are counted straight from
+    the memory-mapped arrays, no .csv parsing or tokenizing
+
+    Paramaters:
+    nb (NaiveBayesClassifier): A fitted classifier
+    corpus (CompiledCorpus): The documents to classify
+    outputPath (str): Where the (ID, Sentiment) rows are written
+    chunkSize (int): Number of documents classified per batch
+    showProgress (bool): Print throttled progress while running
+    deduplicate (bool): Classify exact and near-duplicate documents of a chunk once, see predictDocuments
+    progress (ProgressReporter): Reports the progress instead of the printing reporter of showProgress
+
+    Returns:
+    dict: The number of documents classified as each class
+    """
+    if progress is None and showProgress:
+        progress = ProgressReporter("Classifying: ")
+    deduplicator = dedup.Deduplicator() if deduplicate else None
+
+    def chunks():
+        done = 0
+        for chunk in corpus.chunks(chunkSize):
+            with instrumentation.stage('classify', len(chunk)):
+                if deduplicator is None:
+                    predictions = nb.predict_corpus(chunk)
+                else:
+                    predictions = predictDocuments(nb, list(chunk), deduplicator)
+            done += len(chunk)
+            if progress is not None:
+                progress.update(done, done / len(corpus))
+            yield chunk.ids, predictions
+
+    classCounts = writeResults(outputPath, chunks())
+    if progress is not None:
+        progress.finish()
+    return classCounts
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+
+import MNB_with_word_frequency
+import cross_validation
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def preprocessor(monkeypatch):
+    monkeypatch.chdir(HERE) # the Preprocessor reads stopwords.txt from the working directory
+    return MNB_with_word_frequency.Preprocessor()
+
+
+@pytest.fixture
+def trainingSet(preprocessor):
+    attributeIDs, y, X = MNB_with_word_frequency.importData(os.path.join(HERE, 'training_set.csv'))
+    return attributeIDs, y, X
+
+
+def retrain(preprocessor, attributeIDs, y, X, rows, termFrequency, inverseDocumentFrequency, length):
+    # the model train() builds from the given rows only
+    matrix = preprocessor.getTrainingSetMatrix([attributeIDs[i] for i in rows], [X[i] for i in rows], [y[i] for i in rows])
+    matrix = preprocessor.transform(matrix, termFrequency, inverseDocumentFrequency, length)
+    nb = MNB_with_word_frequency.NaiveBayesClassifier()
+    nb.fit([X[i] for i in rows], [y[i] for i in rows], preprocessor.getCountWordClassDict(matrix),
+           preprocessor.getCountClassDict(matrix), preprocessor.removeStopWords(preprocessor.getWordFrequencyDict(matrix)))
+    return nb
+
+
+@pytest.mark.parametrize('termFrequency, inverseDocumentFrequency, length', [
+    (False, True, False),
+    (True, True, True),
+    (False, False, False),
+    (True, False, True),
+])
+def test_fold_model_matches_full_retrain(preprocessor, trainingSet, termFrequency, inverseDocumentFrequency, length):
+    attributeIDs, y, X = trainingSet
+    countMatrix = preprocessor.getTrainingSetMatrix(attributeIDs, X, y)
+    k = 5
+    folds = cross_validation.assignFolds(countMatrix.numRows, k, seed=3)
+    fold, model, kept = next(cross_validation.foldModels(countMatrix, folds, k, termFrequency, inverseDocumentFrequency, length, preprocessor.stopWords))
+    assert fold == 0
+    expected = retrain(preprocessor, attributeIDs, y, X, np.flatnonzero(folds != 0), termFrequency, inverseDocumentFrequency, length)
+
+    assert model._classes == expected._classes
+    assert set(model._vocabulary) == set(expected._vocabulary)
+    order = [expected._vocabulary[word] for word in model._vocabulary]
+    np.testing.assert_allclose(model._classWordCounts, expected._classWordCounts[:, order], rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(model._classTotals, expected._classTotals, rtol=1e-9)
+    np.testing.assert_array_equal(model._classDocumentCounts, expected._classDocumentCounts)
+
+    heldOut = [X[i] for i in np.flatnonzero(folds == 0)]
+    assert model.predict_many(heldOut) == expected.predict_many(heldOut)
+
+
+def test_held_out_documents_do_not_change_the_idf(preprocessor, trainingSet):
+    attributeIDs, y, X = trainingSet
+    countMatrix = preprocessor.getTrainingSetMatrix(attributeIDs, X, y)
+    folds = cross_validation.assignFolds(countMatrix.numRows, 4, seed=0)
+    fold, model, kept = next(cross_validation.foldModels(countMatrix, folds, 4, inverseDocumentFrequency=True))
+    # adding a copy of a held-out document to the held-out fold must not change the fold's model
+    heldOut = int(np.flatnonzero(folds == 0)[0])
+    grown = preprocessor.getTrainingSetMatrix(attributeIDs + ['copy'], X + [X[heldOut]], y + [y[heldOut]])
+    grownFold, grownModel, grownKept = next(cross_validation.foldModels(grown, np.append(folds, 0), 4, inverseDocumentFrequency=True))
+    assert grownModel._vocabulary == model._vocabulary
+    np.testing.assert_allclose(grownModel._classWordCounts, model._classWordCounts)
+
+
+def test_cross_validate_report(preprocessor, trainingSet):
+    attributeIDs, y, X = trainingSet
+    countMatrix = preprocessor.getTrainingSetMatrix(attributeIDs, X, y)
+    report = cross_validation.crossValidate(countMatrix, 5, inverseDocumentFrequency=True, exclude=preprocessor.stopWords)
+    assert sum(fold['size'] for fold in report['folds']) == countMatrix.numRows
+    assert np.sum(report['confusion']) == countMatrix.numRows
+    assert 0.0 <= report['accuracy'] <= 1.0
+
+
+def test_cross_validation_can_be_cancelled(preprocessor, trainingSet):
+    background = pytest.importorskip('background')
+    attributeIDs, y, X = trainingSet
+    countMatrix = preprocessor.getTrainingSetMatrix(attributeIDs, X, y)
+    job = background.BackgroundJob(None)
+    progress = job.reporter("Cross-validating: ")
+    progress.interval = 0
+    folds = []
+    original = progress.update
+
+    def update(rows, fraction=None):
+        folds.append(fraction)
+        if len(folds) == 2:
+            job.cancel()
+        original(rows, fraction)
+
+    progress.update = update
+    with pytest.raises(background.Cancelled):
+        cross_validation.crossValidate(countMatrix, 5, inverseDocumentFrequency=True, progress=progress)
+    assert folds == [0.2, 0.4]
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+
+import MNB_with_word_frequency
+import feature_selection
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def matrix(monkeypatch):
+    monkeypatch.chdir(HERE) # the Preprocessor reads stopwords.txt from the working directory
+    attributeIDs, y, X = MNB_with_word_frequency.importData('training_set.csv')
+    return MNB_with_word_frequency.Preprocessor().getTrainingSetMatrix(attributeIDs, X, y)
+
+
+@pytest.mark.parametrize('scoring', sorted(feature_selection.SCORERS))
+@pytest.mark.parametrize('k', [1, 50, 100000])
+def test_top_terms_are_the_best_scores(matrix, scoring, k):
+    scores = feature_selection.SCORERS[scoring](matrix)
+    top = feature_selection.selectTopTerms(matrix, k, scoring)
+    assert len(top) == min(k, matrix.numColumns) == len(set(top.tolist()))
+    np.testing.assert_array_equal(scores[top], np.sort(scores)[::-1][:len(top)]) # best first, ties in any order
+
+
+def test_excluded_words_are_never_selected(matrix):
+    stopWords = MNB_with_word_frequency.Preprocessor().stopWords
+    words = feature_selection.selectVocabulary(matrix, matrix.numColumns, 'frequency', exclude=stopWords)
+    assert words and not set(words) & stopWords
+    assert len(words) == matrix.numColumns - len(stopWords & set(matrix.vocabulary))
+
+
+def test_chi2_matches_the_contingency_formula():
+    matrix = MNB_with_word_frequency.DocumentTermMatrix.fromDocuments([['a', 'b'], ['a', 'a'], ['b', 'c']], {}, growVocabulary=True)
+    matrix.setLabels(['x', 'x', 'y'])
+    counts = {'x': {'a': 3, 'b': 1, 'c': 0}, 'y': {'a': 0, 'b': 1, 'c': 1}}
+    priors = {'x': 2 / 3, 'y': 1 / 3}
+    expected = []
+    for word in ['a', 'b', 'c']:
+        total = counts['x'][word] + counts['y'][word]
+        expected.append(sum((counts[label][word] - priors[label] * total) ** 2 / (priors[label] * total) for label in priors))
+    np.testing.assert_allclose(feature_selection.chiSquareScores(matrix), expected)
+    # a and c each tell the classes apart exactly, b occurs in documents of both
+    informative = feature_selection.mutualInformationScores(matrix)
+    a, b, c = informative[[matrix.vocabulary[word] for word in 'abc']]
+    assert a == pytest.approx(c) and b < a
+
+def test_registered_scorers_are_selectable(matrix):
+    feature_selection.registerScorer('length')(lambda matrix: np.array([len(term) for term in matrix.terms], dtype=np.float64))
+    try:
+        longest = feature_selection.selectVocabulary(matrix, 1, 'length')[0]
+        assert len(longest) == max(len(term) for term in matrix.vocabulary)
+    finally:
+        del feature_selection.SCORERS['length']
+    with pytest.raises(ValueError):
+        feature_selection.selectTopTerms(matrix, 10, 'length')
+
+def test_top_items_match_sorting():
+    frequencies = {'a': 3, 'b': 7, 'c': 1, 'd': 7, 'e': 5}
+    assert feature_selection.topItems(frequencies, 3) == {'b': 7, 'd': 7, 'e': 5}
+    assert list(feature_selection.topItems(frequencies, 10)) == sorted(frequencies, key=frequencies.get, reverse=True)
+    assert frequencies == {'a': 3, 'b': 7, 'c': 1, 'd': 7, 'e': 5}
+
+
+def test_train_keeps_the_top_k_words(matrix):
+    nb = MNB_with_word_frequency.train('training_set.csv', topK=50, scoring='chi2', inverseDocumentFrequency=False) # ranked on the raw counts
+    assert set(nb._vocabulary) == set(feature_selection.selectVocabulary(matrix, 50, 'chi2', exclude=MNB_with_word_frequency.Preprocessor().stopWords))
+    assert nb._classWordCounts.shape == (len(nb.classes), 50)
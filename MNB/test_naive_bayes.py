@@ -0,0 +1,274 @@
+import os
+from collections import Counter
+
+import numpy as np
+
+import pytest
+
+import MNB_with_word_frequency
+import prediction_cache
+
+NaiveBayesClassifier = MNB_with_word_frequency.NaiveBayesClassifier
+
+DOCUMENTS = [['masaya', 'ako'], ['galit', 'ako'], ['masaya', 'masaya', 'tayo'], ['galit', 'sila', 'sa', 'traffic'],
+             ['ang', 'ganda', 'masaya'], ['pangit', 'galit']]
+LABELS = ['1', '0', '1', '0', '1', '0']
+
+
+def test_cache_is_invalidated_when_the_model_changes():
+    nb = NaiveBayesClassifier()
+    nb.partial_fit(DOCUMENTS, LABELS)
+    nb.cache = prediction_cache.PredictionCache(100)
+    documents = [['traffic'], ['masaya', 'traffic'], ['traffic']]
+    before = nb.predict_many(documents)
+    assert before == [nb._classify(document) for document in documents]
+    assert nb.cache.hits == 1
+
+    version = nb.version
+    nb.partial_fit([['traffic', 'masaya']] * 5, ['1'] * 5)
+    assert nb.version != version
+    after = nb.predict_many(documents)
+    assert after == [nb._classify(document) for document in documents]
+    assert after != before
+    assert nb.cache.version == nb.version
+
+
+def test_hashed_bigrams_are_learnt_from_documents():
+    hasher = MNB_with_word_frequency.FeatureHasher(1 << 12, ngrams=2)
+    nb = NaiveBayesClassifier(hasher=hasher)
+    nb.partial_fit(DOCUMENTS, LABELS)
+    expected = hasher.transform(DOCUMENTS)
+    expected.setLabels(LABELS)
+    counts = expected.classWordCounts()
+    rows = [nb._classes.index(label) for label in expected.classes]
+    assert (nb._classWordCounts[rows] == counts).all()
+    assert nb._classWordCounts[nb._classes.index('1'), hasher.bucket('masaya ako')] == 1
+
+
+def test_hashed_bigrams_cannot_be_learnt_from_word_counts():
+    hasher = MNB_with_word_frequency.FeatureHasher(1 << 12, ngrams=2)
+    nb = NaiveBayesClassifier(hasher=hasher)
+    matrix = MNB_with_word_frequency.DocumentTermMatrix.fromDocuments(DOCUMENTS, {}, growVocabulary=True)
+    matrix.setLabels(LABELS)
+    with pytest.raises(ValueError):
+        nb.partial_fit(matrix)
+    with pytest.raises(ValueError):
+        nb.fit(DOCUMENTS, LABELS, {'1': {'masaya': 1}, '0': {'galit': 1}}, {'1': 1, '0': 1}, {'masaya': 1, 'galit': 1})
+
+
+def test_hashed_words_match_between_fit_and_partial_fit():
+    hasher = MNB_with_word_frequency.FeatureHasher(1 << 12)
+    fitted = NaiveBayesClassifier(hasher=hasher)
+    countWordClassDict = {label: Counter(word for document, y in zip(DOCUMENTS, LABELS) if y == label for word in document) for label in ('1', '0')}
+    countClassDict = {label: sum(counts.values()) for label, counts in countWordClassDict.items()}
+    fitted.fit(DOCUMENTS, LABELS, countWordClassDict, countClassDict, Counter(word for document in DOCUMENTS for word in document))
+    partial = NaiveBayesClassifier(hasher=hasher)
+    partial.partial_fit(DOCUMENTS, LABELS)
+    rows = [partial._classes.index(label) for label in fitted._classes]
+    assert (fitted._classWordCounts == partial._classWordCounts[rows]).all()
+    assert fitted.predict_many(DOCUMENTS) == partial.predict_many(DOCUMENTS)
+
+
+def test_train_from_an_already_read_matrix(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__))) # the Preprocessor reads stopwords.txt from here
+    p = MNB_with_word_frequency.Preprocessor()
+    attributeIDs, y, X = MNB_with_word_frequency.importData('training_set.csv')
+    countMatrix = p.getTrainingSetMatrix(attributeIDs, X, y)
+    fromPath = MNB_with_word_frequency.train('training_set.csv')
+    fromMatrix = MNB_with_word_frequency.train('missing.csv', trainingSetMatrix=countMatrix)
+    assert fromMatrix._classes == fromPath._classes
+    assert fromMatrix._vocabulary == fromPath._vocabulary
+    np.testing.assert_allclose(fromMatrix._classWordCounts, fromPath._classWordCounts)
+    np.testing.assert_array_equal(fromMatrix._classDocumentCounts, fromPath._classDocumentCounts)
+    assert countMatrix.data.sum() == sum(len(document) for document in X) # the raw counts were not transformed in place
+
+
+@pytest.mark.parametrize('mode', NaiveBayesClassifier.MODES)
+@pytest.mark.parametrize('hashed', [False, True])
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load_round_trip(tmp_path, mode, hashed, mmap):
+    nb = NaiveBayesClassifier(alpha=0.5, hasher=MNB_with_word_frequency.FeatureHasher(1 << 10) if hashed else None, mode=mode)
+    nb.partial_fit(DOCUMENTS, LABELS)
+    path = str(tmp_path / 'model.mnb')
+    nb.save(path)
+    with open(path, 'rb') as f:
+        saved = f.read()
+    loaded = NaiveBayesClassifier.load(path, mmap=mmap)
+    assert (loaded.alpha, loaded.mode, loaded._classes, loaded._vocabulary, loaded.version) == (nb.alpha, nb.mode, nb._classes, nb._vocabulary, nb.version)
+    assert (loaded.hasher is None) == (not hashed)
+    documents = DOCUMENTS + [['traffic', 'ganda'], ['hindi', 'kilala']]
+    np.testing.assert_array_equal(loaded.predict_proba_many(documents), nb.predict_proba_many(documents))
+    assert loaded.predict_many(documents) == nb.predict_many(documents)
+
+    # a loaded model keeps learning like the one it was saved from, the memory-mapped file is left alone
+    nb.partial_fit([['bago', 'masaya']], ['1'])
+    loaded.partial_fit([['bago', 'masaya']], ['1'])
+    np.testing.assert_array_equal(loaded.predict_proba_many(documents), nb.predict_proba_many(documents))
+    with open(path, 'rb') as f:
+        assert f.read() == saved
+
+
+def test_load_rejects_other_files(tmp_path):
+    nb = NaiveBayesClassifier()
+    nb.partial_fit(DOCUMENTS, LABELS)
+    path = tmp_path / 'model.mnb'
+    nb.save(str(path))
+    data = bytearray(path.read_bytes())
+    data[len(MNB_with_word_frequency.MODEL_MAGIC)] += 1 # the format version
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        NaiveBayesClassifier.load(str(path))
+    path.write_bytes(b'Text,Sentiment\n')
+    with pytest.raises(ValueError):
+        NaiveBayesClassifier.load(str(path))
+
+
+def fitFromDocuments(documents, labels):
+    # fit() from the dictionaries the Preprocessor counts, over every word of the documents
+    countWordClassDict = {label: Counter() for label in dict.fromkeys(labels)}
+    for document, label in zip(documents, labels):
+        countWordClassDict[label].update(document)
+    countClassDict = {label: sum(counts.values()) for label, counts in countWordClassDict.items()}
+    nb = NaiveBayesClassifier()
+    nb.fit(documents, labels, countWordClassDict, countClassDict, Counter(word for document in documents for word in document))
+    return nb
+
+
+def probabilities(nb, documents, classes):
+    # predict_proba_many with the columns in the given class order
+    return nb.predict_proba_many(documents)[:, [nb._classes.index(label) for label in classes]]
+
+
+@pytest.mark.parametrize('batchSize', [1, 4, 100])
+def test_partial_fit_in_batches_matches_fit(batchSize):
+    documents = DOCUMENTS * 3 + [['bago', 'na', 'salita']]
+    labels = LABELS * 3 + ['1']
+    fitted = fitFromDocuments(documents, labels)
+    partial = NaiveBayesClassifier()
+    for start in range(0, len(documents), batchSize):
+        partial.partial_fit(documents[start:start + batchSize], labels[start:start + batchSize])
+    assert set(partial._vocabulary) == set(fitted._vocabulary)
+    unseen = [['masaya', 'hindi', 'kilala'], ['galit', 'bago'], []]
+    np.testing.assert_allclose(probabilities(partial, documents + unseen, fitted._classes), probabilities(fitted, documents + unseen, fitted._classes))
+    assert partial.predict_many(documents + unseen) == fitted.predict_many(documents + unseen)
+
+
+def test_partial_fit_without_growing_ignores_new_words():
+    nb = NaiveBayesClassifier()
+    nb.partial_fit(DOCUMENTS, LABELS)
+    vocabulary = dict(nb._vocabulary)
+    totals = nb._classTotals.copy()
+    nb.partial_fit([['masaya', 'bago']], ['1'], growVocabulary=False)
+    assert nb._vocabulary == vocabulary
+    assert nb._classTotals[nb._classes.index('1')] == totals[nb._classes.index('1')] + 1
+    # a count matrix with its own vocabulary drops the same words
+    fromMatrix = NaiveBayesClassifier()
+    fromMatrix.partial_fit(DOCUMENTS, LABELS)
+    matrix = MNB_with_word_frequency.DocumentTermMatrix.fromDocuments([['masaya', 'bago']], {}, growVocabulary=True)
+    matrix.setLabels(['1'])
+    fromMatrix.partial_fit(matrix, growVocabulary=False)
+    assert fromMatrix._vocabulary == vocabulary
+    assert np.array_equal(fromMatrix._classTotals, nb._classTotals)
+    assert np.array_equal(fromMatrix._classWordCounts, nb._classWordCounts)
+    assert np.array_equal(fromMatrix.predict_proba_many([['masaya', 'bago']]), nb.predict_proba_many([['masaya', 'bago']]))
+
+
+def test_scores_match_the_dictionary_likelihoods(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    p = MNB_with_word_frequency.Preprocessor()
+    nb = fitFromDocuments(DOCUMENTS, LABELS)
+    countWordClassDict = {label: Counter() for label in dict.fromkeys(LABELS)}
+    for document, label in zip(DOCUMENTS, LABELS):
+        countWordClassDict[label].update(document)
+    countClassDict = {label: sum(counts.values()) for label, counts in countWordClassDict.items()}
+    wordFrequencyDict = Counter(word for document in DOCUMENTS for word in document)
+    likelihoods = p.calculateLikelihoods(countWordClassDict, countClassDict, wordFrequencyDict)
+    priors = p.calculatePriors(LABELS)
+
+    documents = DOCUMENTS + [['masaya', 'masaya', 'hindi', 'kilala'], []]
+    # the per-word loop the vectorized tables replaced: log P(class) + sum of log P(word|class) over known words
+    expected = [[np.log(priors[label]) + sum(np.log(likelihoods[label][word]) for word in document if word in wordFrequencyDict)
+                 for label in nb.classes] for document in documents]
+    matrix = MNB_with_word_frequency.DocumentTermMatrix.fromDocuments(documents, nb._vocabulary)
+    np.testing.assert_allclose(nb.joint_log_likelihoods(matrix), expected)
+    assert [nb.classify(document) for document in documents] == [nb.classes[int(np.argmax(scores))] for scores in expected]
+
+
+@pytest.mark.parametrize('mode', NaiveBayesClassifier.MODES)
+def test_batch_predictions_match_single_documents(mode):
+    nb = NaiveBayesClassifier(mode=mode)
+    nb.partial_fit(DOCUMENTS, LABELS)
+    documents = DOCUMENTS + [['masaya', 'galit', 'galit'], ['hindi', 'kilala'], []]
+    assert nb.predict_many(documents) == [nb.classify(document) for document in documents]
+    probabilities = nb.predict_proba_many(documents)
+    assert probabilities.shape == (len(documents), len(nb.classes))
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0)
+    assert [nb.classes[i] for i in probabilities.argmax(axis=1)] == nb.predict_many(documents)
+    assert nb.predict_many([]) == [] and nb.predict_proba_many([]).shape == (0, len(nb.classes))
+
+
+def dense(matrix):
+    counts = np.zeros((matrix.numRows, matrix.numColumns))
+    for row in range(matrix.numRows):
+        span = slice(matrix.indptr[row], matrix.indptr[row + 1])
+        counts[row, matrix.indices[span]] = matrix.data[span]
+    return counts
+
+
+def test_document_term_matrix_counts(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    p = MNB_with_word_frequency.Preprocessor()
+    matrix = p.getTrainingSetMatrix(['a', 'b', 'c', 'd', 'e', 'f'], DOCUMENTS, LABELS)
+    counts = dense(matrix)
+    terms = matrix.terms
+    for row, document in enumerate(DOCUMENTS):
+        assert {terms[column]: counts[row, column] for column in np.flatnonzero(counts[row])} == Counter(document)
+    assert (np.diff(matrix.indices[matrix.indptr[0]:matrix.indptr[1]]) > 0).all() # sorted columns within a row
+    assert p.getCountWordClassDict(matrix)['1'] == Counter(word for document, label in zip(DOCUMENTS, LABELS) if label == '1' for word in document)
+    assert p.getCountClassDict(matrix) == {'1': 8, '0': 8}
+    np.testing.assert_array_equal(matrix.documentFrequency(), (counts > 0).sum(axis=0))
+
+    selected = matrix.selectRows(np.array([4, 1]))
+    np.testing.assert_array_equal(dense(selected), counts[[4, 1]])
+    assert selected.documentIDs == ['e', 'b'] and [selected.classes[code] for code in selected.labelCodes] == ['1', '0']
+
+    known = MNB_with_word_frequency.DocumentTermMatrix.fromDocuments([['masaya', 'bago', 'masaya']], matrix.vocabulary)
+    assert known.numColumns == len(terms) and known.data.tolist() == [2.0] # unknown words are dropped
+
+
+@pytest.mark.parametrize('termFrequency', [False, True])
+@pytest.mark.parametrize('inverseDocumentFrequency', [False, True])
+@pytest.mark.parametrize('length', [False, True])
+def test_fused_transforms_match_the_formulas(termFrequency, inverseDocumentFrequency, length):
+    matrix = MNB_with_word_frequency.DocumentTermMatrix.fromDocuments(DOCUMENTS + [[]], {}, growVocabulary=True)
+    counts = dense(matrix)
+    expected = counts.copy()
+    if termFrequency:
+        expected = np.log(expected + 1)
+    if inverseDocumentFrequency:
+        expected = expected * np.log(len(counts) / (counts > 0).sum(axis=0))
+    if length:
+        norms = np.sqrt((expected ** 2).sum(axis=1, keepdims=True))
+        expected = expected / np.where(norms == 0, 1, norms)
+    transformed = MNB_with_word_frequency.transformCounts(matrix, termFrequency, inverseDocumentFrequency, length)
+    np.testing.assert_allclose(dense(transformed), expected)
+    np.testing.assert_array_equal(dense(matrix), counts) # the counts are left alone
+
+
+def test_complement_weights_match_rennie():
+    nb = NaiveBayesClassifier(alpha=1.0, mode='complement')
+    nb.partial_fit(DOCUMENTS, LABELS)
+    nb._refresh() # the weights are built on first use
+    counts, vocabularySize = nb._classWordCounts, len(nb._vocabulary)
+    for row in range(len(nb.classes)):
+        # theta_~ci = (N_~ci + alpha) / (N_~c + alpha * V), w_ci = log(theta_~ci) normalized by sum_i |w_ci|
+        complement = np.delete(counts, row, axis=0).sum(axis=0)
+        weights = np.log((complement + 1) / (complement.sum() + vocabularySize))
+        np.testing.assert_allclose(nb._logLikelihoods[row], -weights / np.abs(weights).sum())
+    # 'ako' is in one document of each class: skewed training data pulls multinomial to the big class, not complement
+    skewed = (DOCUMENTS + [['galit']] * 20, LABELS + ['0'] * 20)
+    nb = NaiveBayesClassifier(mode='complement')
+    nb.partial_fit(*skewed)
+    multinomial = NaiveBayesClassifier()
+    multinomial.partial_fit(*skewed)
+    assert (nb.predict_many([['ako']]), multinomial.predict_many([['ako']])) == (['1'], ['0'])
@@ -0,0 +1,51 @@
+import csv
+import os
+import tempfile
+
+import pytest
+
+import MNB_with_word_frequency
+import parallel
+import pipeline
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TESTING_SET = os.path.join(HERE, 'testing_set.csv')
+
+
+@pytest.fixture(scope='module')
+def nb():
+    attributeIDs, y, X = MNB_with_word_frequency.importData(os.path.join(HERE, 'training_set.csv'))
+    nb = MNB_with_word_frequency.NaiveBayesClassifier()
+    nb.partial_fit(X, y)
+    return nb
+
+
+def readResults(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f, delimiter=',', quotechar='|'))
+
+
+@pytest.mark.parametrize('deduplicate', [False, True])
+def test_parallel_matches_serial(nb, tmp_path, monkeypatch, deduplicate):
+    serialPath, parallelPath = str(tmp_path / 'serial.csv'), str(tmp_path / 'parallel.csv')
+    serialCounts = pipeline.classifyFile(nb, TESTING_SET, serialPath, 9, showProgress=False, deduplicate=deduplicate)
+    (tmp_path / 'tmp').mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'tmp'))
+    parallelCounts = parallel.classifyFileParallel(nb, TESTING_SET, parallelPath, workers=2, chunkSize=9, showProgress=False, deduplicate=deduplicate)
+    assert parallelCounts == serialCounts
+    assert readResults(parallelPath) == readResults(serialPath) # same rows in input order
+    assert not os.listdir(tmp_path / 'tmp') # the model saved for the run is removed
+
+
+def test_workers_share_a_saved_model(nb, tmp_path):
+    modelPath = str(tmp_path / 'model.mnb')
+    nb.save(modelPath)
+    with open(modelPath, 'rb') as f:
+        saved = f.read()
+    chunks = pipeline.readChunks(TESTING_SET, 25)
+    results = list(parallel.classifyChunksParallel(nb, chunks, workers=2, modelPath=modelPath))
+    attributeIDs, X = MNB_with_word_frequency.importData(TESTING_SET, labelsInSet=False)
+    assert [ID for IDs, predictions in results for ID in IDs] == attributeIDs
+    assert [prediction for IDs, predictions in results for prediction in predictions] == nb.predict_many(X)
+    with open(modelPath, 'rb') as f:
+        assert f.read() == saved
@@ -0,0 +1,49 @@
+import csv
+import io
+import os
+
+import pytest
+
+import MNB_with_word_frequency
+import pipeline
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TESTING_SET = os.path.join(HERE, 'testing_set.csv')
+
+
+@pytest.fixture(scope='module')
+def nb():
+    return pipeline.trainChunks(MNB_with_word_frequency.NaiveBayesClassifier(), pipeline.tokenizeChunks(pipeline.readChunks(os.path.join(HERE, 'training_set.csv'), 16)))
+
+
+def readResults(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f, delimiter=',', quotechar='|'))
+
+
+def test_chunks_cover_every_row_once():
+    with open(TESTING_SET, newline='') as f:
+        rows = list(csv.reader(f))[1:]
+    progress = pipeline.ProgressReporter(stream=io.StringIO(), interval=0)
+    chunks = list(pipeline.readChunks(TESTING_SET, 7, progress))
+    assert [len(chunk) for chunk in chunks[:-1]] == [7] * (len(chunks) - 1) and 0 < len(chunks[-1]) <= 7
+    assert [row for chunk in chunks for row in chunk] == rows
+    assert (progress.rows, progress.fraction) == (len(rows), 1.0)
+
+
+def test_chunked_training_matches_one_batch(nb):
+    attributeIDs, y, X = MNB_with_word_frequency.importData(os.path.join(HERE, 'training_set.csv'))
+    whole = MNB_with_word_frequency.NaiveBayesClassifier()
+    whole.partial_fit(X, y)
+    assert set(nb._vocabulary) == set(whole._vocabulary) and nb.classes == whole.classes
+    assert nb.predict_many(X) == whole.predict_many(X)
+
+
+@pytest.mark.parametrize('chunkSize', [1, 7, 1000])
+def test_classify_file_matches_one_batch(nb, tmp_path, chunkSize):
+    attributeIDs, X = MNB_with_word_frequency.importData(TESTING_SET, labelsInSet=False)
+    predictions = nb.predict_many(X)
+    outputPath = str(tmp_path / 'Results.csv')
+    classCounts = pipeline.classifyFile(nb, TESTING_SET, outputPath, chunkSize, showProgress=False)
+    assert readResults(outputPath) == [['ID', 'Sentiment']] + [[ID, prediction] for ID, prediction in zip(attributeIDs, predictions)]
+    assert classCounts == {label: predictions.count(label) for label in set(predictions)}
@@ -0,0 +1,253 @@
+"""
+Long-running local scoring server for the MNB classifier and the Lexicon Analyzer.
+
+The fitted NaiveBayesClassifier (a model.mnb saved by MNB_with_word_frequency) and the lexicons are loaded once at
+start up. Requests are answered with JSON over HTTP on a TCP port or a Unix socket:
+
+    POST /score    {"text": "..."}  or  {"texts": ["...", ...]}
+    GET  /health   model and batching statistics
+
+Texts that arrive within a short window (a few milliseconds) from any number of connections are scored together as
+one batch, so the classifier runs one vectorized predict_proba_many instead of one call per request
+
+    python scoring_server.py --port 8765
+    python scoring_server.py --unix-socket /tmp/sentiment.sock
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+for folder in ('Shared', 'MNB', 'Lexicon Analyzer'):
+    sys.path.append(os.path.join(ROOT, folder))
+import tokenizer
+import lexicon_matcher
+import lexicon_scorer
+import MNB_with_word_frequency
+
+DEFAULT_MODEL = os.path.join(ROOT, 'MNB', 'model.mnb')
+DEFAULT_POSITIVE = os.path.join(ROOT, 'Lexicon Analyzer', 'positive-words.txt')
+DEFAULT_NEGATIVE = os.path.join(ROOT, 'Lexicon Analyzer', 'negative-words.txt')
+MAX_BODY_SIZE = 16 << 20 # bytes
+
+
+class Scorer():
+    """
+    Scores batches of texts with the classifier and the lexicons, both loaded once
+    """
+    def __init__(self, modelPath:str=DEFAULT_MODEL, positivePath:str=DEFAULT_POSITIVE, negativePath:str=DEFAULT_NEGATIVE, negationWindow:int=3):
+        if not os.path.exists(modelPath):
+            raise FileNotFoundError(modelPath + " does not exist, run MNB_with_word_frequency.py once to train and save the model")
+        self.modelPath = modelPath
+        self.nb = MNB_with_word_frequency.NaiveBayesClassifier.load(modelPath)
+        self.lexicon = lexicon_scorer.LexiconScorer(positivePath, negativePath, negationWindow=negationWindow)
+
+    def scoreBatch(self, texts:list) -> list:
+        """
+        Returns:
+        list[dict]: The MNB class with its probabilities and the lexicon decision with its counts, for every text
+        """
+        documents = [tokenizer.tokenize(text) for text in texts]
+        classes = self.nb.classes
+        probabilities = self.nb.predict_proba_many(documents) if documents else []
+        scoreTokens = self.lexicon.matcher.scoreTokens
+        results = []
+        for document, row in zip(documents, probabilities):
+            best = int(row.argmax())
+            lexicon = scoreTokens(document)
+            results.append({
+                'mnb': {'label': classes[best], 'probabilities': {label: float(p) for label, p in zip(classes, row)}},
+                'lexicon': {'decision': lexicon_matcher.decide(lexicon), 'positive': lexicon.positive, 'negative': lexicon.negative, 'score': lexicon.score},
+            })
+        return results
+
+
+class MicroBatcher():
+    """
+    Collects the texts submitted by many threads and scores them together. The first text of a batch waits at most
+    window seconds for others to join it, and a batch never grows past maxBatch texts
+    """
+    def __init__(self, scoreBatch, window:float=0.005, maxBatch:int=512):
+        self.scoreBatch = scoreBatch
+        self.window = window
+        self.maxBatch = maxBatch
+        self.batches = 0
+        self.texts = 0
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts:list) -> concurrent.futures.Future:
+        """
+        Returns:
+        Future: Resolves to the list of results of texts, in order
+        """
+        future = concurrent.futures.Future()
+        self._pending.put((texts, future))
+        return future
+
+    def _run(self):
+        while True:
+            requests = [self._pending.get()]
+            size = len(requests[0][0])
+            deadline = time.monotonic() + self.window
+            while size < self.maxBatch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request[0])
+            texts = [text for request in requests for text in request[0]]
+            try:
+                results = self.scoreBatch(texts)
+            except Exception as error:
+                for _, future in requests:
+                    future.set_exception(error)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for requestTexts, future in requests:
+                future.set_result(results[start:start + len(requestTexts)])
+                start += len(requestTexts)
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/health':
+            return self._send(404, {'error': 'unknown path ' + self.path})
+        batcher = self.server.batcher
+        self._send(200, {
+            'status': 'ok',
+            'model': os.path.abspath(self.server.scorer.modelPath),
+            'classes': self.server.scorer.nb.classes,
+            'batches': batcher.batches,
+            'texts': batcher.texts,
+            'uptime': time.time() - self.server.started,
+        })
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/score':
+            return self._send(404, {'error': 'unknown path ' + self.path})
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_SIZE:
+            return self._send(413, {'error': 'request body over ' + str(MAX_BODY_SIZE) + ' bytes'})
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._send(400, {'error': 'request body is not JSON'})
+        single = isinstance(body, dict) and isinstance(body.get('text'), str)
+        texts = [body['text']] if single else body.get('texts') if isinstance(body, dict) else None
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return self._send(400, {'error': 'send {"text": "..."} or {"texts": ["...", ...]}'})
+        try:
+            results = self.server.batcher.submit(texts).result()
+        except Exception as error:
+            return self._send(500, {'error': str(error)})
+        self._send(200, results[0] if single else {'results': results})
+
+    def _send(self, code:int, body:dict):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class _ScoringServerMixin():
+    daemon_threads = True
+    request_queue_size = 128 # connections the OS queues before accept(), 5 by default resets bursts of clients
+
+    def setup(self, scorer:Scorer, batcher:MicroBatcher, verbose:bool):
+        self.scorer = scorer
+        self.batcher = batcher
+        self.verbose = verbose
+        self.started = time.time()
+        return self
+
+
+class ScoringServer(_ScoringServerMixin, ThreadingHTTPServer):
+    pass
+
+
+class UnixScoringServer(_ScoringServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address) # a socket file left behind by a previous run
+        super().server_bind()
+        self.server_name, self.server_port = 'localhost', 0
+
+
+def createServer(scorer:Scorer, host:str='127.0.0.1', port:int=8765, unixSocket:str=None, window:float=0.005, maxBatch:int=512, verbose:bool=False, backlog:int=None):
+    """
+    Paramaters:
+    backlog (int): Connections waiting to be accepted before new ones are refused, request_queue_size if None
+
+    Returns:
+    ScoringServer: A bound server, call serve_forever() to start answering requests
+    """
+    if unixSocket:
+        server = UnixScoringServer(unixSocket, ScoringHandler, bind_and_activate=False)
+    else:
+        server = ScoringServer((host, port), ScoringHandler, bind_and_activate=False)
+    if backlog is not None:
+        server.request_queue_size = backlog # read by server_activate() when it starts listening
+    try:
+        server.server_bind()
+        server.server_activate()
+    except BaseException:
+        server.server_close()
+        raise
+    batcher = MicroBatcher(scorer.scoreBatch, window, maxBatch)
+    return server.setup(scorer, batcher, verbose)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve MNB and lexicon sentiment scores as JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', help="listen on this Unix socket instead of a TCP port")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="a model saved by NaiveBayesClassifier.save")
+    parser.add_argument('--positive', default=DEFAULT_POSITIVE, help="positive lexicon file")
+    parser.add_argument('--negative', default=DEFAULT_NEGATIVE, help="negative lexicon file")
+    parser.add_argument('--window', type=float, default=5.0, help="milliseconds a text waits for others to join its batch")
+    parser.add_argument('--max-batch', type=int, default=512, help="most texts scored in one batch")
+    parser.add_argument('--backlog', type=int, default=_ScoringServerMixin.request_queue_size, help="connections queued while all are busy")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+
+    scorer = Scorer(args.model, args.positive, args.negative)
+    server = createServer(scorer, args.host, args.port, args.unix_socket, args.window / 1000, args.max_batch, args.verbose, args.backlog)
+    print("Serving on " + (args.unix_socket or "http://" + args.host + ":" + str(server.server_address[1])))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import concurrent.futures
+import http.client
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+import scoring_server
+import MNB_with_word_frequency
+
+
+@pytest.fixture(scope='module')
+def scorer(tmp_path_factory):
+    modelPath = str(tmp_path_factory.mktemp('model') / 'model.mnb')
+    cwd = os.getcwd()
+    os.chdir(os.path.join(scoring_server.ROOT, 'MNB')) # the Preprocessor reads stopwords.txt from the working directory
+    try:
+        MNB_with_word_frequency.train('training_set.csv').save(modelPath)
+    finally:
+        os.chdir(cwd)
+    return scoring_server.Scorer(modelPath)
+
+
+@pytest.fixture
+def server(scorer):
+    server = scoring_server.createServer(scorer, port=0, window=0.02)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(port:int, body:dict) -> tuple:
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('POST', '/score', json.dumps(body), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_listen_backlog(scorer):
+    assert scoring_server.ScoringServer.request_queue_size >= 128
+    server = scoring_server.createServer(scorer, port=0, backlog=7)
+    try:
+        assert server.request_queue_size == 7
+        assert server.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ACCEPTCONN)
+    finally:
+        server.server_close()
+
+
+def test_concurrent_clients_are_all_answered(server):
+    port = server.server_address[1]
+    texts = ['masaya ako ngayon ' + str(i) if i % 2 else 'galit ako sa traffic ' + str(i) for i in range(64)]
+    barrier = threading.Barrier(32)
+
+    def request(text):
+        barrier.wait(timeout=30) # connect together, more than the default backlog of 5
+        return post(port, {'text': text})
+
+    batches = server.batcher.batches
+    with concurrent.futures.ThreadPoolExecutor(32) as pool:
+        responses = list(pool.map(request, texts[:32]))
+    assert 0 < server.batcher.batches - batches < 32 # concurrent requests share batches
+    assert [status for status, body in responses] == [200] * 32
+    # answered in order with the result of their own text
+    status, batch = post(port, {'texts': texts[:32]})
+    assert status == 200
+    assert [body for status, body in responses] == batch['results']
+
+
+def test_bad_requests(server):
+    port = server.server_address[1]
+    assert post(port, {'texts': 'not a list'})[0] == 400
+    assert post(port, {'text': 'okay'})[0] == 200
@@ -0,0 +1,159 @@
+"""
+Runs a long job on a worker thread and hands its progress to a Tk GUI without blocking the event loop.
+
+The job function gets the BackgroundJob and reports through it: job.stage(name) times a stage, job.progress(...)
+reports how far a stage is and job.checkCancelled() raises Cancelled once the user cancelled. Every report is put on
+a queue.Queue, and watch() drains that queue from the Tk main loop with widget.after(), so only the main thread ever
+touches the widgets. Messages are tuples:
+
+    ('stage', name)                 a stage started
+    ('timing', name, seconds)       a stage finished
+    ('progress', label, rows, fraction)
+    ('done', result)                the job returned result
+    ('cancelled',)
+    ('error', message)
+"""
+import contextlib
+import queue
+import threading
+import time
+import traceback
+
+
+class Cancelled(Exception):
+    """
+    Raised inside a job once it has been cancelled
+    """
+
+
+class BackgroundJob():
+    def __init__(self, target, *args, **kwargs):
+        """
+        Paramaters:
+        target (callable): Called as target(job, *args, **kwargs) on the worker thread, its return value is the result
+        """
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.messages = queue.Queue()
+        self.cancelEvent = threading.Event()
+        self.timings = {} # stage name -> seconds
+        self._thread = None
+
+    def start(self) -> 'BackgroundJob':
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            result = self.target(self, *self.args, **self.kwargs)
+        except Cancelled:
+            self.messages.put(('cancelled',))
+        except Exception as error:
+            traceback.print_exc()
+            self.messages.put(('error', str(error) or type(error).__name__))
+        else:
+            self.messages.put(('done', result))
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self):
+        """
+        Asks the job to stop at its next checkCancelled()
+        """
+        self.cancelEvent.set()
+
+    def checkCancelled(self):
+        if self.cancelEvent.is_set():
+            raise Cancelled()
+
+    @contextlib.contextmanager
+    def stage(self, name:str):
+        """
+        Reports the start and the wall time of a stage of the job
+        """
+        self.checkCancelled()
+        self.messages.put(('stage', name))
+        started = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - started
+        self.messages.put(('timing', name, self.timings[name]))
+
+    def progress(self, label:str, rows:int, fraction:float=None):
+        """
+        Reports progress within a stage, and stops the job here if it was cancelled
+        """
+        self.messages.put(('progress', label, rows, fraction))
+        self.checkCancelled()
+
+    def reporter(self, label:str) -> 'JobProgress':
+        """
+        Returns:
+        JobProgress: A progress object for the MNB pipeline functions that reports to this job
+        """
+        return JobProgress(self, label)
+
+
+class JobProgress():
+    """
+    Drop-in for pipeline.ProgressReporter that sends progress to a BackgroundJob instead of printing it, at most once
+    every interval seconds. update() raises Cancelled if the job was cancelled, which stops the pipeline mid-file
+    """
+    def __init__(self, job:BackgroundJob, label:str='', interval:float=0.1):
+        self.job = job
+        self.label = label
+        self.interval = interval
+        self.rows = 0
+        self.fraction = 0.0
+        self._lastSent = 0.0
+
+    def update(self, rows:int, fraction:float=None):
+        self.rows, self.fraction = rows, fraction
+        now = time.perf_counter()
+        if now - self._lastSent >= self.interval:
+            self._lastSent = now
+            self.job.progress(self.label, rows, fraction)
+        else:
+            self.job.checkCancelled()
+
+    def finish(self):
+        self.job.progress(self.label, self.rows, 1.0)
+
+
+def watch(widget, job:BackgroundJob, handlers:dict, interval:int=100):
+    """
+    Polls job from the Tk event loop every interval milliseconds and calls handlers[kind](*message[1:]) for every
+    message, until the job is done, cancelled or failed
+
+    Paramaters:
+    widget: Any Tk widget, its after() schedules the polling
+    job (BackgroundJob): A started job
+    handlers (dict): message kind -> callable, kinds without a handler are ignored
+    interval (int): Milliseconds between polls
+    """
+    def poll():
+        while True:
+            try:
+                message = job.messages.get_nowait()
+            except queue.Empty:
+                break
+            handler = handlers.get(message[0])
+            if handler is not None:
+                handler(*message[1:])
+            if message[0] in ('done', 'cancelled', 'error'):
+                return
+        widget.after(interval, poll)
+    widget.after(interval, poll)
+
+
+def formatProgress(label:str, rows:int, fraction:float=None) -> str:
+    """
+    Returns:
+    str: e.g. "Classifying: 42.0% (4200 rows)"
+    """
+    if fraction is None:
+        return label + str(rows) + " rows"
+    return label + str(round(fraction * 100, 1)) + "% (" + str(rows) + " rows)"
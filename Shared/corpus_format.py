@@ -0,0 +1,327 @@
+"""
+Pre-tokenized, columnar on-disk corpus, compiled once from a .csv or one-document-per-line file and then read
+without parsing or tokenizing again.
+
+A compiled corpus is a directory (by default the source path + '.corpus') holding
+
+    meta.json        format and tokenizer version, source size and modification time, counts, classes
+    vocabulary.txt   one term per line, the line number is the term id (terms in order of first appearance)
+    tokens.u32       the term id of every token of every document, uint32
+    offsets.i64      numDocuments + 1 int64 offsets, the tokens of document i are tokens[offsets[i]:offsets[i + 1]]
+    labels.i32       the class index of every document into meta['classes'], only for labelled .csv files
+    ids.txt          the id column of a .csv file, one ID per line, not written for text files
+    ids.i64          numDocuments + 1 int64 byte offsets: of every ID into ids.txt for a .csv file, of every line into
+                     the source for a text file, whose documents are identified by their line number
+
+The binary columns are little endian raw arrays, so they are memory-mapped and sliced without copying; IDs and lines
+are only read, by offset, for the documents they are asked for. Documents are tokenized with tokenizer.tokenize (the
+lines of a text file with its bytes fast path), the same words importData and the lexicon scorer see. A corpus is recompiled when its source or the tokenizer changes
+"""
+import contextlib
+import csv
+import json
+import os
+import sys
+from array import array
+
+import numpy as np
+
+import tokenizer
+
+FORMAT_VERSION = 2
+FLUSH_TOKENS = 1 << 20 # tokens buffered in memory while compiling
+
+
+def corpusPathFor(sourcePath:str) -> str:
+    return sourcePath + '.corpus'
+
+
+def _readRows(path:str, labelsInSet:bool):
+    # (id, label, text) of every document, in the layouts importData and PositiveNegative.run read. A text file has no
+    # id column, its rows carry the byte offset of the end of the line instead and the line as bytes
+    if not path.lower().endswith('.csv'):
+        with open(path, 'rb') as f:
+            end = 0
+            for line in f:
+                end += len(line)
+                yield end, None, line
+        return
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        reader = csv.reader(f)
+        next(reader, None) # skip the attribute names line
+        for row in reader:
+            if labelsInSet:
+                yield row[0], row[1].upper(), row[2]
+            else:
+                yield row[0], None, row[1]
+
+
+def _sourceInfo(sourcePath:str) -> dict:
+    return {'source': os.path.abspath(sourcePath), 'sourceSize': os.path.getsize(sourcePath), 'sourceMtime': os.path.getmtime(sourcePath)}
+
+
+def isCurrent(corpusPath:str, sourcePath:str, labelsInSet:bool=None) -> bool:
+    """
+    Returns:
+    bool: If corpusPath is a compiled corpus of the current contents of sourcePath
+    """
+    try:
+        with open(os.path.join(corpusPath, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    source = _sourceInfo(sourcePath)
+    return (meta.get('format') == FORMAT_VERSION and meta.get('tokenizer') == tokenizer.TOKENIZER_VERSION and meta.get('sourceSize') == source['sourceSize']
+            and meta.get('sourceMtime') == source['sourceMtime'] and (labelsInSet is None or meta.get('labelled') == bool(labelsInSet)))
+
+
+def compileCorpus(sourcePath:str, corpusPath:str=None, labelsInSet:bool=None, force:bool=False) -> str:
+    """
+    Tokenizes a source file once into a compiled corpus, streaming so memory only grows with the vocabulary
+
+    Paramaters:
+    sourcePath (str): A .csv file of (id, class, text) or (id, text) rows, or any file with one document per line
+    corpusPath (str): The corpus directory, sourcePath + '.corpus' if None
+    labelsInSet (bool): If the .csv rows have a class column, by default if the attribute names line has 3 or more
+    force (bool): Recompile even if the corpus is up to date
+
+    Returns:
+    str: corpusPath
+    """
+    corpusPath = corpusPath or corpusPathFor(sourcePath)
+    if labelsInSet is None:
+        labelsInSet = False
+        if sourcePath.lower().endswith('.csv'):
+            with open(sourcePath, newline='', encoding='utf-8', errors='replace') as f:
+                labelsInSet = len(next(csv.reader(f), [])) >= 3
+    if not force and isCurrent(corpusPath, sourcePath, labelsInSet):
+        return corpusPath
+
+    os.makedirs(corpusPath, exist_ok=True)
+    metaPath = os.path.join(corpusPath, 'meta.json')
+    if os.path.exists(metaPath):
+        os.remove(metaPath)
+    source = _sourceInfo(sourcePath) # taken before reading, a change while compiling makes the corpus stale
+    vocabulary = {}
+    classes = {}
+    numDocuments = flushed = 0 # flushed is the number of tokens already written
+    textFile = not sourcePath.lower().endswith('.csv')
+    idPath = os.path.join(corpusPath, 'ids.txt')
+    if textFile and os.path.exists(idPath):
+        os.remove(idPath) # left by an earlier format
+    idEnd = 0 # bytes of ids.txt written
+    tokens, offsets, labels, idOffsets = array('I'), array('q', [0]), array('i'), array('q', [0])
+    with open(os.path.join(corpusPath, 'tokens.u32'), 'wb') as tokenFile, \
+         open(os.path.join(corpusPath, 'offsets.i64'), 'wb') as offsetFile, \
+         open(os.path.join(corpusPath, 'labels.i32'), 'wb') as labelFile, \
+         open(os.path.join(corpusPath, 'ids.i64'), 'wb') as idOffsetFile, \
+         (contextlib.nullcontext() if textFile else open(idPath, 'wb')) as idFile:
+        columns = ((tokens, tokenFile), (offsets, offsetFile), (labels, labelFile), (idOffsets, idOffsetFile))
+        for documentID, label, text in _readRows(sourcePath, labelsInSet):
+            for word in (tokenizer.tokenizeBytes(text) if textFile else tokenizer.tokenize(text)):
+                termID = vocabulary.get(word)
+                if termID is None:
+                    termID = vocabulary[word] = len(vocabulary)
+                tokens.append(termID)
+            offsets.append(flushed + len(tokens))
+            if textFile:
+                idOffsets.append(documentID)
+            else:
+                idEnd += idFile.write((documentID.replace('\n', ' ') + '\n').encode('utf-8'))
+                idOffsets.append(idEnd)
+            if labelsInSet:
+                labels.append(classes.setdefault(label, len(classes)))
+            numDocuments += 1
+            if len(tokens) >= FLUSH_TOKENS:
+                flushed += len(tokens)
+                for values, f in columns:
+                    _writeArray(values, f)
+                tokens, offsets, labels, idOffsets = array('I'), array('q'), array('i'), array('q')
+                columns = ((tokens, tokenFile), (offsets, offsetFile), (labels, labelFile), (idOffsets, idOffsetFile))
+        numTokens = flushed + len(tokens)
+        for values, f in columns:
+            _writeArray(values, f)
+
+    with open(os.path.join(corpusPath, 'vocabulary.txt'), 'w', encoding='utf-8', newline='\n') as f:
+        for word in vocabulary:
+            f.write(word + '\n')
+    meta = {'format': FORMAT_VERSION, 'tokenizer': tokenizer.TOKENIZER_VERSION, 'numDocuments': numDocuments, 'numTokens': numTokens, 'numTerms': len(vocabulary),
+            'labelled': bool(labelsInSet), 'classes': list(classes) if labelsInSet else None, 'textFile': textFile}
+    meta.update(source)
+    # meta.json is written last, an interrupted compile is never mistaken for a current corpus
+    with open(metaPath, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return corpusPath
+
+
+def _writeArray(values:array, f):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    values.tofile(f)
+
+
+class CompiledCorpus():
+    """
+    Read-only view of a compiled corpus. It is a sequence of documents: corpus[i] is the list of words of document i
+    """
+    def __init__(self, corpusPath:str, start:int=0, stop:int=None, _shared:dict=None):
+        if _shared is None:
+            with open(os.path.join(corpusPath, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('format') != FORMAT_VERSION:
+                raise ValueError(corpusPath + " has corpus format " + str(meta.get('format')) + ", expected " + str(FORMAT_VERSION))
+            with open(os.path.join(corpusPath, 'vocabulary.txt'), encoding='utf-8', newline='\n') as f:
+                vocabulary = f.read().split('\n')[:-1]
+            _shared = {
+                'meta': meta,
+                'vocabulary': vocabulary,
+                'tokens': _mapArray(os.path.join(corpusPath, 'tokens.u32'), '<u4', meta['numTokens']),
+                'offsets': _mapArray(os.path.join(corpusPath, 'offsets.i64'), '<i8', meta['numDocuments'] + 1),
+                'labels': _mapArray(os.path.join(corpusPath, 'labels.i32'), '<i4', meta['numDocuments']) if meta['labelled'] else None,
+                'idOffsets': _mapArray(os.path.join(corpusPath, 'ids.i64'), '<i8', meta['numDocuments'] + 1),
+            }
+        self.path = corpusPath
+        self._shared = _shared
+        numDocuments = _shared['meta']['numDocuments']
+        self.start = start
+        self.stop = numDocuments if stop is None else min(stop, numDocuments)
+
+    @property
+    def vocabulary(self) -> list:
+        """
+        Returns:
+        list[str]: The term of every term id
+        """
+        return self._shared['vocabulary']
+
+    @property
+    def classes(self) -> list:
+        """
+        Returns:
+        list[str]: The classes of a labelled corpus in order of first appearance, None if unlabelled
+        """
+        return self._shared['meta']['classes']
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        Returns:
+        np.ndarray: The len(self) + 1 token offsets of these documents into the tokens array of the whole corpus
+        """
+        return self._shared['offsets'][self.start:self.stop + 1]
+
+    @property
+    def tokens(self) -> np.ndarray:
+        """
+        Returns:
+        np.ndarray: The term ids of all tokens of these documents, a view of the memory-mapped file
+        """
+        offsets = self.offsets
+        return self._shared['tokens'][offsets[0]:offsets[-1]]
+
+    @property
+    def labelCodes(self) -> np.ndarray:
+        """
+        Returns:
+        np.ndarray: The class index of every document, None if unlabelled
+        """
+        labels = self._shared['labels']
+        return None if labels is None else labels[self.start:self.stop]
+
+    @property
+    def labels(self) -> list:
+        """
+        Returns:
+        list[str]: The class of every document, None if unlabelled
+        """
+        codes = self.labelCodes
+        return None if codes is None else [self.classes[code] for code in codes.tolist()]
+
+    @property
+    def ids(self) -> list:
+        """
+        Returns:
+        list[str]: The ID of every document: its id column, read from ids.txt for these documents only, or for a text
+                   file its line number, counted from 1
+        """
+        if self._shared['meta']['textFile']:
+            return [str(i + 1) for i in range(self.start, self.stop)]
+        return [documentID[:-1] for documentID in self._readRanges(os.path.join(self.path, 'ids.txt'))]
+
+    @property
+    def lines(self) -> list:
+        """
+        Returns:
+        list[str]: The source line of every document of a text file corpus without its line break, read by offset for
+                   these documents only
+        """
+        if not self._shared['meta']['textFile']:
+            raise ValueError(self.path + " is compiled from a .csv file, its documents are not lines")
+        return [line.rstrip('\r\n') for line in self._readRanges(self._shared['meta']['source'])]
+
+    def _readRanges(self, path:str) -> list:
+        # the byte ranges of these documents in path, given by the ids.i64 offsets, read with a single read()
+        offsets = self._shared['idOffsets'][self.start:self.stop + 1].tolist()
+        if len(offsets) < 2:
+            return []
+        with open(path, 'rb') as f:
+            f.seek(offsets[0])
+            data = f.read(offsets[-1] - offsets[0])
+        return [data[start - offsets[0]:stop - offsets[0]].decode('utf-8', errors='replace') for start, stop in zip(offsets, offsets[1:])]
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def termIDs(self, i:int) -> np.ndarray:
+        """
+        Returns:
+        np.ndarray: The term ids of document i, without copying
+        """
+        offsets = self._shared['offsets']
+        return self._shared['tokens'][offsets[self.start + i]:offsets[self.start + i + 1]]
+
+    def __getitem__(self, i:int) -> list:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        vocabulary = self.vocabulary
+        return [vocabulary[termID] for termID in self.termIDs(i).tolist()]
+
+    def __iter__(self):
+        vocabulary = self.vocabulary
+        offsets = self.offsets.tolist()
+        tokens = self._shared['tokens']
+        for i in range(len(self)):
+            yield [vocabulary[termID] for termID in tokens[offsets[i]:offsets[i + 1]].tolist()]
+
+    def slice(self, start:int, stop:int) -> 'CompiledCorpus':
+        """
+        Returns:
+        CompiledCorpus: Documents start to stop of this corpus, sharing the memory-mapped arrays
+        """
+        return CompiledCorpus(self.path, self.start + start, min(self.start + stop, self.stop), self._shared)
+
+    def chunks(self, chunkSize:int):
+        """
+        Yields:
+        CompiledCorpus: Consecutive slices of chunkSize documents
+        """
+        for start in range(0, len(self), chunkSize):
+            yield self.slice(start, start + chunkSize)
+
+
+def _mapArray(path:str, dtype:str, length:int) -> np.ndarray:
+    if length == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+
+def openCorpus(sourcePath:str, labelsInSet:bool=None, corpusPath:str=None) -> CompiledCorpus:
+    """
+    Compiles sourcePath if it has no current compiled corpus yet and opens the corpus
+
+    Returns:
+    CompiledCorpus: The whole corpus
+    """
+    return CompiledCorpus(compileCorpus(sourcePath, corpusPath, labelsInSet))
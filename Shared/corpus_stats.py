@@ -0,0 +1,269 @@
+"""
+Corpus statistics computed in one map-reduce pass, shared by the MNB and Lexicon Analyzer reports.
+
+Every chunk of documents is counted on its own (map) into a CorpusStatistics and the chunk counts are added
+together (reduce), so chunks can be counted by a process pool in any order. Counts are kept per group:
+
+    all                   every document
+    class:<label>         documents of one class of a labelled .csv file
+    polarity:<name>       documents the lexicon calls positive, negative or neutral
+
+For every group the term frequency (occurrences), document frequency and number of documents are kept, plus how
+many documents contain each positive and each negative lexicon entry (word or phrase). The lexicon part comes from a
+lexicon_matcher.LexiconMatcher, the one the Lexicon Analyzer scores with, so the polarity of a document is the
+decision PositiveNegative.run makes for it (phrases, weights and negation included) and an entry is a hit where the
+matcher counted it. The statistics are saved as JSON and a later run can add new files to them without recounting
+the ones already counted
+"""
+import collections
+import contextlib
+import csv
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+
+import tokenizer
+
+DEFAULT_CHUNK_SIZE = 10000 # documents per chunk
+ALL = 'all'
+STATS_FORMAT_VERSION = 2
+POLARITY_GROUPS = {1: 'polarity:positive', -1: 'polarity:negative', 0: 'polarity:neutral'} # by lexicon_matcher.decide
+
+_matcher = None # the lexicon matcher of each worker process
+
+
+class CorpusStatistics():
+    """
+    Additive counts of a corpus, combine two with merge() or +
+    """
+    def __init__(self):
+        self.termFrequency = collections.defaultdict(collections.Counter)
+        self.documentFrequency = collections.defaultdict(collections.Counter)
+        self.documentCounts = collections.Counter()
+        self.lexiconHits = collections.defaultdict(_newHits) # group -> {'positive': Counter, 'negative': Counter}
+        self.sources = {} # path -> size, modification time and number of documents of every counted file
+
+    def update(self, documents, matcher=None):
+        """
+        Counts more documents
+
+        Paramaters:
+        documents (iterable[tuple]): (label, words) pairs, label is None for unlabelled documents
+        matcher (LexiconMatcher): Decides the polarity of every document and finds its lexicon hits, without one
+                                  there are no polarity groups or hits
+
+        Returns:
+        CorpusStatistics: self
+        """
+        termFrequency, documentFrequency, lexiconHits = self.termFrequency, self.documentFrequency, self.lexiconHits
+        if matcher is not None:
+            import lexicon_matcher # the module of the matcher, already loaded by whoever built it
+            matchTokens, scoreMatches, decide = matcher.matchTokens, lexicon_matcher.scoreMatches, lexicon_matcher.decide
+        for label, words in documents:
+            counts = collections.Counter(words)
+            groups = [ALL] if label is None else [ALL, 'class:' + label]
+            if matcher is not None:
+                matches = matchTokens(words)
+                groups.append(POLARITY_GROUPS[decide(scoreMatches(matches))])
+                # every entry once per document, under the lexicon it comes from whether or not it was negated
+                positive, negative = set(), set()
+                for start, end, weight, negated in matches:
+                    (positive if (weight > 0) != negated else negative).add(' '.join(words[start:end + 1]))
+            for group in groups:
+                termFrequency[group].update(counts)
+                documentFrequency[group].update(counts.keys())
+                self.documentCounts[group] += 1
+                if matcher is not None:
+                    lexiconHits[group]['positive'].update(positive)
+                    lexiconHits[group]['negative'].update(negative)
+        return self
+
+    def merge(self, other:'CorpusStatistics') -> 'CorpusStatistics':
+        """
+        Adds the counts of other to these counts
+
+        Returns:
+        CorpusStatistics: self
+        """
+        for group, counts in other.termFrequency.items():
+            self.termFrequency[group].update(counts)
+        for group, counts in other.documentFrequency.items():
+            self.documentFrequency[group].update(counts)
+        self.documentCounts.update(other.documentCounts)
+        for group, hits in other.lexiconHits.items():
+            for polarity, counts in hits.items():
+                self.lexiconHits[group][polarity].update(counts)
+        self.sources.update(other.sources)
+        return self
+
+    def __add__(self, other:'CorpusStatistics') -> 'CorpusStatistics':
+        return CorpusStatistics().merge(self).merge(other)
+
+    @property
+    def groups(self) -> list:
+        return sorted(self.documentCounts)
+
+    def topTerms(self, k:int=10, group:str=ALL, measure:str='tf', exclude=()) -> list:
+        """
+        Paramaters:
+        k (int): Number of terms
+        group (str): 'all', 'class:<label>' or 'polarity:<positive|negative|neutral>'
+        measure (str): 'tf' for occurrences or 'df' for number of documents
+        exclude (iterable[str]): Terms to leave out e.g. stop words
+
+        Returns:
+        list[tuple]: The k (term, count) pairs with the highest counts, highest first
+        """
+        if measure not in ('tf', 'df'):
+            raise ValueError("measure must be 'tf' or 'df', not " + repr(measure))
+        counts = (self.termFrequency if measure == 'tf' else self.documentFrequency).get(group, {})
+        exclude = frozenset(exclude)
+        return heapq.nlargest(k, ((term, count) for term, count in counts.items() if term not in exclude), key=lambda item: item[1])
+
+    def toDict(self) -> dict:
+        return {
+            'format': STATS_FORMAT_VERSION,
+            'termFrequency': {group: dict(counts) for group, counts in self.termFrequency.items()},
+            'documentFrequency': {group: dict(counts) for group, counts in self.documentFrequency.items()},
+            'documentCounts': dict(self.documentCounts),
+            'lexiconHits': {group: {polarity: dict(counts) for polarity, counts in hits.items()} for group, hits in self.lexiconHits.items()},
+            'sources': self.sources,
+        }
+
+    @classmethod
+    def fromDict(cls, data:dict) -> 'CorpusStatistics':
+        if data.get('format') != STATS_FORMAT_VERSION:
+            raise ValueError("statistics format " + str(data.get('format')) + " is not " + str(STATS_FORMAT_VERSION) + ", count the files again")
+        stats = cls()
+        for group, counts in data['termFrequency'].items():
+            stats.termFrequency[group] = collections.Counter(counts)
+        for group, counts in data['documentFrequency'].items():
+            stats.documentFrequency[group] = collections.Counter(counts)
+        stats.documentCounts = collections.Counter(data['documentCounts'])
+        for group, hits in data['lexiconHits'].items():
+            for polarity, counts in hits.items():
+                stats.lexiconHits[group][polarity] = collections.Counter(counts)
+        stats.sources = dict(data.get('sources', {}))
+        return stats
+
+    def save(self, path:str):
+        """
+        Writes the statistics as JSON
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.toDict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path:str) -> 'CorpusStatistics':
+        with open(path, encoding='utf-8') as f:
+            return cls.fromDict(json.load(f))
+
+
+def readDocuments(path:str, labelsInSet:bool=None):
+    """
+    Reads the documents of a .csv file of (id, class, text) or (id, text) rows after an attribute names line, or of
+    any other file with one document per line
+
+    Paramaters:
+    path (str): The file
+    labelsInSet (bool): If the .csv rows have a class column, by default if the first line names 3 or more columns
+
+    Yields:
+    tuple: (label, text) of every document, label is None for unlabelled documents
+    """
+    if not path.lower().endswith('.csv'):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                yield None, line
+        return
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if labelsInSet is None:
+            labelsInSet = header is not None and len(header) >= 3
+        for row in reader:
+            if labelsInSet:
+                yield row[1].upper(), row[2]
+            else:
+                yield None, row[1]
+
+
+def _newHits() -> dict:
+    return {'positive': collections.Counter(), 'negative': collections.Counter()}
+
+
+def _initWorker(matcher):
+    global _matcher
+    _matcher = matcher
+
+
+def _countChunk(chunk:list) -> CorpusStatistics:
+    return CorpusStatistics().update(((label, tokenizer.tokenize(text)) for label, text in chunk), _matcher)
+
+
+def _chunks(iterable, chunkSize:int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunkSize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def countFiles(paths, stats:CorpusStatistics=None, matcher=None, workers:int=1, chunkSize:int=DEFAULT_CHUNK_SIZE, labelsInSet:bool=None) -> CorpusStatistics:
+    """
+    Counts files into stats in one pass, files already in stats.sources that have not changed since are skipped
+
+    Paramaters:
+    paths (iterable[str]): The files, see readDocuments
+    stats (CorpusStatistics): Statistics to extend, e.g. from CorpusStatistics.load, a new one if None
+    matcher (LexiconMatcher): The lexicons, e.g. lexicon_scorer.getScorer().matcher
+    workers (int): Number of worker processes, None for the number of CPUs
+    chunkSize (int): Number of documents counted per task
+    labelsInSet (bool): See readDocuments
+
+    Returns:
+    CorpusStatistics: stats
+    """
+    stats = stats if stats is not None else CorpusStatistics()
+    workers = workers or os.cpu_count() or 1
+    # leaving the pool terminates it, an error does not wait for the chunks still being counted
+    with (multiprocessing.Pool(workers, initializer=_initWorker, initargs=(matcher,)) if workers > 1 else contextlib.nullcontext()) as pool:
+        for path in paths:
+            source = {'size': os.path.getsize(path), 'mtime': os.path.getmtime(path)}
+            key = os.path.abspath(path)
+            previous = stats.sources.get(key)
+            if previous is not None and previous['size'] == source['size'] and previous['mtime'] == source['mtime']:
+                continue
+            if previous is not None:
+                raise ValueError(path + " changed since it was counted, count it into new statistics")
+
+            chunks = _chunks(readDocuments(path, labelsInSet), chunkSize)
+            if pool is None:
+                _initWorker(matcher)
+                counted = map(_countChunk, chunks)
+            else:
+                counted = pool.imap_unordered(_countChunk, chunks)
+            documents = 0
+            for chunkStats in counted:
+                documents += chunkStats.documentCounts[ALL]
+                stats.merge(chunkStats)
+            source['documents'] = documents
+            stats.sources[key] = source
+    return stats
+
+
+def countFile(path:str, matcher=None, workers:int=1, statsPath:str=None, labelsInSet:bool=None) -> CorpusStatistics:
+    """
+    Counts one file, extending and re-saving statsPath if given
+
+    Returns:
+    CorpusStatistics: The statistics
+    """
+    stats = CorpusStatistics.load(statsPath) if statsPath and os.path.exists(statsPath) else None
+    stats = countFiles([path], stats, matcher, workers, labelsInSet=labelsInSet)
+    if statsPath:
+        stats.save(statsPath)
+    return stats
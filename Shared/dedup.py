@@ -0,0 +1,193 @@
+"""
+Collapses exact and near-duplicate documents (retweets, copy-pasted news blurbs) into clusters so each cluster is
+counted or scored once and the result is fanned out to every member.
+
+Documents are compared as token lists from tokenizer.tokenize. Identical token lists are merged first with a hash
+table. The remaining documents get a MinHash signature of their word shingles, and locality sensitive hashing over
+bands of the signatures finds candidate pairs. A candidate is merged into a cluster when the fraction of equal
+signature values, an estimate of the Jaccard similarity of the shingle sets, is at least the threshold. The first
+document of every cluster is its representative
+"""
+import zlib
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 31) - 1 # hash values are kept below 2^31 so a * h + b fits in 64 bits
+SHINGLE_BATCH = 1 << 16 # shingles hashed per numpy batch, bounds the (permutations x shingles) work array
+
+
+class Clusters():
+    """
+    The clusters of a set of documents
+    """
+    def __init__(self, assignment:np.ndarray, representatives:np.ndarray):
+        self.assignment = assignment # the cluster of every document
+        self.representatives = representatives # the first document of every cluster
+        self.multiplicity = np.bincount(assignment, minlength=len(representatives)) # documents in every cluster
+
+    @property
+    def numClusters(self) -> int:
+        return len(self.representatives)
+
+    @property
+    def numDuplicates(self) -> int:
+        return len(self.assignment) - len(self.representatives)
+
+    def select(self, items:list) -> list:
+        """
+        Returns:
+        list: The items of the representatives, e.g. select(documents) gives one document per cluster
+        """
+        return [items[i] for i in self.representatives]
+
+    def expand(self, values):
+        """
+        Fans one value per cluster out to every document
+
+        Paramaters:
+        values (list or np.ndarray): A value for every cluster, in cluster order e.g. predictions of select(documents)
+
+        Returns:
+        list or np.ndarray: The value of every document
+        """
+        if isinstance(values, np.ndarray):
+            return values[self.assignment]
+        return [values[cluster] for cluster in self.assignment.tolist()]
+
+
+class Deduplicator():
+    """
+    Exact plus MinHash/LSH near-duplicate clustering
+    """
+    def __init__(self, threshold:float=0.8, numPermutations:int=128, shingleSize:int=2, seed:int=1, nearDuplicates:bool=True):
+        """
+        Paramaters:
+        threshold (float): Estimated Jaccard similarity of the shingle sets at which two documents are duplicates
+        numPermutations (int): Length of the MinHash signatures
+        shingleSize (int): Number of consecutive words in a shingle
+        seed (int): Seed of the hash functions
+        nearDuplicates (bool): If False only identical token lists are merged
+        """
+        self.threshold = threshold
+        self.numPermutations = numPermutations
+        self.shingleSize = shingleSize
+        self.nearDuplicates = nearDuplicates
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, numPermutations, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, numPermutations, dtype=np.uint64)
+        self.bands, self.rows = bandLayout(numPermutations, threshold)
+
+    def shingles(self, tokens:list) -> list:
+        """
+        Returns:
+        list[int]: The 31 bit hashes of the word shingles of a document, documents shorter than a shingle are one shingle
+        """
+        size = self.shingleSize
+        if len(tokens) <= size:
+            return [zlib.crc32(' '.join(tokens).encode('utf-8')) % MERSENNE_PRIME]
+        return [zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8')) % MERSENNE_PRIME for i in range(len(tokens) - size + 1)]
+
+    def signatures(self, documents:list) -> np.ndarray:
+        """
+        Returns:
+        np.ndarray: The (documents x numPermutations) MinHash signatures
+        """
+        signatures = np.empty((len(documents), self.numPermutations), dtype=np.uint64)
+        a, b = self._a[:, None], self._b[:, None]
+        start = 0
+        while start < len(documents):
+            # hash the shingles of a batch of documents at once and take the minimum per document
+            hashes, lengths = [], []
+            end = start
+            while end < len(documents) and (end == start or len(hashes) < SHINGLE_BATCH):
+                documentHashes = self.shingles(documents[end])
+                hashes.extend(documentHashes)
+                lengths.append(len(documentHashes))
+                end += 1
+            values = (a * np.asarray(hashes, dtype=np.uint64)[None, :] + b) % MERSENNE_PRIME
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            signatures[start:end] = np.minimum.reduceat(values, offsets, axis=1).T
+            start = end
+        return signatures
+
+    def cluster(self, documents:list, groups:list=None) -> Clusters:
+        """
+        Paramaters:
+        documents (list[list[str]]): The tokenized documents
+        groups (list): Optional group of every document e.g. its class label, documents of different groups are never
+                       merged
+
+        Returns:
+        Clusters: The clusters, numbered in order of their first document
+        """
+        numDocuments = len(documents)
+        parent = np.arange(numDocuments)
+
+        # exact duplicates: identical token lists in the same group
+        firstOf = {}
+        unique = []
+        for i, tokens in enumerate(documents):
+            key = (groups[i] if groups is not None else None, tuple(tokens))
+            first = firstOf.setdefault(key, i)
+            if first == i:
+                unique.append(i)
+            else:
+                parent[i] = first
+
+        if self.nearDuplicates and len(unique) > 1:
+            signatures = self.signatures([documents[i] for i in unique])
+            for band in range(self.bands):
+                buckets = {}
+                columns = signatures[:, band * self.rows:(band + 1) * self.rows]
+                for row, i in enumerate(unique):
+                    key = (groups[i] if groups is not None else None, columns[row].tobytes())
+                    first = buckets.setdefault(key, row)
+                    if first != row and np.mean(signatures[first] == signatures[row]) >= self.threshold:
+                        _union(parent, unique[first], i)
+
+        roots = np.array([_find(parent, i) for i in range(numDocuments)], dtype=np.int64)
+        # number the clusters by their first document, which is the root since unions keep the smaller index
+        representatives = np.flatnonzero(roots == np.arange(numDocuments))
+        clusterOf = np.empty(numDocuments, dtype=np.int64)
+        clusterOf[representatives] = np.arange(len(representatives))
+        return Clusters(clusterOf[roots], representatives)
+
+
+def _find(parent:np.ndarray, i:int) -> int:
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return int(root)
+
+
+def _union(parent:np.ndarray, i:int, j:int):
+    i, j = _find(parent, i), _find(parent, j)
+    if i != j:
+        parent[max(i, j)] = min(i, j)
+
+
+def bandLayout(numPermutations:int, threshold:float) -> tuple:
+    """
+    Picks the LSH bands x rows split of the signature whose similarity threshold (1 / bands) ^ (1 / rows) is closest to
+    threshold without going over it, so few true duplicates are missed
+
+    Returns:
+    tuple: (bands, rows)
+    """
+    best = (1, numPermutations)
+    for rows in range(1, numPermutations + 1):
+        if numPermutations % rows:
+            continue
+        bands = numPermutations // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+def cluster(documents:list, groups:list=None, **kwargs) -> Clusters:
+    """
+    Clusters documents with a Deduplicator(**kwargs)
+    """
+    return Deduplicator(**kwargs).cluster(documents, groups)
@@ -0,0 +1,368 @@
+"""
+Named stage spans that measure where a run spends its time and memory.
+
+Code marks its stages with the module level stage() context manager, which costs next to nothing unless a Recorder
+is active on the calling thread (every thread has its own active Recorder, e.g. a GUI worker thread and the main
+thread can be measured at the same time):
+
+    with instrumentation.stage('fit', items=len(y)):
+        nb.fit(...)
+
+A Recorder collects one span per stage call with its wall time, CPU time, the resident set size at the end of the
+stage, the peak resident set size of the process so far (a lifetime high-water mark, so it only grows from one stage
+to the next), the tracemalloc peak during the stage (if traceMemory is set) and the number of items the stage
+handled. Stages can be nested and can run many times, e.g. once per chunk; the summary table adds up the calls
+of a stage under the same enclosing stages and shows them as a tree. Stages named in profile are also run under cProfile and their stats are saved to <name>.prof
+
+    with instrumentation.Recorder(jsonPath='stages.jsonl') as recorder:
+        main()
+    # prints the summary table and writes one JSON line per span when the outermost activation exits
+
+fromEnvironment() builds a Recorder from the INSTRUMENT, INSTRUMENT_JSONL, INSTRUMENT_PROFILE and
+INSTRUMENT_TRACEMALLOC environment variables so the scripts can be measured without editing them
+"""
+import contextlib
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+_local = threading.local() # .active is the Recorder active on each thread
+
+
+def currentRSS() -> int:
+    """
+    Returns:
+    int: The resident set size of the process now in bytes, None where the platform does not report it (only Linux)
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            residentPages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return residentPages * _PAGE_SIZE
+
+
+def peakRSS() -> int:
+    """
+    Returns:
+    int: The peak resident set size of the process so far in bytes, None where the platform does not report it
+    """
+    if resource is None:
+        return None
+    maxRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxRSS if sys.platform == 'darwin' else maxRSS * 1024 # macOS reports bytes, Linux kilobytes
+
+
+class Span():
+    """
+    One call of a stage
+    """
+    def __init__(self, name:str, items:int=None, parent:'Span'=None, order:int=0):
+        self.name = name
+        self.items = items
+        self.parent = parent
+        self.path = (name,) if parent is None else parent.path + (name,) # the names of the enclosing stages and this one
+        self.depth = len(self.path) - 1
+        self.order = order # spans are numbered in the order they start
+        self.wall = self.cpu = 0.0
+        self.rss = None # resident set size at the end of the stage
+        self.peakRSS = None # peak resident set size of the process up to the end of the stage
+        self.peakTraced = None
+
+    def count(self, items:int):
+        """
+        Adds items to the number of items the stage handled, for stages that only know it at the end
+        """
+        self.items = (self.items or 0) + items
+
+    @property
+    def throughput(self) -> float:
+        """
+        Returns:
+        float: Items per second of wall time, None if the stage did not count items
+        """
+        if self.items is None or self.wall <= 0:
+            return None
+        return self.items / self.wall
+
+    def toDict(self) -> dict:
+        return {'stage': self.name, 'path': '/'.join(self.path), 'depth': self.depth,
+                'wall': self.wall, 'cpu': self.cpu, 'items': self.items, 'throughput': self.throughput,
+                'rss': self.rss, 'peakRSS': self.peakRSS, 'peakTraced': self.peakTraced}
+
+
+class _NullSpan():
+    # stands in for a Span when no Recorder is active
+    items = None
+
+    def count(self, items:int):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Recorder():
+    def __init__(self, jsonPath:str=None, table:bool=True, profile=None, profileDir:str='.', traceMemory:bool=False, stream=None):
+        """
+        Paramaters:
+        jsonPath (str): Append one JSON line per span to this file when the run ends
+        table (bool): Print the summary table when the run ends
+        profile (iterable[str] or bool): Names of the stages to run under cProfile, True for every stage
+        profileDir (str): Where the <stage>.prof files are saved
+        traceMemory (bool): Measure the peak Python heap of every stage with tracemalloc, this slows the run down
+        stream: Where the table is printed, sys.stdout if None
+        """
+        self.jsonPath = jsonPath
+        self.table = table
+        self.profile = profile if profile is True or profile is None else frozenset(profile)
+        self.profileDir = profileDir
+        self.traceMemory = traceMemory
+        self.stream = stream
+        self.spans = []
+        self.profiles = {} # stage name -> cProfile.Profile, enabled again on every call of the stage
+        self._open = []
+        self._profiling = None # the span whose profiler is running, profilers cannot be nested
+        self._activations = 0
+        self._started = 0
+        self._previous = []
+        self._startedTracing = False
+        self._highestRSS = None
+        self.thread = None
+
+    def __enter__(self) -> 'Recorder':
+        if self._activations == 0:
+            self.thread = threading.get_ident()
+            if self.traceMemory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._startedTracing = True
+        elif self.thread != threading.get_ident():
+            raise RuntimeError("A Recorder records one thread at a time, give every thread its own")
+        self._activations += 1
+        self._previous.append(getattr(_local, 'active', None))
+        _local.active = self
+        return self
+
+    def __exit__(self, *exc):
+        _local.active = self._previous.pop()
+        self._activations -= 1
+        if self._activations == 0:
+            if self._startedTracing:
+                tracemalloc.stop()
+                self._startedTracing = False
+            self.report()
+        return False
+
+    def _nextOrder(self) -> int:
+        self._started += 1
+        return self._started
+
+    def _wantsProfile(self, name:str) -> bool:
+        return self.profile is True or (self.profile is not None and name in self.profile)
+
+    @contextlib.contextmanager
+    def stage(self, name:str, items:int=None):
+        """
+        Measures one call of the stage name
+
+        Paramaters:
+        name (str): The stage name, calls with the same name are added up in the summary
+        items (int): Number of items the stage handles, can also be counted with span.count()
+
+        Yields:
+        Span: The span being measured
+        """
+        span = Span(name, items, self._open[-1] if self._open else None, self._nextOrder())
+        self._closeTracedSegment()
+        self._open.append(span)
+        profiler = None
+        if self._profiling is None and self._wantsProfile(name):
+            profiler = self.profiles.setdefault(name, cProfile.Profile())
+            self._profiling = span
+        cpuStarted = time.process_time()
+        wallStarted = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield span
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = None
+            span.wall = time.perf_counter() - wallStarted
+            span.cpu = time.process_time() - cpuStarted
+            self._closeTracedSegment()
+            self._open.pop()
+            span.rss = currentRSS()
+            # the kernel's high-water mark can lag the current size, so the largest size seen so far counts too
+            sizes = [size for size in (peakRSS(), span.rss, self._highestRSS) if size is not None]
+            span.peakRSS = self._highestRSS = max(sizes) if sizes else None
+            self.spans.append(span)
+
+    def _closeTracedSegment(self):
+        # the tracemalloc peak is reset at every span boundary, so the peak since the last boundary counts for every
+        # open span and each span ends up with the maximum over its segments
+        if not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for span in self._open:
+            span.peakTraced = peak if span.peakTraced is None else max(span.peakTraced, peak)
+        tracemalloc.reset_peak()
+
+    def summary(self) -> list:
+        """
+        Returns:
+        list[dict]: One entry per stage path (the stage and its enclosing stages) with its calls, summed wall and CPU
+                    time and items, the throughput over the summed wall time and the highest memory of any call.
+                    Entries are in tree order, every stage followed by the stages run inside it, in order of first start
+        """
+        stages = {}
+        for span in sorted(self.spans, key=lambda span: span.order):
+            stage = stages.get(span.path)
+            if stage is None:
+                stage = stages[span.path] = {'stage': span.name, 'path': '/'.join(span.path), 'depth': span.depth, 'calls': 0,
+                                             'wall': 0.0, 'cpu': 0.0, 'items': None, 'rss': None, 'peakRSS': None, 'peakTraced': None}
+            stage['calls'] += 1
+            stage['wall'] += span.wall
+            stage['cpu'] += span.cpu or 0.0
+            if span.items is not None:
+                stage['items'] = (stage['items'] or 0) + span.items
+            for key in ('rss', 'peakRSS', 'peakTraced'):
+                if getattr(span, key) is not None:
+                    stage[key] = max(stage[key] or 0, getattr(span, key))
+        children = {}
+        for path in stages: # in order of first start
+            children.setdefault(path[:-1], []).append(path)
+        ordered = []
+
+        def visit(parent:tuple):
+            for path in children.get(parent, ()):
+                stage = stages[path]
+                stage['throughput'] = stage['items'] / stage['wall'] if stage['items'] is not None and stage['wall'] > 0 else None
+                ordered.append(stage)
+                visit(path)
+        visit(())
+        return ordered
+
+    def formatTable(self) -> str:
+        """
+        Returns:
+        str: The summary as a text table, nested stages indented under their parent
+        """
+        header = ('stage', 'calls', 'wall s', 'cpu s', 'items', 'items/s', 'RSS MB', 'process peak MB', 'traced MB')
+        rows = [header]
+        for stage in self.summary():
+            rows.append((
+                '  ' * stage['depth'] + stage['stage'],
+                str(stage['calls']),
+                '%.3f' % stage['wall'],
+                '%.3f' % stage['cpu'],
+                '' if stage['items'] is None else str(stage['items']),
+                '' if stage['throughput'] is None else '%.0f' % stage['throughput'],
+                '' if stage['rss'] is None else '%.1f' % (stage['rss'] / 2 ** 20),
+                '' if stage['peakRSS'] is None else '%.1f' % (stage['peakRSS'] / 2 ** 20),
+                '' if stage['peakTraced'] is None else '%.1f' % (stage['peakTraced'] / 2 ** 20),
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        lines = [row[0].ljust(widths[0]) + '  ' + '  '.join(cell.rjust(width) for cell, width in zip(row[1:], widths[1:])) for row in rows]
+        lines.insert(1, '-' * len(lines[0]))
+        return '\n'.join(lines)
+
+    def writeJSONLines(self, path:str):
+        """
+        Appends one JSON line per span to path, so the spans of several runs can be kept in one file
+        """
+        with open(path, 'a', encoding='utf-8') as f:
+            for span in self.spans:
+                f.write(json.dumps(span.toDict()) + '\n')
+
+    def saveProfiles(self) -> list:
+        """
+        Returns:
+        list[str]: The <stage>.prof files written, readable with pstats or snakeviz
+        """
+        paths = []
+        for name, profiler in self.profiles.items():
+            path = os.path.join(self.profileDir, re.sub(r'\W+', '_', name).strip('_') + '.prof')
+            profiler.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def report(self):
+        """
+        Emits everything that was asked for: the JSON lines, the .prof files and the summary table
+        """
+        if self.jsonPath:
+            self.writeJSONLines(self.jsonPath)
+        paths = self.saveProfiles()
+        if self.table and self.spans:
+            stream = self.stream or sys.stdout
+            print(self.formatTable(), file=stream)
+            for path in paths:
+                print("Profile saved to", path, file=stream)
+
+
+def stage(name:str, items:int=None):
+    """
+    Measures a stage with the active Recorder of this thread, does nothing if there is none
+
+    Returns:
+    A context manager yielding the Span (or a stand-in with the same count() method)
+    """
+    recorder = getattr(_local, 'active', None)
+    if recorder is None:
+        return _NULL_SPAN
+    return recorder.stage(name, items)
+
+
+def activate(recorder:Recorder):
+    """
+    Returns:
+    A context manager that makes recorder active, or does nothing if recorder is None
+    """
+    return contextlib.nullcontext() if recorder is None else recorder
+
+
+def fromEnvironment(environ=None) -> Recorder:
+    """
+    Builds a Recorder from environment variables, None if none of them is set
+
+        INSTRUMENT=1                 print the summary table
+        INSTRUMENT_JSONL=path        append the spans to path as JSON lines
+        INSTRUMENT_PROFILE=a,b|all   run these stages under cProfile
+        INSTRUMENT_TRACEMALLOC=1     measure the peak Python heap of every stage
+
+    Returns:
+    Recorder: The recorder to pass to main() or run(), or None
+    """
+    environ = os.environ if environ is None else environ
+    table = environ.get('INSTRUMENT', '') not in ('', '0')
+    jsonPath = environ.get('INSTRUMENT_JSONL') or None
+    profile = environ.get('INSTRUMENT_PROFILE') or None
+    traceMemory = environ.get('INSTRUMENT_TRACEMALLOC', '') not in ('', '0')
+    if not (table or jsonPath or profile or traceMemory):
+        return None
+    if profile is not None:
+        profile = True if profile == 'all' else [name.strip() for name in profile.split(',') if name.strip()]
+    return Recorder(jsonPath, table or not jsonPath, profile, traceMemory=traceMemory)
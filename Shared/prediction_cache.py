@@ -0,0 +1,177 @@
+"""
+Bounded LRU cache of predictions keyed by the tokens of a document and the version of the model that made them.
+
+Tweet streams repeat the same texts over and over (retweets, copy-paste campaigns, bot posts), and once tokenized
+they are the same word list, so a cached prediction is returned instead of scoring the document again. The key is an
+8 byte BLAKE2b hash of the model version and the token sequence from tokenizer.tokenize, the exact input of the
+scorers, so a hit always gives the prediction the model would make.
+
+A cache serves one model at a time. NaiveBayesClassifier.version changes whenever the model is refit, trained
+further, merged or pruned, and LexiconScorer.version whenever the lexicons are reloaded; the first lookup with a new
+version empties the cache. With a path the cache is loaded on creation and written by save() (or on leaving a with
+block), so it survives restarts as long as the model keeps its version. It is not thread-safe
+
+    nb.cache = prediction_cache.PredictionCache(100000, 'predictions.cache')
+    nb.predict_many(documents) # repeated documents are looked up
+    print(nb.cache.stats())
+"""
+import collections
+import hashlib
+import json
+import os
+
+CACHE_FORMAT_VERSION = 1
+_SEPARATOR = '\x1f' # unit separator, never part of a token
+
+
+def documentKey(tokens, version:str) -> int:
+    """
+    Returns:
+    int: The 64 bit cache key of a token sequence scored by the model version
+    """
+    data = (version + _SEPARATOR + _SEPARATOR.join(tokens)).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class PredictionCache():
+    def __init__(self, maxSize:int=100000, path:str=None):
+        """
+        Paramaters:
+        maxSize (int): Most predictions kept, the least recently used are evicted first
+        path (str): File the cache is loaded from if it exists and saved to by save()
+        """
+        if maxSize < 1:
+            raise ValueError("maxSize must be at least 1")
+        self.maxSize = maxSize
+        self.path = path
+        self.version = None # the model version of the cached predictions
+        self.hits = self.misses = self.evictions = 0
+        self._entries = collections.OrderedDict() # key -> prediction, least recently used first
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> 'PredictionCache':
+        return self
+
+    def __exit__(self, *exc):
+        if self.path is not None:
+            self.save()
+        return False
+
+    def _checkVersion(self, version:str):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def lookup(self, documents:list, version:str) -> tuple:
+        """
+        Looks up a batch of tokenized documents
+
+        Paramaters:
+        documents (list[list[str]]): The documents
+        version (str): Version of the model that will score the misses
+
+        Returns:
+        tuple: (predictions, keys, missing): the cached prediction of every document (None for misses), the key of
+               every document for store(), and the indices of the misses in order
+        """
+        self._checkVersion(version)
+        entries = self._entries
+        predictions, keys, missing = [], [], []
+        for i, tokens in enumerate(documents):
+            key = documentKey(tokens, version)
+            keys.append(key)
+            prediction = entries.get(key)
+            if prediction is None:
+                missing.append(i)
+            else:
+                entries.move_to_end(key)
+            predictions.append(prediction)
+        self.hits += len(documents) - len(missing)
+        self.misses += len(missing)
+        return predictions, keys, missing
+
+    def store(self, keys:list, predictions:list, version:str):
+        """
+        Adds predictions made by the model version, evicting the least recently used ones over maxSize
+        """
+        self._checkVersion(version)
+        entries = self._entries
+        for key, prediction in zip(keys, predictions):
+            entries[key] = prediction
+            entries.move_to_end(key)
+        while len(entries) > self.maxSize:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def predict(self, documents:list, version:str, predictMany) -> list:
+        """
+        Returns the prediction of every document, scoring only the documents that are not cached (once per distinct
+        document) with predictMany
+
+        Paramaters:
+        documents (list[list[str]]): The tokenized documents
+        version (str): The version of the model behind predictMany
+        predictMany (callable): Maps a list of documents to a list of predictions
+
+        Returns:
+        list: The prediction of every document
+        """
+        predictions, keys, missing = self.lookup(documents, version)
+        if missing:
+            firstOf = {} # repeats within the batch are scored once too
+            for i in missing:
+                firstOf.setdefault(keys[i], i)
+            unique = list(firstOf.values())
+            self.hits += len(missing) - len(unique)
+            self.misses -= len(missing) - len(unique)
+            computed = predictMany([documents[i] for i in unique])
+            self.store([keys[i] for i in unique], computed, version)
+            byKey = dict(zip((keys[i] for i in unique), computed))
+            for i in missing:
+                predictions[i] = byKey[keys[i]]
+        return predictions
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def hitRate(self) -> float:
+        """
+        Returns:
+        float: Fraction of lookups answered from the cache, 0 before the first lookup
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """
+        Returns:
+        dict: Size, capacity, hits, misses, evictions and hit rate
+        """
+        return {'size': len(self._entries), 'maxSize': self.maxSize, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hitRate': self.hitRate}
+
+    def save(self, path:str=None):
+        """
+        Writes the cache to path (self.path if None) in least recently used first order, replacing the file atomically
+        """
+        path = path or self.path
+        temporaryPath = path + '.tmp'
+        with open(temporaryPath, 'w', encoding='utf-8') as f:
+            json.dump({'format': CACHE_FORMAT_VERSION, 'version': self.version, 'entries': list(self._entries.items())}, f)
+        os.replace(temporaryPath, path)
+
+    def load(self, path:str):
+        """
+        Replaces the entries with the ones saved at path, keeping the most recently used if there are more than maxSize
+        """
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != CACHE_FORMAT_VERSION:
+            raise ValueError(path + " has cache format " + str(data.get('format')) + ", expected " + str(CACHE_FORMAT_VERSION))
+        self.version = data['version']
+        self._entries = collections.OrderedDict((key, prediction) for key, prediction in data['entries'][-self.maxSize:])
@@ -0,0 +1,86 @@
+import threading
+
+import background
+
+
+class FakeWidget():
+    """
+    Runs the callbacks of after() on the calling thread, in place of the Tk event loop
+    """
+    def __init__(self):
+        self.pending = []
+
+    def after(self, milliseconds, callback):
+        self.pending.append(callback)
+
+    def runUntilIdle(self):
+        while self.pending:
+            self.pending.pop(0)()
+            if self.pending:
+                threading.Event().wait(0.01)
+
+
+def run(target, *args, **kwargs):
+    job = background.BackgroundJob(target, *args, **kwargs).start()
+    received = []
+    kinds = ('stage', 'timing', 'progress', 'done', 'cancelled', 'error')
+    widget = FakeWidget()
+    background.watch(widget, job, {kind: (lambda *message, kind=kind: received.append((kind,) + message)) for kind in kinds}, interval=1)
+    widget.runUntilIdle()
+    return job, received
+
+
+def test_stages_progress_and_result_reach_the_gui_thread():
+    def work(job, rows):
+        with job.stage("Counting"):
+            progress = job.reporter("Counting: ")
+            progress.interval = 0
+            for row in range(1, rows + 1):
+                progress.update(row, row / rows)
+            progress.finish()
+        return threading.get_ident()
+
+    job, received = run(work, 3)
+    assert [message[0] for message in received] == ['stage', 'progress', 'progress', 'progress', 'progress', 'timing', 'done']
+    assert received[1:5] == [('progress', "Counting: ", 1, 1 / 3), ('progress', "Counting: ", 2, 2 / 3), ('progress', "Counting: ", 3, 1.0), ('progress', "Counting: ", 3, 1.0)]
+    assert received[-1][1] != threading.get_ident() # the job ran on the worker thread
+    assert job.timings["Counting"] >= 0
+
+
+def test_a_cancelled_job_stops_at_its_next_check():
+    started, stopped = threading.Event(), []
+
+    def work(job):
+        with job.stage("Waiting"):
+            started.set()
+            while True:
+                try:
+                    job.checkCancelled()
+                except background.Cancelled:
+                    stopped.append(True)
+                    raise
+                threading.Event().wait(0.005)
+
+    job = background.BackgroundJob(work).start()
+    started.wait(10)
+    job.cancel()
+    widget = FakeWidget()
+    received = []
+    background.watch(widget, job, {'cancelled': lambda: received.append('cancelled'), 'done': lambda result: received.append('done')}, interval=1)
+    widget.runUntilIdle()
+    assert received == ['cancelled'] and stopped == [True]
+    assert not job.running
+
+
+def test_errors_are_reported_instead_of_raised(capsys):
+    def work(job):
+        raise ValueError("bad row")
+
+    job, received = run(work)
+    assert received == [('error', "bad row")]
+    assert 'ValueError' in capsys.readouterr().err # the traceback is printed for debugging
+
+
+def test_format_progress():
+    assert background.formatProgress("Classifying: ", 4200, 0.42) == "Classifying: 42.0% (4200 rows)"
+    assert background.formatProgress("Reading: ", 10) == "Reading: 10 rows"
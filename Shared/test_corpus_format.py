@@ -0,0 +1,54 @@
+import csv
+import os
+
+import pytest
+
+import corpus_format
+import tokenizer
+
+REVIEWS = ["The food was GOOD\n", "not good, not nice at all\r\n", "\n", "Ñaga — ang ganda\n", "last line without a break"]
+
+
+@pytest.fixture
+def textCorpus(tmp_path):
+    path = tmp_path / 'reviews.txt'
+    path.write_bytes(''.join(REVIEWS).encode('utf-8'))
+    return corpus_format.openCorpus(str(path))
+
+
+@pytest.fixture
+def csvCorpus(tmp_path):
+    path = tmp_path / 'training_set.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'class', 'text'])
+        for i, review in enumerate(REVIEWS):
+            writer.writerow(['review ' + str(i), '01'[i % 2], review])
+    return corpus_format.openCorpus(str(path), labelsInSet=True)
+
+
+def test_text_documents_are_lines(textCorpus):
+    assert list(textCorpus) == [tokenizer.tokenize(review) for review in REVIEWS]
+    assert textCorpus.ids == ['1', '2', '3', '4', '5']
+    assert textCorpus.lines == [review.rstrip('\r\n') for review in REVIEWS]
+    assert textCorpus.slice(1, 4).lines == textCorpus.lines[1:4]
+    assert textCorpus.slice(3, 5).ids == ['4', '5']
+    assert not os.path.exists(os.path.join(textCorpus.path, 'ids.txt')) # the lines are not copied
+
+
+def test_csv_ids_are_read_per_slice(csvCorpus):
+    assert csvCorpus.ids == ['review ' + str(i) for i in range(len(REVIEWS))]
+    assert [chunk.ids for chunk in csvCorpus.chunks(2)] == [csvCorpus.ids[0:2], csvCorpus.ids[2:4], csvCorpus.ids[4:]]
+    assert csvCorpus.slice(2, 2).ids == []
+    assert csvCorpus.labels == ['0', '1', '0', '1', '0']
+    with pytest.raises(ValueError):
+        csvCorpus.lines
+
+
+def test_changed_source_is_recompiled(textCorpus):
+    source = textCorpus._shared['meta']['source']
+    with open(source, 'ab') as f:
+        f.write(b"\nanother review\n")
+    corpus = corpus_format.openCorpus(source)
+    assert len(corpus) == len(REVIEWS) + 1
+    assert corpus.lines[-2:] == [REVIEWS[-1], 'another review']
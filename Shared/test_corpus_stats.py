@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+
+import pytest
+
+import corpus_stats
+import tokenizer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Lexicon Analyzer'))
+import lexicon_matcher
+
+REVIEWS = [
+    "The food was good and the staff were nice",
+    "not good, not nice at all",
+    "this is a rip off",
+    "bad service but a great view, great price",
+    "ordinary day",
+]
+
+
+@pytest.fixture
+def matcher():
+    positive = [('good',), ('nice',), ('great',)]
+    negative = [('bad',), ('rip', 'off')]
+    return lexicon_matcher.LexiconMatcher(positive, negative)
+
+
+def test_polarity_is_the_lexicon_decision(matcher):
+    stats = corpus_stats.CorpusStatistics().update([(None, tokenizer.tokenize(review)) for review in REVIEWS], matcher)
+    decisions = [lexicon_matcher.decide(matcher.score(review)) for review in REVIEWS]
+    assert decisions == [1, -1, -1, 1, 0] # negation and the phrase change the decision
+    for decision, group in corpus_stats.POLARITY_GROUPS.items():
+        assert stats.documentCounts[group] == decisions.count(decision)
+
+
+def test_lexicon_hits_are_kept_per_group(matcher):
+    documents = [('1', tokenizer.tokenize(REVIEWS[0])), ('0', tokenizer.tokenize(REVIEWS[1])), ('0', tokenizer.tokenize(REVIEWS[2])), ('1', tokenizer.tokenize(REVIEWS[3]))]
+    stats = corpus_stats.CorpusStatistics().update(documents, matcher)
+    assert stats.lexiconHits[corpus_stats.ALL]['positive'] == {'good': 2, 'nice': 2, 'great': 1} # once per document
+    assert stats.lexiconHits[corpus_stats.ALL]['negative'] == {'rip off': 1, 'bad': 1}
+    assert stats.lexiconHits['class:0']['positive'] == {'good': 1, 'nice': 1}
+    assert stats.lexiconHits['polarity:negative']['negative'] == {'rip off': 1}
+    assert stats.lexiconHits['polarity:positive']['negative'] == {'bad': 1}
+
+
+def test_without_a_matcher_only_terms_are_counted():
+    stats = corpus_stats.CorpusStatistics().update([(None, ['a', 'b', 'a']), ('X', ['b'])])
+    assert stats.groups == ['all', 'class:X']
+    assert stats.termFrequency['all'] == {'a': 2, 'b': 2}
+    assert stats.documentFrequency['all'] == {'a': 1, 'b': 2}
+    assert not stats.lexiconHits
+
+
+def test_chunks_add_up_and_survive_saving(matcher, tmp_path):
+    documents = [(None, tokenizer.tokenize(review)) for review in REVIEWS]
+    whole = corpus_stats.CorpusStatistics().update(documents, matcher)
+    parts = corpus_stats.CorpusStatistics().update(documents[:2], matcher) + corpus_stats.CorpusStatistics().update(documents[2:], matcher)
+    assert parts.toDict() == whole.toDict()
+    path = str(tmp_path / 'stats.json')
+    whole.save(path)
+    assert corpus_stats.CorpusStatistics.load(path).toDict() == whole.toDict()
+
+
+def test_old_statistics_are_not_extended(tmp_path):
+    path = tmp_path / 'stats.json'
+    path.write_text(json.dumps({'termFrequency': {}, 'documentFrequency': {}, 'documentCounts': {}, 'lexiconHits': {'positive': {}, 'negative': {}}}), encoding='utf-8')
+    with pytest.raises(ValueError):
+        corpus_stats.CorpusStatistics.load(str(path))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_count_files(matcher, tmp_path, workers):
+    path = tmp_path / 'reviews.txt'
+    path.write_text('\n'.join(REVIEWS) + '\n', encoding='utf-8')
+    stats = corpus_stats.countFiles([str(path)], matcher=matcher, workers=workers, chunkSize=2)
+    assert stats.documentCounts[corpus_stats.ALL] == len(REVIEWS)
+    assert stats.toDict() == corpus_stats.CorpusStatistics().update([(None, tokenizer.tokenize(review)) for review in REVIEWS], matcher).toDict() | {'sources': stats.sources}
+    assert corpus_stats.countFiles([str(path)], stats, matcher) is stats # unchanged files are not counted again
+    assert stats.documentCounts[corpus_stats.ALL] == len(REVIEWS)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import dedup
+import tokenizer
+
+NEWS = "nakapagtala ng 370 karagdagang kaso ng covid19 nitong miyerkoles ikalawang sunod na araw na mas mababa sa 400 ang bagong kaso ayon sa doh"
+DOCUMENTS = [tokenizer.tokenize(text) for text in [
+    NEWS,
+    "masaya ako ngayon",
+    "RT " + NEWS, # a retweet of the first
+    "Masaya ako ngayon!", # the same words as the second
+    NEWS.replace("doh", "department of health"), # a lightly edited copy
+    "traffic na naman sa edsa",
+]]
+
+
+def test_exact_and_near_duplicates_are_clustered():
+    clusters = dedup.cluster(DOCUMENTS)
+    assert clusters.assignment.tolist() == [0, 1, 0, 1, 0, 2]
+    assert clusters.representatives.tolist() == [0, 1, 5] # the first document of every cluster
+    assert clusters.multiplicity.tolist() == [3, 2, 1]
+    assert (clusters.numClusters, clusters.numDuplicates) == (3, 3)
+    assert clusters.select(['a', 'b', 'c', 'd', 'e', 'f']) == ['a', 'b', 'f']
+    assert clusters.expand(['news', 'masaya', 'traffic']) == ['news', 'masaya', 'news', 'masaya', 'news', 'traffic']
+    assert clusters.expand(np.array([1, -1, 0])).tolist() == [1, -1, 1, -1, 1, 0]
+
+
+def test_groups_and_exact_only():
+    clusters = dedup.cluster(DOCUMENTS, groups=['1', '1', '0', '1', '1', '0'])
+    assert clusters.assignment.tolist() == [0, 1, 2, 1, 0, 3] # the retweet is labelled differently
+    assert dedup.cluster(DOCUMENTS, nearDuplicates=False).assignment.tolist() == [0, 1, 2, 1, 3, 4]
+
+
+def test_signature_agreement_estimates_jaccard():
+    deduplicator = dedup.Deduplicator(numPermutations=512)
+    words = ['w' + str(i) for i in range(200)]
+    first, second = words[:150], words[50:]
+    shinglesA, shinglesB = set(deduplicator.shingles(first)), set(deduplicator.shingles(second))
+    jaccard = len(shinglesA & shinglesB) / len(shinglesA | shinglesB)
+    signatures = deduplicator.signatures([first, second])
+    assert np.mean(signatures[0] == signatures[1]) == pytest.approx(jaccard, abs=0.08)
+
+
+@pytest.mark.parametrize('numPermutations, threshold', [(128, 0.8), (128, 0.5), (64, 0.9), (100, 0.7)])
+def test_band_layout_stays_below_the_threshold(numPermutations, threshold):
+    bands, rows = dedup.bandLayout(numPermutations, threshold)
+    assert bands * rows == numPermutations
+    assert (1 / bands) ** (1 / rows) <= threshold
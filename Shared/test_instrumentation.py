@@ -0,0 +1,121 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import instrumentation
+
+
+def recorder(**kwargs) -> instrumentation.Recorder:
+    return instrumentation.Recorder(table=False, **kwargs)
+
+
+def test_nested_stages_are_summed_per_path():
+    with recorder() as active:
+        with instrumentation.stage('outer', 1):
+            for i in range(3):
+                with instrumentation.stage('inner') as span:
+                    span.count(2)
+        with instrumentation.stage('inner'):
+            pass
+    summary = active.summary()
+    assert [(stage['path'], stage['calls'], stage['items']) for stage in summary] == [
+        ('outer', 1, 1), ('outer/inner', 3, 6), ('inner', 1, None)]
+    assert [stage['depth'] for stage in summary] == [0, 1, 0]
+
+
+def test_no_recorder_means_no_spans():
+    with instrumentation.stage('free') as span:
+        span.count(1)
+    assert instrumentation.activate(None).__enter__() is None
+
+
+def test_every_thread_has_its_own_recorder():
+    main, worker = recorder(), recorder()
+    started, finished = threading.Event(), threading.Event()
+
+    def work():
+        with worker:
+            with instrumentation.stage('worker stage'):
+                started.set()
+                finished.wait(10)
+
+    with main:
+        thread = threading.Thread(target=work)
+        thread.start()
+        started.wait(10)
+        # the worker's activation did not replace the main thread's recorder
+        with instrumentation.stage('main stage'):
+            pass
+        finished.set()
+        thread.join()
+        with instrumentation.stage('main stage'):
+            pass
+    assert [span.name for span in main.spans] == ['main stage', 'main stage']
+    assert [span.name for span in worker.spans] == ['worker stage']
+
+
+def test_a_recorder_is_not_shared_between_threads():
+    active = recorder()
+    errors = []
+
+    def work():
+        try:
+            with active:
+                pass
+        except RuntimeError as error:
+            errors.append(error)
+
+    with active:
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    assert len(errors) == 1
+
+
+def test_memory_is_recorded_per_stage():
+    with recorder(traceMemory=True) as active:
+        with instrumentation.stage('allocate'):
+            data = bytearray(32 << 20)
+            data[::4096] = b'x' * len(data[::4096]) # touch every page so it is resident
+        with instrumentation.stage('release'):
+            del data
+    allocate, release = active.spans
+    assert allocate.peakTraced >= 32 << 20
+    if allocate.rss is not None: # Linux only
+        assert allocate.rss - release.rss >= 16 << 20
+        assert release.peakRSS >= allocate.rss # the process peak never goes down
+    table = active.formatTable()
+    assert 'RSS MB' in table and 'process peak MB' in table
+
+
+def test_report_writes_json_lines_and_table(tmp_path):
+    path = tmp_path / 'stages.jsonl'
+    stream = io.StringIO()
+    with instrumentation.Recorder(str(path), stream=stream):
+        with instrumentation.stage('load'):
+            time.sleep(0.01)
+        with instrumentation.stage('run', 10):
+            pass
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [line['stage'] for line in lines] == ['load', 'run']
+    assert lines[0]['wall'] >= 0.01 and lines[1]['items'] == 10
+    assert 'load' in stream.getvalue() and 'run' in stream.getvalue()
+
+
+@pytest.mark.parametrize('environ, expected', [
+    ({}, None),
+    ({'INSTRUMENT': '0'}, None),
+    ({'INSTRUMENT': '1'}, (True, None, None, False)),
+    ({'INSTRUMENT_JSONL': 'x.jsonl'}, (False, 'x.jsonl', None, False)),
+    ({'INSTRUMENT_PROFILE': 'fit, train', 'INSTRUMENT_TRACEMALLOC': '1'}, (True, None, frozenset(['fit', 'train']), True)),
+    ({'INSTRUMENT_PROFILE': 'all'}, (True, None, True, False)),
+])
+def test_from_environment(environ, expected):
+    active = instrumentation.fromEnvironment(environ)
+    if expected is None:
+        assert active is None
+    else:
+        assert (active.table, active.jsonPath, active.profile, active.traceMemory) == expected
@@ -0,0 +1,51 @@
+import pytest
+
+import prediction_cache
+
+
+def test_predict_scores_each_distinct_document_once():
+    cache = prediction_cache.PredictionCache(10)
+    scored = []
+
+    def predictMany(documents):
+        scored.extend(documents)
+        return [len(document) for document in documents]
+
+    documents = [['a'], ['a', 'b'], ['a'], ['c']]
+    assert cache.predict(documents, 'v1', predictMany) == [1, 2, 1, 1]
+    assert scored == [['a'], ['a', 'b'], ['c']]
+    assert cache.predict(documents, 'v1', predictMany) == [1, 2, 1, 1]
+    assert len(scored) == 3
+    assert cache.stats()['hits'] == 5 and cache.stats()['misses'] == 3
+
+
+def test_new_version_empties_the_cache():
+    cache = prediction_cache.PredictionCache(10)
+    cache.predict([['a']], 'v1', lambda documents: ['old'])
+    assert cache.predict([['a']], 'v2', lambda documents: ['new']) == ['new']
+    assert cache.version == 'v2' and len(cache) == 1
+
+
+def test_least_recently_used_are_evicted():
+    cache = prediction_cache.PredictionCache(2)
+    cache.predict([['a'], ['b']], 'v', lambda documents: [0] * len(documents))
+    cache.predict([['a']], 'v', lambda documents: [1]) # a is now the most recently used
+    cache.predict([['c']], 'v', lambda documents: [2])
+    predictions, keys, missing = cache.lookup([['a'], ['b'], ['c']], 'v')
+    assert missing == [1]
+    assert cache.evictions == 1
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'predictions.cache')
+    with prediction_cache.PredictionCache(10, path) as cache:
+        cache.predict([['a'], ['b']], 'v', lambda documents: ['x', 'y'])
+    loaded = prediction_cache.PredictionCache(10, path)
+    assert loaded.version == 'v'
+    assert loaded.predict([['b'], ['a']], 'v', lambda documents: pytest.fail("scored a cached document")) == ['y', 'x']
+    assert prediction_cache.PredictionCache(1, path).lookup([['a'], ['b']], 'v')[2] == [0] # keeps the most recent
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        prediction_cache.PredictionCache(0)
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+import tokenizer
+
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Lexicon Analyzer')
+
+
+def lexiconEntries(name:str) -> list:
+    with open(os.path.join(LEXICON_DIR, name), encoding='utf-8', errors='replace') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith(';')]
+
+
+@pytest.mark.parametrize('name', ['positive-words.txt', 'negative-words.txt'])
+def test_lexicon_entries_are_kept_whole(name):
+    entries = lexiconEntries(name)
+    assert entries
+    changed = [(entry, tokenizer.tokenize(entry)) for entry in entries if tokenizer.tokenize(entry) != entry.lower().split()]
+    assert changed == []
+
+
+@pytest.mark.parametrize('name', ['positive-words.txt', 'negative-words.txt'])
+def test_lexicon_entries_are_found_in_running_text(name):
+    entries = lexiconEntries(name)
+    for entry in entries:
+        words = entry.lower().split()
+        assert tokenizer.tokenize('"' + entry + '", said @someone! #tag') == words + ['said', 'tag']
+
+
+@pytest.mark.parametrize('text, words', [
+    ("C++ is great, I love c++.", ['c++', 'is', 'great', 'i', 'love', 'c++']),
+    ("f**k this bull**** and that bull----", ['f**k', 'this', 'bull****', 'and', 'that', 'bull----']),
+    ("anti- war, covid-19 and can't", ['anti-', 'war', 'covid-19', 'and', "can't"]),
+    ("“Masaya” ako, Ñaga!", ['masaya', 'ako', 'ñaga']),
+    ("foo—bar", ['foo', 'bar']),
+    ("nice -- really...", ['nice', 'really']),
+    ("see https://t.co/abc and www.example.com @user #Happy", ['see', 'and', 'happy']),
+])
+def test_tokenize(text, words):
+    assert tokenizer.tokenize(text) == words
+
+
+def test_tokenize_options():
+    text = "#Happy @user https://t.co/x"
+    assert tokenizer.tokenize(text, keepHashtags=False) == []
+    assert tokenizer.tokenize(text, stripUrls=False, stripMentions=False) == ['happy', 'user', 'https', 't', 'co', 'x']
+
+
+@pytest.mark.parametrize('line', [
+    b"C++ is great, I love c++.\n",
+    b"f**k this bull**** and that BULL---- anti- war, covid-19 and can't",
+    b"see https://t.co/abc and www.example.com @user #Happy_Day #tag",
+    b"url\x1chttps://t.co/x\x1fnext\ttab",
+    "\u201cMasaya\u201d ako, \u00d1aga! foo\u2014bar".encode('utf-8'),
+    b"broken \xff utf-8",
+    b"",
+])
+def test_tokenize_bytes_matches_tokenize(line):
+    text = line.decode('utf-8', 'replace')
+    for options in [{}, {'keepHashtags': False}, {'stripUrls': False, 'stripMentions': False}]:
+        assert tokenizer.tokenizeBytes(line, **options) == tokenizer.tokenize(text, **options)
+
+
+@pytest.mark.parametrize('name', ['positive-words.txt', 'negative-words.txt'])
+def test_tokenize_bytes_matches_tokenize_on_the_lexicons(name):
+    with open(os.path.join(LEXICON_DIR, name), 'rb') as f:
+        for line in f:
+            assert tokenizer.tokenizeBytes(line) == tokenizer.tokenize(line.decode('utf-8', 'replace'))
+
+
+def test_stop_words(tmp_path):
+    path = tmp_path / 'stopwords.txt'
+    path.write_text("Ang\nsa\n\n", encoding='utf8')
+    stopWords = tokenizer.loadStopWords(str(path))
+    assert stopWords == frozenset(['ang', 'sa'])
+    assert tokenizer.loadStopWords(str(path)) is stopWords
+    assert tokenizer.removeStopWords(['ang', 'bahay', 'sa', 'bukid'], stopWords) == ['bahay', 'bukid']
@@ -0,0 +1,96 @@
+"""
+Tokenizer shared by the MNB classifier and the Lexicon Analyzer so both see the same words.
+
+Text is lower cased, URLs and @mentions are removed, the '#' of a hashtag is dropped but its text kept, and words
+are runs of letters/digits that may contain inner hyphens, apostrophes or '*' (e.g. "covid-19", "can't", "f**k")
+and may end in '+', '*' or '-' (e.g. "c++", "bull****", "anti-"), with any other punctuation stripped. Every entry of
+the shipped lexicons is one word or a phrase of words under these rules, so the lexicons match the text as written.
+Stop words are kept in a frozenset that is loaded once per process
+"""
+import functools
+import re
+
+URL_PATTERN = re.compile(r'(?:https?://|www\.)\S+')
+MENTION_PATTERN = re.compile(r'@\w+')
+HASHTAG_PATTERN = re.compile(r'#\w+')
+TOKEN_PATTERN = re.compile(r"\w+(?:[-'*]+\w+)*(?:\++|[-*]+)?")
+# The same rules on ASCII bytes, where \w is [A-Za-z0-9_] as it is for ASCII str. \S is spelled out because str
+# also counts \x1c-\x1f as white space
+BYTES_URL_PATTERN = re.compile(rb'(?:https?://|www\.)[^\s\x1c-\x1f]+')
+BYTES_MENTION_PATTERN = re.compile(MENTION_PATTERN.pattern.encode('ascii'))
+BYTES_HASHTAG_PATTERN = re.compile(HASHTAG_PATTERN.pattern.encode('ascii'))
+BYTES_TOKEN_PATTERN = re.compile(TOKEN_PATTERN.pattern.encode('ascii'))
+TOKENIZER_VERSION = 2 # bump when tokenize returns other words, compiled corpora are then recompiled
+
+
+def tokenize(text:str, stripUrls:bool=True, stripMentions:bool=True, keepHashtags:bool=True) -> list:
+    """
+    Splits a document into lower case words
+
+    Paramaters:
+    text (str): The document
+    stripUrls (bool): Remove http(s):// and www. links
+    stripMentions (bool): Remove @username mentions
+    keepHashtags (bool): Keep the text of #hashtags as a word, otherwise remove them
+
+    Returns:
+    list[str]: The words of the document in order
+    """
+    text = text.lower()
+    if stripUrls and ('://' in text or 'www.' in text):
+        text = URL_PATTERN.sub(' ', text)
+    if stripMentions and '@' in text:
+        text = MENTION_PATTERN.sub(' ', text)
+    if not keepHashtags and '#' in text:
+        text = HASHTAG_PATTERN.sub(' ', text)
+    return TOKEN_PATTERN.findall(text)
+
+
+def tokenizeBytes(line:bytes, stripUrls:bool=True, stripMentions:bool=True, keepHashtags:bool=True) -> list:
+    """
+    Fast path of tokenize for UTF-8 lines read from a file opened in binary mode: an ASCII line is tokenized without
+    decoding it first, any other line is decoded and goes through tokenize, so the words are always the same
+
+    Paramaters:
+    line (bytes): The UTF-8 encoded document
+    stripUrls (bool): Remove http(s):// and www. links
+    stripMentions (bool): Remove @username mentions
+    keepHashtags (bool): Keep the text of #hashtags as a word, otherwise remove them
+
+    Returns:
+    list[str]: The words of the document in order
+    """
+    if not line.isascii():
+        return tokenize(line.decode('utf-8', 'replace'), stripUrls, stripMentions, keepHashtags)
+    line = line.lower()
+    if stripUrls and (b'://' in line or b'www.' in line):
+        line = BYTES_URL_PATTERN.sub(b' ', line)
+    if stripMentions and b'@' in line:
+        line = BYTES_MENTION_PATTERN.sub(b' ', line)
+    if not keepHashtags and b'#' in line:
+        line = BYTES_HASHTAG_PATTERN.sub(b' ', line)
+    # words never hold white space, so one decode of the joined words is cheaper than one per word
+    return b' '.join(BYTES_TOKEN_PATTERN.findall(line)).decode('ascii').split()
+
+
+@functools.lru_cache(maxsize=None)
+def loadStopWords(path:str='stopwords.txt') -> frozenset:
+    """
+    Reads a stop word file (one word per line), each path is only read once per process
+
+    Paramaters:
+    path (str): The path to the .txt file of stop words
+
+    Returns:
+    frozenset[str]: The lower cased stop words
+    """
+    with open(path, encoding='utf8') as f:
+        return frozenset(line.strip().lower() for line in f if line.strip())
+
+
+def removeStopWords(tokens:list, stopWords:frozenset) -> list:
+    """
+    Returns:
+    list[str]: The tokens that are not stop words, in order
+    """
+    return [token for token in tokens if token not in stopWords]
@@ -1,9 +1,11 @@
 
 
 #libraries used
-import pandas as pd
 import tweepy
 
+import async_collector
+import collector
+
 #python file containing consumer keys and access tokens
 import TweeKeys
 
@@ -15,10 +17,7 @@ def printtweetdata(n, ith_tweet):
 
 
 # function to perform data extraction
-def scrape(words, numtweet):
-    # Creating DataFrame using pandas
-    db = pd.DataFrame(columns=['text'])
-
+def scrape(words, numtweet, directory='.'):
     consumer_key = TweeKeys.CONSUMER_KEY
     consumer_secret = TweeKeys.CONSUMER_SECRET
     access_key = TweeKeys.ACCESS_TOKEN
@@ -27,52 +26,42 @@ def scrape(words, numtweet):
     auth = tweepy.OAuthHandler(consumer_key, consumer_secret)
     auth.set_access_token(access_key, access_secret)
     api = tweepy.API(auth)
-
-    tweets = tweepy.Cursor(api.search, q=words, lang="fil", tweet_mode='extended').items(numtweet)
-
-
-    list_tweets = [tweet for tweet in tweets]
+    source = collector.TweepySource(api, lang="fil")
 
     # Counter to maintain Tweet Count
     i = 1
+    def printPage(page):
+        nonlocal i
+        for tweet in page:
+            # Function call to print tweet data on screen
+            printtweetdata(i, [tweet['text']])
+            i = i + 1
 
-    # we will iterate over each tweet in the list for extracting information about each tweet
-    for tweet in list_tweets:
-        hashtags = tweet.entities['hashtags']
-
-        # Retweets can be distinguished by a retweeted_status attribute,
-        # in case it is an invalid reference, except block will be executed
-        try:
-            text = tweet.retweeted_status.full_text
-        except AttributeError:
-            text = tweet.full_text
-        hashtext = list()
-        for j in range(0, len(hashtags)):
-            hashtext.append(hashtags[j]['text'])
-
-        # Here we are appending all the extracted information in the DataFrame
-        ith_tweet = [text]
-        db.loc[len(db)] = ith_tweet
-
-        # Function call to print tweet data on screen
-        printtweetdata(i, ith_tweet)
-        i = i + 1
-
+    # every page is appended to the .csv file of the hashtag as it arrives, and a rerun resumes from its checkpoint
+    with collector.openSink(async_collector.sinkPath(directory, words)) as sink:
+        return collector.collect(words, source, sink, sink.path + '.checkpoint', numtweet, onPage=printPage)
 
 
-    # print to csv function
-    fname = 'Training_setV4.csv'
-    db.to_csv(fname)
+# function to collect several hashtags at once within the search rate limit, one .csv file per hashtag
+def scrapeMany(queries, numtweet, directory='.'):
+    auth = tweepy.OAuthHandler(TweeKeys.CONSUMER_KEY, TweeKeys.CONSUMER_SECRET)
+    auth.set_access_token(TweeKeys.ACCESS_TOKEN, TweeKeys.ACCESS_SECRET)
+    source = collector.TweepySource(tweepy.API(auth), lang="fil")
+    return async_collector.collectAll(queries, source, directory, limit=numtweet)
 
 
 if __name__ == "__main__":
 
     # Enter Hashtag and initial date
-    print("Enter Twitter HashTag to search for")
+    print("Enter Twitter HashTag to search for (separate several with commas)")
     words = input()
 
 
     # number of tweets you want to extract in one run
     numtweet = 6000
-    scrape(words, numtweet)
+    queries = [query.strip() for query in words.split(',') if query.strip()]
+    if len(queries) > 1:
+        print(scrapeMany(queries, numtweet))
+    else:
+        scrape(words.strip(), numtweet)
     print('Scraping has completed!')
\ No newline at end of file
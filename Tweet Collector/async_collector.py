@@ -0,0 +1,264 @@
+"""
+Concurrent collection of many queries with asyncio.
+
+Every query pages through its results in its own task. Before each request the task takes a token from the bucket
+of the endpoint, so all queries together stay inside the rate limit budget of that endpoint, and up to
+maxConcurrent requests are in flight at a time. Requests run in a thread pool so blocking sources (TweepySource,
+FakeSource, HTTPSearchSource) can be used as they are. Pages are handed to a single background writer that appends
+them to the sink of their query and then saves its checkpoint, the same files and resume rules as collector.collect
+"""
+import asyncio
+import concurrent.futures
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import collector
+from collector import RateLimitExceeded
+
+# Requests per window of the standard search endpoint (app auth is 450 per 15 minutes, user auth 180)
+DEFAULT_BUDGETS = {'search': (180, 900.0)}
+
+
+class TokenBucket():
+    """
+    Request budget of one endpoint: holds up to capacity tokens, refilled evenly over period seconds
+    """
+    def __init__(self, capacity:int, period:float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._pausedUntil = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """
+        Waits until a request may be made and takes its token
+        """
+        async with self._lock:
+            while True:
+                wait = self._pausedUntil - time.monotonic()
+                if wait <= 0:
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def pause(self, reset:float=None):
+        """
+        Empties the bucket after the API rejected a request, until the epoch second reset if given
+        """
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+        if reset is not None:
+            self._pausedUntil = max(self._pausedUntil, time.monotonic() + max(0.0, reset - time.time()))
+
+    def sync(self, remaining:int, reset:float):
+        """
+        Lowers the tokens to what the API reports is left of the current window
+        """
+        if remaining <= 0:
+            self.pause(reset)
+        elif remaining < self.tokens:
+            self.tokens = float(remaining)
+
+
+class HTTPSearchSource():
+    """
+    The v1.1 search endpoint over plain HTTP with an app bearer token, e.g. against api.twitter.com or stub_server
+    """
+    endpoint = 'search'
+
+    def __init__(self, baseURL:str='https://api.twitter.com', token:str=None, lang:str='fil', timeout:float=30.0):
+        self.baseURL = baseURL.rstrip('/')
+        self.token = token
+        self.lang = lang
+        self.timeout = timeout
+
+    def search(self, query:str, count:int=100, maxID:int=None, sinceID:int=None) -> list:
+        """
+        Returns:
+        list[dict]: Up to count tweets matching query with maxID >= id > sinceID, newest first
+        """
+        return self.searchPage(query, count, maxID, sinceID)[0]
+
+    def searchPage(self, query:str, count:int=100, maxID:int=None, sinceID:int=None) -> tuple:
+        """
+        Returns:
+        tuple[list[dict], tuple]: The tweets as search returns them and the (remaining, reset) rate limit the API
+        reported with them, None if it did not
+        """
+        params = {'q': query, 'count': count, 'tweet_mode': 'extended', 'result_type': 'recent'}
+        if self.lang:
+            params['lang'] = self.lang
+        if maxID is not None:
+            params['max_id'] = maxID
+        if sinceID is not None:
+            params['since_id'] = sinceID
+        request = urllib.request.Request(self.baseURL + '/1.1/search/tweets.json?' + urllib.parse.urlencode(params))
+        if self.token:
+            request.add_header('Authorization', 'Bearer ' + self.token)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                rateLimit = _readRateLimit(response.headers)
+                body = json.load(response)
+        except urllib.error.HTTPError as error:
+            if error.code == 429:
+                rateLimit = _readRateLimit(error.headers)
+                raise RateLimitExceeded(rateLimit[1] if rateLimit else None) from None
+            raise
+        return [statusRecord(status) for status in body.get('statuses', [])], rateLimit
+
+
+def _readRateLimit(headers) -> tuple:
+    """
+    Returns:
+    tuple[int, float]: The x-rate-limit-remaining and x-rate-limit-reset of a response, None if it has none
+    """
+    if headers is None or headers.get('x-rate-limit-remaining') is None:
+        return None
+    return int(headers['x-rate-limit-remaining']), float(headers['x-rate-limit-reset'])
+
+
+def statusRecord(status:dict) -> dict:
+    """
+    Returns:
+    dict: The id, text and hashtags of a v1.1 status in JSON, the full text of the original tweet for retweets
+    """
+    original = status.get('retweeted_status') or status
+    return {
+        'id': status['id'],
+        'text': original.get('full_text', original.get('text', '')),
+        'hashtags': [hashtag['text'] for hashtag in status.get('entities', {}).get('hashtags', [])],
+        'created_at': status.get('created_at', ''),
+    }
+
+
+def sinkPath(directory:str, query:str, extension:str='.csv') -> str:
+    """
+    Returns:
+    str: The file the tweets of query are collected to, e.g. "#Bakuna" -> <directory>/Bakuna.csv
+    """
+    name = re.sub(r'\W+', '_', query).strip('_') or 'query'
+    return os.path.join(directory, name + extension)
+
+
+async def _writer(queue:asyncio.Queue, executor):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        sink, checkpointPath, page, state = item
+        # write the page before its checkpoint, so a crash repeats a page rather than losing one
+        await loop.run_in_executor(executor, _writePage, sink, checkpointPath, page, state)
+
+
+def _searchPage(source, query:str, count:int, maxID:int, sinceID:int) -> tuple:
+    # the rate limit travels with its page, sources shared by several threads keep no per-request state
+    if hasattr(source, 'searchPage'):
+        return source.searchPage(query, count, maxID, sinceID)
+    return source.search(query, count, maxID, sinceID), None
+
+
+def _writePage(sink, checkpointPath:str, page:list, state:dict):
+    if page:
+        sink.write(page)
+    collector.saveCheckpoint(checkpointPath, state)
+
+
+async def _collectQuery(query:str, source, bucket:TokenBucket, semaphore:asyncio.Semaphore, executor, queue:asyncio.Queue, sink, checkpointPath:str, limit:int, pageSize:int, onPage) -> int:
+    loop = asyncio.get_running_loop()
+    state = collector.loadCheckpoint(checkpointPath, query)
+    collected = 0
+    while limit is None or collected < limit:
+        count = pageSize if limit is None else min(pageSize, limit - collected)
+        await bucket.acquire()
+        async with semaphore:
+            try:
+                page, rateLimit = await loop.run_in_executor(executor, _searchPage, source, query, count, state['maxID'], state['sinceID'])
+            except RateLimitExceeded as error:
+                bucket.pause(error.reset)
+                continue
+        if rateLimit is not None:
+            bucket.sync(*rateLimit)
+        if not page:
+            await queue.put((sink, checkpointPath, [], dict(collector.finishSweep(state))))
+            break
+        collector.advance(state, page)
+        await queue.put((sink, checkpointPath, page, dict(state)))
+        collected += len(page)
+        if onPage is not None:
+            onPage(query, page)
+    return collected
+
+
+async def collectMany(queries, source, directory:str='.', limit:int=None, pageSize:int=100, budgets:dict=None, maxConcurrent:int=8, extension:str='.csv', onPage=None) -> dict:
+    """
+    Collects several queries at once, each into its own sink in directory with a checkpoint next to it. Raises
+    ValueError if two queries would share a sink, e.g. "#Bakuna" and "Bakuna"
+
+    Paramaters:
+    queries (iterable[str]): The search queries e.g. hashtags
+    source: Anything with a blocking search(query, count, maxID, sinceID), its endpoint attribute picks the budget
+    directory (str): Where the sinks and checkpoints are written, see sinkPath
+    limit (int): Stop each query after this many tweets in this run, None for no limit
+    pageSize (int): Tweets requested per page
+    budgets (dict): endpoint -> (requests, seconds), DEFAULT_BUDGETS if None
+    maxConcurrent (int): Most requests in flight at once
+    extension (str): '.csv' or '.jsonl' sinks
+    onPage (callable): Called with (query, page) when a page arrives
+
+    Returns:
+    dict: query -> number of tweets collected in this run
+    """
+    queries = list(dict.fromkeys(queries))
+    capacity, period = (budgets or DEFAULT_BUDGETS).get(getattr(source, 'endpoint', 'search'), DEFAULT_BUDGETS['search'])
+    bucket = TokenBucket(capacity, period)
+    semaphore = asyncio.Semaphore(maxConcurrent)
+    queue = asyncio.Queue(maxsize=4 * maxConcurrent) # bounds the pages waiting to be written
+    paths = {}
+    for query in queries:
+        path = sinkPath(directory, query, extension)
+        if path in paths:
+            raise ValueError("queries " + repr(paths[path]) + " and " + repr(query) + " would both be collected to " + path)
+        paths[path] = query
+    sinks = {query: collector.openSink(path) for path, query in paths.items()}
+    with concurrent.futures.ThreadPoolExecutor(maxConcurrent) as fetchExecutor, concurrent.futures.ThreadPoolExecutor(1) as writeExecutor:
+        writer = asyncio.create_task(_writer(queue, writeExecutor))
+        tasks = [asyncio.create_task(_collectQuery(query, source, bucket, semaphore, fetchExecutor, queue, sinks[query], sinks[query].path + '.checkpoint', limit, pageSize, onPage)) for query in queries]
+        try:
+            # a failed write must stop the fetchers too, they would wait on the full queue forever
+            fetching = asyncio.gather(*tasks)
+            await asyncio.wait([fetching, writer], return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                writer.result()
+            counts = fetching.result()
+            await queue.put(None)
+            await writer
+        finally:
+            for task in tasks + [writer]:
+                task.cancel()
+            await asyncio.gather(*tasks, writer, return_exceptions=True)
+            for sink in sinks.values():
+                sink.close()
+    return dict(zip(queries, counts))
+
+
+def collectAll(queries, source, directory:str='.', **kwargs) -> dict:
+    """
+    Blocking entry point of collectMany
+    """
+    return asyncio.run(collectMany(queries, source, directory, **kwargs))
@@ -0,0 +1,266 @@
+"""
+Streaming, resumable tweet collection.
+
+Every page of search results is appended to the sink and flushed to disk before the checkpoint is updated, so
+memory use does not grow with the number of tweets and a crash loses at most the page being written. Search pages
+go from the newest tweet backwards: the checkpoint keeps the max_id of the next page and the since_id the current
+sweep stops at. A rerun continues an unfinished sweep, and once a sweep is finished the next run only fetches tweets
+newer than the newest one already collected. Delivery is at least once, a crash between writing a page and its
+checkpoint writes that page again on the next run
+
+Tweets are plain dicts with at least 'id' and 'text'. A source only needs a search(query, count, maxID, sinceID)
+method, e.g. TweepySource for the Twitter API or FakeSource for tests
+"""
+import csv
+import json
+import os
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised by a source when the API rejects a request for exceeding its rate limit
+    """
+    def __init__(self, reset:float=None):
+        super().__init__("rate limit exceeded" + ("" if reset is None else ", resets at " + str(reset)))
+        self.reset = reset # epoch second the budget is refilled, if the API said so
+
+
+class TweepySource():
+    """
+    Search pages from the Twitter API through a tweepy.API object
+    """
+    def __init__(self, api, lang:str='fil'):
+        self.api = api
+        self.lang = lang
+        # tweepy 4 renamed API.search to API.search_tweets
+        self._search = getattr(api, 'search_tweets', None) or api.search
+
+    def search(self, query:str, count:int=100, maxID:int=None, sinceID:int=None) -> list:
+        """
+        Returns:
+        list[dict]: Up to count tweets matching query with maxID >= id > sinceID, newest first
+        """
+        kwargs = {'q': query, 'lang': self.lang, 'tweet_mode': 'extended', 'count': count}
+        if maxID is not None:
+            kwargs['max_id'] = maxID
+        if sinceID is not None:
+            kwargs['since_id'] = sinceID
+        try:
+            statuses = self._search(**kwargs)
+        except Exception as error:
+            # tweepy.TooManyRequests (tweepy 4) and tweepy.RateLimitError (tweepy 3) both carry the 429 response
+            response = getattr(error, 'response', None)
+            if getattr(response, 'status_code', None) != 429:
+                raise
+            reset = (getattr(response, 'headers', None) or {}).get('x-rate-limit-reset')
+            raise RateLimitExceeded(None if reset is None else float(reset)) from error
+        return [tweetRecord(status) for status in statuses]
+
+
+def tweetRecord(status) -> dict:
+    """
+    Returns:
+    dict: The id, text and hashtags of a tweepy Status, the full text of the original tweet for retweets
+    """
+    # Retweets can be distinguished by a retweeted_status attribute
+    try:
+        text = status.retweeted_status.full_text
+    except AttributeError:
+        text = status.full_text
+    return {
+        'id': status.id,
+        'text': text,
+        'hashtags': [hashtag['text'] for hashtag in status.entities.get('hashtags', [])],
+        'created_at': str(status.created_at),
+    }
+
+
+class FakeSource():
+    """
+    In-memory stand-in for the search API with the same max_id/since_id paging, for tests and offline runs
+    """
+    def __init__(self, tweets, failAfter:int=None):
+        """
+        Paramaters:
+        tweets (iterable[dict]): The tweets that match every query, each with an 'id' and 'text'
+        failAfter (int): Raise ConnectionError on the search call after this many, to simulate a crash
+        """
+        self.tweets = sorted(tweets, key=lambda tweet: tweet['id'], reverse=True)
+        self.failAfter = failAfter
+        self.calls = 0
+
+    def search(self, query:str, count:int=100, maxID:int=None, sinceID:int=None) -> list:
+        if self.failAfter is not None and self.calls >= self.failAfter:
+            raise ConnectionError("fake source failed after " + str(self.failAfter) + " calls")
+        self.calls += 1
+        page = []
+        for tweet in self.tweets:
+            if maxID is not None and tweet['id'] > maxID:
+                continue
+            if sinceID is not None and tweet['id'] <= sinceID:
+                break
+            page.append(tweet)
+            if len(page) == count:
+                break
+        return page
+
+
+class FileSink():
+    """
+    Appends tweets to a file and flushes every page to disk. Subclasses open self._file, set self.count to the number
+    of tweets the file already holds and write the tweets in their format
+    """
+    def write(self, tweets:list):
+        raise NotImplementedError
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CSVSink(FileSink):
+    """
+    Appends tweets to a .csv file of (index, text) rows, the layout the collector has always written
+    """
+    def __init__(self, path:str):
+        self.path = path
+        self.count = 0
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            # continue the row index of the rows already collected
+            with open(path, newline='', encoding='utf-8') as f:
+                self.count = sum(1 for row in csv.reader(f)) - 1
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if not exists:
+            self._writer.writerow(['', 'text'])
+
+    def write(self, tweets:list):
+        for tweet in tweets:
+            self._writer.writerow([self.count, tweet['text']])
+            self.count += 1
+        self.flush()
+
+
+class JSONLSink(FileSink):
+    """
+    Appends tweets to a file with one JSON object per line, keeping every field of the tweet
+    """
+    def __init__(self, path:str):
+        self.path = path
+        self.count = 0
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.count = sum(1 for line in f if line.strip())
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, tweets:list):
+        for tweet in tweets:
+            self._file.write(json.dumps(tweet, ensure_ascii=False) + '\n')
+        self.count += len(tweets)
+        self.flush()
+
+
+def openSink(path:str):
+    """
+    Returns:
+    FileSink: A JSONLSink for .jsonl/.json paths, otherwise a CSVSink
+    """
+    if path.lower().endswith(('.jsonl', '.json')):
+        return JSONLSink(path)
+    return CSVSink(path)
+
+
+def loadCheckpoint(path:str, query:str) -> dict:
+    """
+    Returns:
+    dict: The saved paging state of query, or the state of a first run
+    """
+    state = {'query': query, 'maxID': None, 'sinceID': None, 'newestID': None, 'collected': 0}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('query') != query:
+            raise ValueError(path + " is the checkpoint of the query " + repr(saved.get('query')) + ", not " + repr(query))
+        state.update(saved)
+    return state
+
+
+def saveCheckpoint(path:str, state:dict):
+    """
+    Writes the checkpoint atomically, a crash leaves either the old or the new checkpoint
+    """
+    temporaryPath = path + '.tmp'
+    with open(temporaryPath, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporaryPath, path)
+
+
+def advance(state:dict, page:list) -> dict:
+    """
+    Moves the paging state past a page of tweets, the next page ends just below its oldest tweet
+
+    Returns:
+    dict: state
+    """
+    ids = [tweet['id'] for tweet in page]
+    state['maxID'] = min(ids) - 1
+    state['newestID'] = max(ids) if state['newestID'] is None else max(state['newestID'], max(ids))
+    state['collected'] += len(page)
+    return state
+
+
+def finishSweep(state:dict) -> dict:
+    """
+    Marks the sweep down to since_id as done, the next run starts again from the newest tweets
+
+    Returns:
+    dict: state
+    """
+    state['sinceID'] = state['newestID']
+    state['maxID'] = None
+    return state
+
+
+def collect(query:str, source, sink, checkpointPath:str, limit:int=None, pageSize:int=100, onPage=None) -> int:
+    """
+    Collects the tweets matching query page by page into sink, resuming from checkpointPath
+
+    Paramaters:
+    query (str): The search query e.g. a hashtag
+    source: Anything with search(query, count, maxID, sinceID) e.g. TweepySource or FakeSource
+    sink (FileSink): Where the tweets are appended
+    checkpointPath (str): The paging state file of this query and sink
+    limit (int): Stop after this many tweets in this run, None for no limit
+    pageSize (int): Tweets requested per page
+    onPage (callable): Called with every page of tweets after it is written
+
+    Returns:
+    int: Number of tweets collected in this run
+    """
+    state = loadCheckpoint(checkpointPath, query)
+    collected = 0
+    while limit is None or collected < limit:
+        count = pageSize if limit is None else min(pageSize, limit - collected)
+        page = source.search(query, count, state['maxID'], state['sinceID'])
+        if not page:
+            saveCheckpoint(checkpointPath, finishSweep(state))
+            break
+        sink.write(page)
+        advance(state, page)
+        saveCheckpoint(checkpointPath, state)
+        collected += len(page)
+        if onPage is not None:
+            onPage(page)
+    return collected
@@ -0,0 +1,140 @@
+"""
+Local stand-in for the v1.1 search endpoint (GET /1.1/search/tweets.json) to test the collectors offline.
+
+Tweets are served per query with the same max_id/since_id paging as the real API, and every client shares a fixed
+window budget of requests like Twitter's rate limits: the x-rate-limit-* headers are sent with every response and a
+request over the budget gets HTTP 429 until the window resets
+"""
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEARCH_PATH = '/1.1/search/tweets.json'
+
+
+def statusJSON(tweet:dict) -> dict:
+    """
+    Returns:
+    dict: A collector tweet dict in the JSON layout of the v1.1 API with tweet_mode=extended
+    """
+    return {
+        'id': tweet['id'],
+        'id_str': str(tweet['id']),
+        'full_text': tweet['text'],
+        'created_at': tweet.get('created_at', ''),
+        'entities': {'hashtags': [{'text': hashtag} for hashtag in tweet.get('hashtags', [])]},
+    }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, tweetsByQuery:dict, address=('127.0.0.1', 0), requestLimit:int=180, window:float=900.0, latency:float=0.0, token:str=None):
+        """
+        Paramaters:
+        tweetsByQuery (dict): query -> list of tweet dicts with an 'id' and 'text'
+        address (tuple): (host, port) to listen on, port 0 picks a free port
+        requestLimit (int): Requests allowed per window
+        window (float): Length of a rate limit window in seconds
+        latency (float): Seconds every response is delayed, to simulate the network
+        token (str): If given, the bearer token every request must send
+        """
+        super().__init__(address, SearchHandler)
+        self.tweetsByQuery = {query: sorted(tweets, key=lambda tweet: tweet['id'], reverse=True) for query, tweets in tweetsByQuery.items()}
+        self.requestLimit = requestLimit
+        self.window = window
+        self.latency = latency
+        self.token = token
+        self.requests = 0 # every request served, including rejected ones
+        self._lock = threading.Lock()
+        self._windowStart = time.time()
+        self._used = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return 'http://' + host + ':' + str(port)
+
+    def takeRequest(self) -> tuple:
+        """
+        Returns:
+        tuple: (allowed, remaining, reset) for one request against the shared budget, reset is an epoch second
+        """
+        with self._lock:
+            self.requests += 1
+            now = time.time()
+            if now - self._windowStart >= self.window:
+                self._windowStart, self._used = now, 0
+            allowed = self._used < self.requestLimit
+            if allowed:
+                self._used += 1
+            return allowed, self.requestLimit - self._used, int(self._windowStart + self.window + 0.999)
+
+    def page(self, query:str, count:int, maxID:int=None, sinceID:int=None) -> list:
+        page = []
+        for tweet in self.tweetsByQuery.get(query, []):
+            if maxID is not None and tweet['id'] > maxID:
+                continue
+            if sinceID is not None and tweet['id'] <= sinceID:
+                break
+            page.append(tweet)
+            if len(page) == count:
+                break
+        return page
+
+    def start(self) -> 'StubServer':
+        """
+        Serves in a daemon thread, stop with shutdown()
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        super().__exit__(*exc)
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != SEARCH_PATH:
+            return self._send(404, {'errors': [{'code': 34, 'message': 'Sorry, that page does not exist.'}]})
+        if self.server.token is not None and self.headers.get('Authorization') != 'Bearer ' + self.server.token:
+            return self._send(401, {'errors': [{'code': 89, 'message': 'Invalid or expired token.'}]})
+        allowed, remaining, reset = self.server.takeRequest()
+        headers = {'x-rate-limit-limit': self.server.requestLimit, 'x-rate-limit-remaining': remaining, 'x-rate-limit-reset': reset}
+        if not allowed:
+            return self._send(429, {'errors': [{'code': 88, 'message': 'Rate limit exceeded'}]}, headers)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        params = urllib.parse.parse_qs(url.query)
+        get = lambda name: params[name][0] if name in params else None
+        maxID, sinceID = get('max_id'), get('since_id')
+        page = self.server.page(get('q') or '', min(int(get('count') or 15), 100), int(maxID) if maxID else None, int(sinceID) if sinceID else None)
+        self._send(200, {'statuses': [statusJSON(tweet) for tweet in page], 'search_metadata': {'count': len(page)}}, headers)
+
+    def _send(self, code:int, body:dict, headers:dict=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(tweetsByQuery:dict, port:int=0, **kwargs) -> StubServer:
+    """
+    Starts a stub server in the background
+
+    Returns:
+    StubServer: The running server, its address is server.url
+    """
+    return StubServer(tweetsByQuery, ('127.0.0.1', port), **kwargs).start()
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import time
+import types
+
+import pytest
+
+import async_collector
+import collector
+import stub_server
+
+TWEETS = {
+    '#Bakuna': [{'id': i, 'text': 'bakuna ' + str(i)} for i in range(100, 130)],
+    '#Halalan': [{'id': i, 'text': 'halalan ' + str(i), 'hashtags': ['Halalan']} for i in range(200, 212)],
+    'ulan': [],
+}
+
+
+def collectedIDs(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['id'] for line in f]
+
+
+def test_every_query_is_collected_into_its_own_sink(tmp_path):
+    with stub_server.serve(TWEETS, latency=0.01) as server:
+        source = async_collector.HTTPSearchSource(server.url, lang=None)
+        counts = async_collector.collectAll(TWEETS, source, str(tmp_path), pageSize=7, maxConcurrent=3, extension='.jsonl')
+    assert counts == {query: len(tweets) for query, tweets in TWEETS.items()}
+    for query, tweets in TWEETS.items():
+        path = async_collector.sinkPath(str(tmp_path), query, '.jsonl')
+        assert sorted(collectedIDs(path)) == sorted(tweet['id'] for tweet in tweets)
+        state = collector.loadCheckpoint(path + '.checkpoint', query)
+        assert state['maxID'] is None and state['collected'] == len(tweets) # the sweep is finished
+    assert async_collector.sinkPath(str(tmp_path), '#Bakuna') == os.path.join(str(tmp_path), 'Bakuna.csv')
+
+
+def test_a_rerun_only_fetches_new_tweets(tmp_path):
+    tweets = {'#Bakuna': TWEETS['#Bakuna'][:10]}
+    with stub_server.serve(tweets) as server:
+        source = async_collector.HTTPSearchSource(server.url, lang=None)
+        assert async_collector.collectAll(tweets, source, str(tmp_path), pageSize=4) == {'#Bakuna': 10}
+        server.tweetsByQuery['#Bakuna'] = sorted(TWEETS['#Bakuna'], key=lambda tweet: tweet['id'], reverse=True)
+        assert async_collector.collectAll(tweets, source, str(tmp_path), pageSize=4) == {'#Bakuna': 20}
+
+
+def test_queries_sharing_a_sink_are_rejected(tmp_path):
+    source = collector.FakeSource(TWEETS['#Bakuna'])
+    with pytest.raises(ValueError, match='Bakuna.csv'):
+        async_collector.collectAll(['#Bakuna', 'Bakuna'], source, str(tmp_path))
+    assert os.listdir(str(tmp_path)) == [] # nothing was opened
+
+
+def test_rejected_requests_wait_for_the_window(tmp_path):
+    # the client budget is larger than the server's, so the 429s and rate limit headers have to slow it down
+    with stub_server.serve(TWEETS, requestLimit=3, window=0.5) as server:
+        source = async_collector.HTTPSearchSource(server.url, lang=None)
+        started = time.monotonic()
+        counts = async_collector.collectAll(['#Bakuna', '#Halalan'], source, str(tmp_path), pageSize=10, budgets={'search': (100, 1.0)}, extension='.jsonl')
+        elapsed = time.monotonic() - started
+    assert counts == {'#Bakuna': 30, '#Halalan': 12}
+    assert elapsed >= 0.5 # 6 pages at 3 requests per half second
+    assert sorted(collectedIDs(async_collector.sinkPath(str(tmp_path), '#Bakuna', '.jsonl'))) == list(range(100, 130))
+
+
+class TooManyRequests(Exception):
+    """
+    Stand-in for tweepy.TooManyRequests, which carries the requests.Response of the 429
+    """
+    def __init__(self, reset):
+        super().__init__('429 Too Many Requests')
+        self.response = types.SimpleNamespace(status_code=429, headers={'x-rate-limit-reset': str(reset)})
+
+
+class FakeTweepyAPI():
+    def __init__(self, tweets, rejections):
+        self.tweets = collector.FakeSource(tweets)
+        self.rejections = rejections
+
+    def search_tweets(self, q, lang, tweet_mode, count, max_id=None, since_id=None):
+        if self.rejections:
+            self.rejections -= 1
+            raise TooManyRequests(time.time() + 0.2)
+        return [types.SimpleNamespace(id=tweet['id'], full_text=tweet['text'], entities={'hashtags': []}, created_at='') for tweet in self.tweets.search(q, count, max_id, since_id)]
+
+
+def test_tweepy_rate_limits_pause_instead_of_failing(tmp_path):
+    source = collector.TweepySource(FakeTweepyAPI(TWEETS['#Bakuna'], rejections=2))
+    with pytest.raises(async_collector.RateLimitExceeded) as error:
+        source.search('#Bakuna')
+    assert error.value.reset > time.time()
+    started = time.monotonic()
+    counts = async_collector.collectAll(['#Bakuna'], source, str(tmp_path), pageSize=10, budgets={'search': (100, 1.0)}, extension='.jsonl')
+    assert counts == {'#Bakuna': 30}
+    assert time.monotonic() - started >= 0.1 # waited for the reset of the second 429
+    assert sorted(collectedIDs(async_collector.sinkPath(str(tmp_path), '#Bakuna', '.jsonl'))) == list(range(100, 130))
+
+
+def test_each_page_carries_its_own_rate_limit():
+    with stub_server.serve(TWEETS, requestLimit=5) as server:
+        source = async_collector.HTTPSearchSource(server.url, lang=None)
+        first, (remaining, reset) = source.searchPage('#Bakuna', 10)
+        second, rateLimit = source.searchPage('#Halalan', 10)
+    assert [tweet['id'] for tweet in first] == list(range(129, 119, -1))
+    assert remaining == 4 and reset > time.time()
+    assert len(second) == 10 and rateLimit[0] == 3
+    assert not hasattr(source, 'lastRateLimit')
+
+
+def test_token_bucket_spreads_requests_over_the_period():
+    async def take(count):
+        bucket = async_collector.TokenBucket(2, 0.2)
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(take(2)) < 0.05 # a full bucket does not wait
+    assert asyncio.run(take(5)) >= 0.25 # then one token every 0.1 seconds
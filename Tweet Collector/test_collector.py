@@ -0,0 +1,60 @@
+import csv
+import json
+
+import pytest
+
+import collector
+
+TWEETS = [{'id': i, 'text': 'tweet ' + str(i), 'hashtags': ['Halalan']} for i in range(1, 26)]
+
+
+def collectedIDs(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['id'] for line in f]
+
+
+def test_a_crashed_run_resumes_from_the_checkpoint(tmp_path):
+    sinkPath, checkpointPath = str(tmp_path / 'tweets.jsonl'), str(tmp_path / 'checkpoint.json')
+    with collector.openSink(sinkPath) as sink, pytest.raises(ConnectionError):
+        collector.collect('#Halalan', collector.FakeSource(TWEETS, failAfter=2), sink, checkpointPath, pageSize=10)
+    assert collectedIDs(sinkPath) == list(range(25, 5, -1))
+    assert collector.loadCheckpoint(checkpointPath, '#Halalan')['maxID'] == 5
+
+    with collector.openSink(sinkPath) as sink:
+        assert sink.count == 20
+        assert collector.collect('#Halalan', collector.FakeSource(TWEETS), sink, checkpointPath, pageSize=10) == 5
+    assert collectedIDs(sinkPath) == list(range(25, 0, -1)) # nothing lost or written twice
+
+
+def test_a_finished_sweep_only_fetches_newer_tweets(tmp_path):
+    sinkPath, checkpointPath = str(tmp_path / 'tweets.jsonl'), str(tmp_path / 'checkpoint.json')
+    with collector.openSink(sinkPath) as sink:
+        assert collector.collect('#Halalan', collector.FakeSource(TWEETS[:10]), sink, checkpointPath, pageSize=4) == 10
+    state = collector.loadCheckpoint(checkpointPath, '#Halalan')
+    assert (state['sinceID'], state['maxID'], state['collected']) == (10, None, 10)
+
+    with collector.openSink(sinkPath) as sink:
+        assert collector.collect('#Halalan', collector.FakeSource(TWEETS), sink, checkpointPath, pageSize=4, limit=6) == 6
+        assert collector.collect('#Halalan', collector.FakeSource(TWEETS), sink, checkpointPath, pageSize=4) == 9
+    assert sorted(collectedIDs(sinkPath)) == list(range(1, 26))
+
+
+def test_the_checkpoint_belongs_to_one_query(tmp_path):
+    checkpointPath = str(tmp_path / 'checkpoint.json')
+    collector.saveCheckpoint(checkpointPath, collector.loadCheckpoint(checkpointPath, '#Halalan'))
+    with pytest.raises(ValueError):
+        collector.loadCheckpoint(checkpointPath, '#Eleksyon')
+    assert not (tmp_path / 'checkpoint.json.tmp').exists()
+
+
+def test_csv_rows_continue_their_index(tmp_path):
+    path = str(tmp_path / 'tweets.csv')
+    with collector.openSink(path) as sink:
+        assert isinstance(sink, collector.CSVSink)
+        sink.write(TWEETS[:3])
+    with collector.openSink(path) as sink:
+        assert sink.count == 3
+        sink.write(TWEETS[3:5])
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows == [['', 'text']] + [[str(i), tweet['text']] for i, tweet in enumerate(TWEETS[:5])]